@@ -0,0 +1,27 @@
+"""
+The hot path benchmarks for pytest-benchmark, run from the root of the
+repository with
+
+    pytest benchmarks --benchmark-json=benchmarks/results/<name>.json
+
+`scsa microbench` runs the same benchmarks without pytest-benchmark.
+"""
+
+import pytest
+
+from scs_analysis.perf.hot_paths import hot_paths
+
+
+pytest.importorskip("pytest_benchmark")
+
+CASES = [(hot_path, taxa) for hot_path in hot_paths() for taxa in hot_path.sizes]
+
+
+@pytest.mark.parametrize(
+    "hot_path,taxa", CASES, ids=[f"{path.name}[{taxa}]" for path, taxa in CASES]
+)
+def test_hot_path(benchmark, hot_path, taxa):
+    benchmark.extra_info["taxa"] = taxa
+    benchmark.pedantic(
+        hot_path.run, setup=lambda: (hot_path.setup(taxa), {}), rounds=5
+    )
@@ -1,5 +1,9 @@
-from typing import Dict, Literal, Optional, Sequence, Set, Tuple
+from concurrent.futures import Executor, Future
+from typing import Dict, List, Literal, Optional, Sequence, Set, Tuple, Union
 
+import numpy as np
+
+from cogent3 import make_tree
 from cogent3.core.tree import TreeNode
 
 from sc_supertree.scs import (
@@ -15,11 +19,17 @@ from sc_supertree.scs import (
 )
 
 
+# The fewest taxa of a component solved by the executor rather than inline
+PARALLEL_MIN_TAXA = 200
+
+
 def min_cut_supertree(
     trees: Sequence[TreeNode],
     weights: Optional[Sequence[float]] = None,
     pcg_weighting: Literal["one", "branch", "depth"] = "one",
     contract_edges: bool = True,
+    executor: Optional[Executor] = None,
+    parallel_min_taxa: int = PARALLEL_MIN_TAXA,
 ) -> TreeNode:
     """
     Min-Cut Supertree (MCS).
@@ -31,14 +41,40 @@ def min_cut_supertree(
     The set of input trees must overlap, the optional weights parameter
     allows the biasing of some trees over others.
 
+    Given an executor, the components of at least parallel_min_taxa taxa
+    are solved by it while the smaller ones are solved inline. The children
+    of each node of the supertree are then put in a canonical order (by
+    their least tip name), so it does not depend on where the components
+    were solved. Without one, the supertree is built as it always was.
+
     Args:
         trees (Sequence[TreeNode]): Overlapping subtrees.
         weights (Optional[Sequence[float]]): Optional weights for the trees.
+        executor (Optional[Executor]): Solves the large components, such as
+            a process pool.
+        parallel_min_taxa (int): The fewest taxa of a component given to the
+            executor.
 
     Returns:
         TreeNode: The supertree containing all taxa in the input trees.
     """
 
+    supertree = _min_cut_supertree(
+        trees, weights, pcg_weighting, contract_edges, executor, parallel_min_taxa
+    )
+    if executor is not None:
+        _order_children(supertree)
+    return supertree
+
+
+def _min_cut_supertree(
+    trees: Sequence[TreeNode],
+    weights: Optional[Sequence[float]],
+    pcg_weighting: Literal["one", "branch", "depth"],
+    contract_edges: bool,
+    executor: Optional[Executor],
+    parallel_min_taxa: int,
+) -> TreeNode:
     assert len(trees) >= 1, "there must be at least one tree"
 
     assert pcg_weighting in ["one", "branch", "depth"]
@@ -90,8 +126,13 @@ def min_cut_supertree(
             )
         components = min_cut_partition(pcg_vertices, pcg_weights)
 
+    if executor is not None:
+        # The largest first, so they are handed to the executor before the
+        # others are solved inline
+        components = sorted(components, key=len, reverse=True)
+
     # The child trees corresponding to the components of the graph
-    child_trees = []
+    child_trees: List[Union[TreeNode, Future]] = []
 
     for component in components:
         component = _component_to_names_set(component)
@@ -110,14 +151,30 @@ def min_cut_supertree(
         )
 
         # Find the supertree for the induced trees
-        child_trees.append(
-            min_cut_supertree(
-                new_induced_trees,
-                new_weights,
-                pcg_weighting,
-                contract_edges,
+        if executor is not None and len(component) >= parallel_min_taxa:
+            newicks = [
+                tree.get_newick(with_distances=True) for tree in new_induced_trees
+            ]
+            child_trees.append(
+                executor.submit(
+                    _solve_component,
+                    newicks,
+                    new_weights,
+                    pcg_weighting,
+                    contract_edges,
+                )
+            )
+        else:
+            child_trees.append(
+                _min_cut_supertree(
+                    new_induced_trees,
+                    new_weights,
+                    pcg_weighting,
+                    contract_edges,
+                    executor,
+                    parallel_min_taxa,
+                )
             )
-        )
 
         missing_tips = component.difference(_get_all_tip_names(new_induced_trees))
 
@@ -125,11 +182,129 @@ def min_cut_supertree(
         child_trees.extend(map(lambda x: _tip_names_to_tree((x,)), missing_tips))
 
     # Connect the child trees by making adjacent to a new root.
-    supertree = _connect_trees(child_trees)
+    supertree = _connect_trees(
+        [
+            make_tree(child.result()) if isinstance(child, Future) else child
+            for child in child_trees
+        ]
+    )
     return supertree
 
 
-def min_cut_partition(vertices: Set, edge_weights: Dict):
+def _solve_component(
+    newicks: List[str],
+    weights: List[float],
+    pcg_weighting: Literal["one", "branch", "depth"],
+    contract_edges: bool,
+) -> str:
+    # Trees cross the process boundary as Newick, deep trees can't be pickled
+    trees = [make_tree(newick) for newick in newicks]
+    supertree = _min_cut_supertree(
+        trees, weights, pcg_weighting, contract_edges, None, PARALLEL_MIN_TAXA
+    )
+    return str(supertree)
+
+
+def _order_children(tree: TreeNode) -> None:
+    """
+    Orders the children of every node of the tree by their least tip name.
+    """
+    least_tip_names: Dict[int, str] = {}
+    for node in tree.postorder():
+        if node.is_tip():
+            least_tip_names[id(node)] = node.name
+            continue
+        node.children.sort(key=lambda child: least_tip_names[id(child)])
+        least_tip_names[id(node)] = least_tip_names[id(node.children[0])]
+
+
+def stoer_wagner(
+    vertices: Sequence, edge_weights: Dict
+) -> Tuple[float, Tuple[List, List]]:
+    """
+    A minimum cut of a connected weighted graph (Stoer & Wagner, 1997).
+
+    The graph is held as a dense NumPy adjacency matrix. Each phase's
+    maximum adjacency ordering keeps the connection of every vertex to
+    those already added in one array, picking the next vertex with an
+    argmax over it (added vertices are set to -inf) and adding the new
+    vertex's row. The last two vertices of a phase are merged, and the
+    last vertex of the matrix is moved into the freed row and column, so
+    each phase works on a smaller leading block of the matrix.
+
+    Args:
+        vertices (Sequence): The vertices of the graph.
+        edge_weights (Dict): The weight of each edge, keyed by its vertices.
+
+    Returns:
+        Tuple[float, Tuple[List, List]]: The weight of the cut, and the
+        vertices on either side of it.
+    """
+    # Sorted so ties between cuts are broken the same way in every process
+    vertices = sorted(vertices)
+    n = len(vertices)
+    index = {vertex: i for i, vertex in enumerate(vertices)}
+    rows = np.fromiter((index[u] for u, _ in edge_weights), np.intp, len(edge_weights))
+    columns = np.fromiter(
+        (index[v] for _, v in edge_weights), np.intp, len(edge_weights)
+    )
+    weights = np.fromiter(edge_weights.values(), np.float64, len(edge_weights))
+    adjacency = np.zeros((n, n))
+    adjacency[rows, columns] = weights
+    adjacency[columns, rows] = weights
+    np.fill_diagonal(adjacency, 0.0)
+
+    # The original vertices merged into each row of the matrix
+    groups = [[i] for i in range(n)]
+    best_cut = np.inf
+    best_group: List[int] = []
+    for size in range(n, 1, -1):
+        block = adjacency[:size, :size]
+        connection = block[0].copy()
+        connection[0] = -np.inf
+        s = t = 0
+        for _ in range(size - 1):
+            s, t = t, int(np.argmax(connection))
+            cut = connection[t]
+            connection[t] = -np.inf
+            connection += block[t]
+        if cut < best_cut:
+            best_cut = cut
+            best_group = list(groups[t])
+
+        # Merge t into s, then move the last vertex into t's place
+        block[s] += block[t]
+        block[:, s] = block[s]
+        block[s, s] = 0.0
+        groups[s].extend(groups[t])
+        last = size - 1
+        if t != last:
+            block[t] = block[last]
+            block[:, t] = block[t]
+            block[t, t] = 0.0
+            groups[t] = groups[last]
+
+    in_group = set(best_group)
+    return float(best_cut), (
+        [vertices[i] for i in best_group],
+        [vertices[i] for i in range(n) if i not in in_group],
+    )
+
+
+def min_cut_partition(
+    vertices: Set,
+    edge_weights: Dict,
+    engine: Literal["numpy", "networkx"] = "numpy",
+):
+    """
+    The two sides of a minimum cut of the proper cluster graph.
+
+    The networkx engine is kept as the reference implementation.
+    """
+    if engine == "numpy":
+        cut_value, partition = stoer_wagner(vertices, edge_weights)
+        return list(map(set, partition))
+
     import networkx as nx
 
     graph = nx.Graph()
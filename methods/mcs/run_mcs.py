@@ -1,12 +1,30 @@
+import cProfile
+import glob
+import os
 import sys
-from typing import List
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional
 from cogent3.core.tree import PhyloNode
 from cogent3 import make_tree
 import numpy as np
 from min_cut_supertree import min_cut_supertree
 
 
+try:
+    from scs_analysis.storage.bulk_newick import NameTable
+    from scs_analysis.storage.tree_cache import load_trees
+
+    # One copy of each taxon name across all the files of a batch
+    NAMES = NameTable()
+except ImportError:  # scs_analysis is not installed, parse the Newick
+    load_trees = None
+
+
 def parse_trees(file_path: str) -> List[PhyloNode]:
+    if load_trees is not None:
+        # Loaded from the cache made by scsa cache-trees if there is one
+        return load_trees(file_path, names=NAMES)
     trees = []
     with open(file_path, "r") as f:
         for line in f:
@@ -16,21 +34,92 @@ def parse_trees(file_path: str) -> List[PhyloNode]:
     return trees
 
 
+def pcg_weighting_of(source_tree_file: str) -> str:
+    if source_tree_file.startswith("data/SuperTripletsBenchmark/"):
+        return "depth"
+    return "branch"
+
+
+def read_batch(batch: Optional[str], pattern: Optional[str]) -> List[str]:
+    """
+    The source tree files of a batch, listed one per line in the batch file
+    (anything after a tab, such as a seed, is ignored) and/or matched by the
+    glob pattern.
+    """
+    files = []
+    if batch is not None:
+        with open(batch, "r") as f:
+            for line in f:
+                file = line.strip().split("\t")[0]
+                if len(file) > 0:
+                    files.append(file)
+    if pattern is not None:
+        files.extend(sorted(glob.glob(pattern)))
+    return files
+
+
+def run_batch(
+    batch: Optional[str], pattern: Optional[str], executor: Optional[Executor]
+) -> None:
+    """
+    Estimates a supertree for each source tree file of a batch in this one
+    interpreter, printing a line of the file, the wall and CPU time of
+    min_cut_supertree and the supertree (None if it failed) for each. The
+    CPU time is of this process alone, not of the executor's workers. A
+    file whose source trees cannot be read has None for each.
+    """
+    for source_tree_file in read_batch(batch, pattern):
+        supertree = wall_time = cpu_time = None
+        try:
+            input_trees = parse_trees(source_tree_file)
+            start_time = time.perf_counter()
+            start_cpu_time = time.process_time()
+            try:
+                supertree = min_cut_supertree(
+                    input_trees,
+                    pcg_weighting=pcg_weighting_of(source_tree_file),
+                    contract_edges=True,
+                    executor=executor,
+                )
+            finally:
+                wall_time = time.perf_counter() - start_time
+                cpu_time = time.process_time() - start_cpu_time
+        except Exception as e:
+            print(f"{source_tree_file}: {e}", file=sys.stderr)
+        print(f"{source_tree_file}\t{wall_time}\t{cpu_time}\t{supertree}", flush=True)
+
+
 if __name__ == "__main__":
-    input_trees = parse_trees(sys.argv[-1])
+    # Set by scsa run-experiment --profile
+    profile_path = os.environ.get("SCSA_PROFILE")
+    if profile_path:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    # Large subproblems are solved over a pool of this many processes
+    executor = None
+    if "-j" in sys.argv:
+        executor = ProcessPoolExecutor(int(sys.argv[sys.argv.index("-j") + 1]))
 
-    if "-s" in sys.argv:
-        index = sys.argv.index("-s")
-        seed = int(sys.argv[index + 1])
+    batch = sys.argv[sys.argv.index("-b") + 1] if "-b" in sys.argv else None
+    pattern = sys.argv[sys.argv.index("-g") + 1] if "-g" in sys.argv else None
+    if batch is not None or pattern is not None:
+        # Many source tree files for the one interpreter start up
+        run_batch(batch, pattern, executor)
     else:
-        seed = None
-
-    pcg_weighting = "branch"
-    if sys.argv[1].startswith("data/SuperTripletsBenchmark/"):
-        pcg_weighting = "depth"
-    supertree = min_cut_supertree(
-        input_trees,
-        pcg_weighting=pcg_weighting,
-        contract_edges=True,
-    )
-    print(supertree)
+        input_trees = parse_trees(sys.argv[-1])
+
+        supertree = min_cut_supertree(
+            input_trees,
+            pcg_weighting=pcg_weighting_of(sys.argv[-1]),
+            contract_edges=True,
+            executor=executor,
+        )
+        print(supertree)
+
+    if executor is not None:
+        executor.shutdown()
+
+    if profile_path:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
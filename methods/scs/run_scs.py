@@ -1,5 +1,9 @@
+import cProfile
+import glob
+import os
 import sys
-from typing import List
+import time
+from typing import List, Optional, Tuple
 from cogent3 import make_tree
 from cogent3.core.tree import TreeNode, PhyloNode
 import numpy as np
@@ -7,7 +11,20 @@ import numpy as np
 from sc_supertree import construct_supertree
 
 
+try:
+    from scs_analysis.storage.bulk_newick import NameTable
+    from scs_analysis.storage.tree_cache import load_trees
+
+    # One copy of each taxon name across all the files of a batch
+    NAMES = NameTable()
+except ImportError:  # scs_analysis is not installed, parse the Newick
+    load_trees = None
+
+
 def parse_trees(file_path: str) -> List[PhyloNode]:
+    if load_trees is not None:
+        # Loaded from the cache made by scsa cache-trees if there is one
+        return load_trees(file_path, names=NAMES)
     trees = []
     with open(file_path, "r") as f:
         for line in f:
@@ -17,8 +34,74 @@ def parse_trees(file_path: str) -> List[PhyloNode]:
     return trees
 
 
+def pcg_weighting_of(source_tree_file: str) -> str:
+    if source_tree_file.startswith("data/SuperTripletsBenchmark/"):
+        return "depth"
+    return "branch"
+
+
+def read_batch(
+    batch: Optional[str], pattern: Optional[str], seed: Optional[int]
+) -> List[Tuple[str, Optional[int]]]:
+    """
+    The source tree files of a batch and the seed of each.
+
+    The files are listed one per line in the batch file (optionally followed
+    by a tab and the seed to run it with) and/or matched by the glob pattern.
+    Files without a seed of their own are run with the seed given by -s.
+    """
+    files = []
+    if batch is not None:
+        with open(batch, "r") as f:
+            for line in f:
+                parts = line.strip().split("\t")
+                if len(parts[0]) > 0:
+                    file_seed = int(parts[1]) if len(parts) > 1 else seed
+                    files.append((parts[0], file_seed))
+    if pattern is not None:
+        files.extend((file, seed) for file in sorted(glob.glob(pattern)))
+    return files
+
+
+def run_batch(
+    batch: Optional[str],
+    pattern: Optional[str],
+    seed: Optional[int],
+    contract_edges: bool,
+) -> None:
+    """
+    Estimates a supertree for each source tree file of a batch in this one
+    interpreter, printing a line of the file, the wall and CPU time of
+    construct_supertree and the supertree (None if it failed) for each. A
+    file whose source trees cannot be read has None for each.
+    """
+    for source_tree_file, file_seed in read_batch(batch, pattern, seed):
+        supertree = wall_time = cpu_time = None
+        try:
+            input_trees = parse_trees(source_tree_file)
+            start_time = time.perf_counter()
+            start_cpu_time = time.process_time()
+            try:
+                supertree = construct_supertree(
+                    input_trees,
+                    pcg_weighting=pcg_weighting_of(source_tree_file),
+                    contract_edges=contract_edges,
+                    random_state=np.random.RandomState(file_seed),
+                )
+            finally:
+                wall_time = time.perf_counter() - start_time
+                cpu_time = time.process_time() - start_cpu_time
+        except Exception as e:
+            print(f"{source_tree_file}: {e}", file=sys.stderr)
+        print(f"{source_tree_file}\t{wall_time}\t{cpu_time}\t{supertree}", flush=True)
+
+
 if __name__ == "__main__":
-    input_trees = parse_trees(sys.argv[-1])
+    # Set by scsa run-experiment --profile
+    profile_path = os.environ.get("SCSA_PROFILE")
+    if profile_path:
+        profiler = cProfile.Profile()
+        profiler.enable()
 
     if "-s" in sys.argv:
         index = sys.argv.index("-s")
@@ -28,13 +111,22 @@ if __name__ == "__main__":
 
     contract_edges = "-c" in sys.argv
 
-    pcg_weighting = "branch"
-    if sys.argv[1].startswith("data/SuperTripletsBenchmark/"):
-        pcg_weighting = "depth"
-    supertree = construct_supertree(
-        input_trees,
-        pcg_weighting=pcg_weighting,
-        contract_edges=contract_edges,
-        random_state=np.random.RandomState(seed),
-    )
-    print(supertree)
+    batch = sys.argv[sys.argv.index("-b") + 1] if "-b" in sys.argv else None
+    pattern = sys.argv[sys.argv.index("-g") + 1] if "-g" in sys.argv else None
+    if batch is not None or pattern is not None:
+        # Many source tree files for the one interpreter start up
+        run_batch(batch, pattern, seed, contract_edges)
+    else:
+        input_trees = parse_trees(sys.argv[-1])
+
+        supertree = construct_supertree(
+            input_trees,
+            pcg_weighting=pcg_weighting_of(sys.argv[-1]),
+            contract_edges=contract_edges,
+            random_state=np.random.RandomState(seed),
+        )
+        print(supertree)
+
+    if profile_path:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
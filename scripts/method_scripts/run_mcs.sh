@@ -1,4 +1,4 @@
 #!/bin/sh
 time -p -f %U_%S bash -c '
-python ./methods/mcs/run_mcs.py "'"$1"'"
-'
\ No newline at end of file
+python ./methods/mcs/run_mcs.py "$@"
+' run_mcs.sh "$@"
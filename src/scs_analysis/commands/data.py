@@ -0,0 +1,152 @@
+import random
+import time
+
+import click
+
+from scs_analysis.commands import options
+from scs_analysis.data_generation.dcm_partition import dcm_precise_source_trees
+from scs_analysis.data_generation.generate_model_trees import (
+    generate_model_trees,
+)
+from scs_analysis.data_generation.iqtree import generate_iq_trees
+from scs_analysis.data_generation.simulate_alignments import (
+    simulate_alignments,
+)
+
+
+@click.command(no_args_is_help=True)
+@click.option(
+    "-b",
+    "--birth_rate",
+    default=1.0,
+    show_default=True,
+    help="the birth rate for the birth-death process",
+)
+@click.option(
+    "-d",
+    "--death_rate",
+    default=0.2,
+    show_default=True,
+    help="the death rate for the birth-death process",
+)
+@click.option(
+    "-t",
+    "--target_height",
+    default=1.0,
+    show_default=True,
+    help="the distance from the root to every tip in the generated birth-death tree -- if 0 no scaling is applied",
+)
+@click.option(
+    "-i",
+    "--initial_scaling_factor",
+    default=1.0,
+    show_default=True,
+    help="the initial scaling factor to scale the branch length at the root",
+)
+@click.option(
+    "-n",
+    "--normal_dist_params",
+    default=(0.0, 0.05),
+    type=(float, float),
+    show_default=True,
+    help="the normal distribution that is added to the scaling factor when moving dow the tree",
+)
+@click.option(
+    "-s",
+    "--scaling_factor_bounds",
+    type=(float, float),
+    default=(0.05, 8.0),
+    show_default=True,
+    help="the minimum and maximum bounds of the scaling factor",
+)
+@click.argument("num_trees", type=int)
+@click.argument("num_taxa", type=int)
+@options.verbose
+@options.seed
+def create_bd_trees(
+    birth_rate,
+    death_rate,
+    target_height,
+    initial_scaling_factor,
+    normal_dist_params,
+    scaling_factor_bounds,
+    num_trees,
+    num_taxa,
+    verbose,
+    rand,
+):
+    """
+    Creates birth-death trees with the specified parameters.
+    Depending on the input options, the trees may not be ultrametric.
+
+    NUM_TREES is the number of trees it generates.
+
+    NUM_TAXA is the number of taxa in the resulting tree.
+    """
+    rng = random.Random(time.time() if rand is None else rand)
+    generate_model_trees(
+        num_taxa,
+        num_trees,
+        birth_rate,
+        death_rate,
+        target_height,
+        initial_scaling_factor,
+        *normal_dist_params,
+        *scaling_factor_bounds,
+        verbosity=verbose,
+        rng=rng,
+    )
+
+
+@click.command(no_args_is_help=True)
+@click.option(
+    "-l",
+    "--length",
+    default=1000,
+    show_default=True,
+    help="the length of the sequence alignment",
+)
+@click.argument("num_taxa", type=int)
+@options.verbose
+def sim_bd_seqs(length, num_taxa, verbose):
+    """
+    Given the generated model trees of a specific number of taxa,
+    simulates sequence alignments for the taxa over each of the trees.
+
+    This is performed under a strand-symmetric general nucleotide model.
+    """
+    simulate_alignments(num_taxa, length, verbosity=verbose)
+
+
+@click.command(no_args_is_help=True)
+@click.argument("num_taxa", type=int)
+@click.argument("max_subproblem_size", type=int)
+@options.verbose
+def dcm_source_trees(num_taxa, max_subproblem_size, verbose):
+    """
+    Generates DCM source trees for the given number of taxa.
+    Generates source trees down to a maximum subproblem size.
+
+    NUM_TAXA is the number of taxa.
+
+    MAX_SUBPROBLEM_SIZE is the maximum size of any generated tree.
+    """
+    dcm_precise_source_trees(num_taxa, max_subproblem_size, verbosity=verbose)
+
+
+@click.command(no_args_is_help=True)
+@click.argument("num_taxa", type=int)
+@click.argument("max_subproblem_size", type=int)
+@options.verbose
+def iqtree(num_taxa, max_subproblem_size, verbose):
+    """
+    Given the taxa in each of the DCM source trees for a number of
+    taxa and maximum subproblem size, and the sequence alignments over
+    all the taxa in the model tree, generates source trees using IQTree2
+    under a strand-symmetric model.
+
+    NUM_TAXA is the number of taxa.
+
+    MAX_SUBPROBLEM_SIZE is the maximum size of the DCM trees.
+    """
+    generate_iq_trees(num_taxa, max_subproblem_size, verbosity=verbose)
@@ -0,0 +1,471 @@
+import random
+import time
+
+import click
+
+from scs_analysis.commands import options
+from scs_analysis.experiment.distance_calculator import (
+    DistanceLogger,
+    DistancePool,
+    calculate_all_distances,
+    calculate_experiment_distances,
+)
+from scs_analysis.experiment.events import close_event_log, configure_event_log
+from scs_analysis.experiment.experiment import (
+    BCD,
+    DATASETS,
+    MCS,
+    RESULTS_FOLDER,
+    SCS_FAST,
+    ResultsLogger,
+    dataset_files,
+    experiment_jobs,
+)
+from scs_analysis.experiment.experiment import (
+    index_results as index_results_of,
+)
+from scs_analysis.experiment.experiment import store_result_trees
+from scs_analysis.experiment.method_benchmark import benchmark_jobs
+from scs_analysis.experiment.scheduler import run_jobs
+from scs_analysis.experiment.work_queue import (
+    DEFAULT_HEARTBEAT_INTERVAL,
+    DEFAULT_LEASE_TIMEOUT,
+    enqueue_jobs,
+)
+from scs_analysis.experiment.work_queue import (
+    merge_shards as merge_worker_shards,
+)
+from scs_analysis.experiment.work_queue import run_worker
+from scs_analysis.storage.tree_cache import cache_tree_files
+
+
+def _select_methods(all, bcd, scs, mcs, name):
+    methods = []
+    if all:
+        methods = [BCD, SCS_FAST, MCS]
+    else:
+        if bcd:
+            methods.append(BCD)
+        if scs:
+            methods.append(SCS_FAST)
+        if mcs:
+            methods.append(MCS)
+    if name:
+        methods = [name.upper()]
+    return methods
+
+
+@click.command(no_args_is_help=True)
+@options.all_methods
+@options.bcd
+@options.scs
+@options.mcs
+@options.name
+@click.option(
+    "-w",
+    "--workers",
+    default=1,
+    show_default=True,
+    help="number of method runs to execute in parallel.",
+)
+@click.option(
+    "-d",
+    "--distance-workers",
+    default=0,
+    show_default=True,
+    help="number of processes calculating distances as soon as each tree is produced. If 0, distances are left to calculate-distances.",
+)
+@click.option(
+    "-t",
+    "--isolate-timing",
+    is_flag=True,
+    help="pin each method run to a physical core of its own and flag runs whose timing was disturbed.",
+)
+@click.option(
+    "--memory-budget",
+    default=0,
+    show_default=True,
+    help="memory (in MB) the method runs executing at once may use, by their predicted peak memory. If 0, there is no limit.",
+)
+@options.profile
+@options.event_log
+@options.progress_interval
+@click.argument("dataset-name", nargs=1, required=True, type=str)
+@click.argument("dataset-params", nargs=2, required=True, type=(int, int))
+@options.verbose
+@options.seed
+def run_experiment(
+    all,
+    bcd,
+    scs,
+    mcs,
+    name,
+    workers,
+    distance_workers,
+    isolate_timing,
+    memory_budget,
+    profile,
+    event_log,
+    progress_interval,
+    dataset_name,
+    dataset_params,
+    verbose,
+    rand,
+):
+    """
+    Runs a supertree experiment over the given methods on a specific dataset.
+
+    DATASET_NAME is the name of the dataset. One of [supertriplets, smidgen, smidgenog, smidgenog10000, dcmexact, dcm].
+
+    DATASET_PARAMS is a tuple of integers referring to the first n numbers in that experiment's data folder.
+    For example, `scs run-experiment smidgenog 100 20` would run the experiment on the 100 taxa 20 density dataset.
+    If 0 is specified as one of the parameters, all numbers are used.
+
+    Runs are dispatched longest predicted wall time first, as estimated
+    from the wall times of existing results.
+
+    A run is skipped if it has a result from a run with identical source
+    trees, method script, options and (when a random seed is given) seed.
+    Otherwise, any stale result is replaced.
+    """
+    methods = _select_methods(all, bcd, scs, mcs, name)
+
+    rng = random.Random(time.time() if rand is None else rand)
+
+    jobs = experiment_jobs(dataset_name.lower(), dataset_params, methods, rng=rng)
+    if event_log is not None:
+        configure_event_log(event_log)
+    distance_pool = (
+        DistancePool(distance_workers, verbosity=verbose, profile=profile)
+        if distance_workers > 0
+        else None
+    )
+    try:
+        run_jobs(
+            jobs,
+            workers=workers,
+            verbosity=verbose,
+            seeded=rand is not None,
+            distance_pool=distance_pool,
+            isolate_timing=isolate_timing,
+            memory_budget_kb=memory_budget * 1024 if memory_budget > 0 else None,
+            profile=profile,
+            progress_interval=progress_interval,
+        )
+    finally:
+        if distance_pool is not None:
+            distance_pool.close()
+        close_event_log()
+
+
+@click.command(no_args_is_help=True)
+@options.all_methods
+@options.bcd
+@options.scs
+@options.mcs
+@options.name
+@click.option(
+    "-R",
+    "--repeats",
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+    help="number of measured runs of each method on each input.",
+)
+@click.option(
+    "-u",
+    "--warmup",
+    default=1,
+    show_default=True,
+    help="number of unmeasured runs of each method on each input beforehand.",
+)
+@click.option(
+    "--shuffle/--no-shuffle",
+    default=True,
+    show_default=True,
+    help="whether to run the repeats of all methods and inputs in a random order.",
+)
+@click.option(
+    "-t",
+    "--isolate-timing",
+    is_flag=True,
+    help="pin the runs to a single physical core and flag runs whose timing was disturbed.",
+)
+@click.argument("dataset-name", nargs=1, required=True, type=str)
+@click.argument("dataset-params", nargs=2, required=True, type=(int, int))
+@options.verbose
+@options.seed
+def bench_methods(
+    all,
+    bcd,
+    scs,
+    mcs,
+    name,
+    repeats,
+    warmup,
+    shuffle,
+    isolate_timing,
+    dataset_name,
+    dataset_params,
+    verbose,
+    rand,
+):
+    """
+    Benchmarks supertree methods with repeated runs on a specific dataset.
+
+    Takes the same arguments as run-experiment. The median, interquartile
+    range and minimum of the wall time, CPU time and peak memory over the
+    repeats are written to a *_benchmark.tsv table per method, and are
+    used in place of the single-run times when graphing.
+    """
+    methods = _select_methods(all, bcd, scs, mcs, name)
+
+    rng = random.Random(time.time() if rand is None else rand)
+
+    jobs = experiment_jobs(dataset_name.lower(), dataset_params, methods, rng=rng)
+    benchmark_jobs(
+        jobs,
+        repeats=repeats,
+        warmup=warmup,
+        shuffle=shuffle,
+        rng=rng,
+        isolate_timing=isolate_timing,
+        seeded=rand is not None,
+        verbosity=max(verbose, 1),
+    )
+
+
+@click.command(no_args_is_help=True)
+@options.all_methods
+@options.bcd
+@options.scs
+@options.mcs
+@options.name
+@options.queue
+@click.argument("dataset-name", nargs=1, required=True, type=str)
+@click.argument("dataset-params", nargs=2, required=True, type=(int, int))
+@options.verbose
+@options.seed
+def enqueue(
+    all, bcd, scs, mcs, name, queue, dataset_name, dataset_params, verbose, rand
+):
+    """
+    Adds the runs of a supertree experiment to a work queue.
+
+    Takes the same arguments as run-experiment. Runs which already have
+    results, or are already in the queue, are not added again. The queue
+    is drained by any number of `scsa worker` processes.
+    """
+    methods = _select_methods(all, bcd, scs, mcs, name)
+
+    rng = random.Random(time.time() if rand is None else rand)
+
+    jobs = experiment_jobs(dataset_name.lower(), dataset_params, methods, rng=rng)
+    enqueue_jobs(queue, jobs, seeded=rand is not None, verbosity=max(verbose, 1))
+
+
+@click.command(no_args_is_help=True)
+@options.queue
+@click.option(
+    "-i",
+    "--worker-id",
+    type=str,
+    help="unique name of the worker; defaults to the host name and process id.",
+)
+@click.option(
+    "-l",
+    "--lease-timeout",
+    default=DEFAULT_LEASE_TIMEOUT,
+    show_default=True,
+    help="seconds without a heartbeat before another worker reclaims a job.",
+)
+@click.option(
+    "-b",
+    "--heartbeat",
+    default=DEFAULT_HEARTBEAT_INTERVAL,
+    show_default=True,
+    help="seconds between lease heartbeats.",
+)
+@options.verbose
+def worker(queue, worker_id, lease_timeout, heartbeat, verbose):
+    """
+    Runs jobs from a work queue until it is drained.
+
+    Results are written to a shard of the queue for this worker, see
+    merge-shards. Any number of workers, on any machines sharing the
+    queue directory, can drain the same queue.
+    """
+    run_worker(
+        queue,
+        worker_id,
+        lease_timeout=lease_timeout,
+        heartbeat_interval=heartbeat,
+        verbosity=max(verbose, 1),
+    )
+
+
+@click.command(no_args_is_help=True)
+@options.queue
+@options.verbose
+def merge_shards(queue, verbose):
+    """
+    Merges the results of all workers of a work queue into the results folder.
+    """
+    merge_worker_shards(queue, verbosity=max(verbose, 1))
+
+
+EXPERIMENT_FOLDER_IDENTIFIERS = {
+    "supertriplets": "SuperTripletsBenchmark",
+    "smidgenog": "SMIDGenOutgrouped",
+    "dcmexact": "dcm_source_trees",
+    "dcm": "iq_source_trees",
+}
+
+
+@click.command(no_args_is_help=False)
+@click.option(
+    "-e",
+    "--experiment",
+    default="all",
+    show_default=True,
+    help="The experiment to calculate distances for. One of [all, supertriplets, smidgen, smidgenog, dcmexact, dcm].",
+)
+@options.profile
+@options.event_log
+@options.progress_interval
+@options.verbose
+def calculate_distances(experiment, profile, event_log, progress_interval, verbose):
+    """
+    Calculates the distance between the estimated and model trees for a given experiment.
+
+    When no experiment is specified, runs on all experiments.
+    """
+    if event_log is not None:
+        configure_event_log(event_log)
+    try:
+        if experiment == "all":
+            calculate_all_distances(
+                verbosity=verbose,
+                profile=profile,
+                progress_interval=progress_interval,
+            )
+        else:
+            calculate_experiment_distances(
+                EXPERIMENT_FOLDER_IDENTIFIERS[experiment],
+                verbosity=verbose,
+                profile=profile,
+                progress_interval=progress_interval,
+            )
+    finally:
+        close_event_log()
+
+
+@click.command(no_args_is_help=False)
+@click.option(
+    "-f",
+    "--force",
+    is_flag=True,
+    help="rewrite caches that are up to date.",
+)
+@click.argument("dataset-names", nargs=-1, type=click.Choice(list(DATASETS)))
+@options.verbose
+def cache_trees(force, dataset_names, verbose):
+    """
+    Caches the parsed source and model trees of datasets.
+
+    DATASET_NAMES are the datasets to cache, all of them if none are given.
+    Each tree file gets a binary cache next to it, which the SCS and MCS
+    method scripts and distance calculations load in place of parsing the
+    Newick. A cache is ignored once its tree file changes.
+    """
+    if len(dataset_names) == 0:
+        dataset_names = list(DATASETS)
+    file_paths = []
+    for dataset_name in dataset_names:
+        for source_file, model_file in dataset_files(dataset_name):
+            file_paths.extend((source_file, model_file))
+    file_paths = list(dict.fromkeys(file_paths))
+    written = cache_tree_files(file_paths, force=force, verbosity=verbose)
+    print(f"Wrote {written} tree caches.")
+
+
+@click.command(no_args_is_help=False)
+@click.argument(
+    "results-folder",
+    required=False,
+    default=RESULTS_FOLDER,
+    type=click.Path(exists=True, file_okay=False),
+)
+@options.verbose
+def store_trees(results_folder, verbose):
+    """
+    Moves the trees of existing results into the tree store.
+
+    Results written before the tree store hold each estimated tree in full.
+    This replaces them with references into the compressed store of each
+    experiment directory of RESULTS_FOLDER (results/ by default).
+    """
+    moved = store_result_trees(results_folder, verbosity=verbose)
+    print(f"Moved {moved} trees into the tree store.")
+
+
+@click.command(no_args_is_help=False)
+@click.option(
+    "-f",
+    "--rebuild",
+    is_flag=True,
+    help="index each file from scratch.",
+)
+@click.argument(
+    "results-folder",
+    required=False,
+    default=RESULTS_FOLDER,
+    type=click.Path(exists=True, file_okay=False),
+)
+@options.verbose
+def index_results(rebuild, results_folder, verbose):
+    """
+    Brings the indexes of the result files up to date.
+
+    Each results, keys and distance file of RESULTS_FOLDER (results/ by
+    default) has a sidecar index of where the record of each source tree
+    file is, which is otherwise built and kept up to date as it is used.
+    """
+    indexed = index_results_of(results_folder, rebuild=rebuild, verbosity=verbose)
+    print(f"Indexed {indexed} result files.")
+
+
+RESULT_FIELDS = ("model tree", "source trees", "wall time", "cpu time")
+DISTANCE_FIELDS = ("rf", "mc", "f1", "brf", "bmc", "bf1")
+
+
+@click.command(no_args_is_help=True)
+@click.option("-t", "--tree", is_flag=True, help="print the estimated tree.")
+@click.argument("experiment-directory", type=click.Path(exists=True, file_okay=False))
+@click.argument("method", type=str)
+@click.argument("source-tree-file", type=str)
+def show_result(tree, experiment_directory, method, source_tree_file):
+    """
+    Prints the result of a method on a source tree file.
+
+    EXPERIMENT_DIRECTORY is the folder of the experiment's results, such as
+    results/SMIDGen/500/20/. Only the record asked for is read, through the
+    index of the result file.
+    """
+    experiment_directory = experiment_directory.rstrip("/") + "/"
+    logger = ResultsLogger(experiment_directory, "", verbosity=0)
+    record = logger.read_result(method, source_tree_file)
+    if record is None:
+        raise click.ClickException(
+            f"No {method} result for {source_tree_file} in {experiment_directory}"
+        )
+    for name, value in zip(RESULT_FIELDS, record):
+        print(f"{name}: {value}")
+
+    distance_logger = DistanceLogger(experiment_directory, verbosity=0)
+    distances = distance_logger.index(method).record(source_tree_file)
+    if distances is not None:
+        for name, value in zip(DISTANCE_FIELDS, distances[4:]):
+            print(f"{name}: {value}")
+    if tree:
+        print(logger.tree_store.resolve(record[-1]))
@@ -0,0 +1,62 @@
+"""
+The options shared by several commands.
+"""
+
+import click
+
+
+verbose = click.option(
+    "-v",
+    "--verbose",
+    default=0,
+    show_default=True,
+    help="verbosity level",
+)
+seed = click.option(
+    "-r",
+    "--rand",
+    type=float,
+    default=None,
+    show_default=False,
+    help="random seed; if not specified uses the system time.",
+)
+
+
+all_methods = click.option(
+    "-a", "--all", is_flag=True, help="include all supertree methods."
+)
+bcd = click.option(
+    "-b", "--bcd", is_flag=True, help="include bad clade deletion method."
+)
+scs = click.option(
+    "-s", "--scs", is_flag=True, help="include spectral cluster supertree method."
+)
+mcs = click.option(
+    "-m", "--mcs", is_flag=True, help="include min-cut supertree method."
+)
+name = click.option("-n", "--name", type=str, help="name of method")
+profile = click.option(
+    "-p",
+    "--profile",
+    is_flag=True,
+    help="write a cProfile profile of each job (of the Python methods and distance calculations) next to its results.",
+)
+event_log = click.option(
+    "--event-log",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="append a JSON line with the timing of each phase of each job (input read, method run, tree parsing, each metric, result write) to this file, rotated once large.",
+)
+progress_interval = click.option(
+    "--progress-interval",
+    default=None,
+    type=float,
+    help="seconds between progress lines (jobs done and remaining, jobs per minute of each method and an ETA). Defaults to 5 on a terminal and 300 otherwise, 0 for none.",
+)
+queue = click.option(
+    "-q",
+    "--queue",
+    required=True,
+    type=click.Path(file_okay=False),
+    help="the work queue directory on the shared filesystem.",
+)
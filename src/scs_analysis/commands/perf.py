@@ -0,0 +1,140 @@
+import sys
+import time
+
+import click
+
+from scs_analysis.commands import options
+from scs_analysis.perf.compare import (
+    DEFAULT_TOLERANCE,
+    benchmark_stats,
+    compare_benchmarks,
+    format_comparison_table,
+)
+from scs_analysis.perf.microbench import (
+    DEFAULT_MAX_TIME,
+    DEFAULT_ROUNDS,
+    MICROBENCH_FOLDER,
+    load_microbenchmarks,
+    run_microbenchmarks,
+    save_microbenchmarks,
+)
+
+
+@click.command(no_args_is_help=False)
+@click.option(
+    "-f",
+    "--function",
+    "functions",
+    multiple=True,
+    help="hot path to benchmark (may be repeated); all if not given.",
+)
+@click.option(
+    "-t",
+    "--taxa",
+    "sizes",
+    multiple=True,
+    type=int,
+    help="number of taxa to benchmark on (may be repeated); 100, 1000 and 10000 if not given.",
+)
+@click.option(
+    "-R",
+    "--rounds",
+    default=DEFAULT_ROUNDS,
+    show_default=True,
+    help="number of timed runs of each benchmark.",
+)
+@click.option(
+    "-m",
+    "--max-time",
+    default=DEFAULT_MAX_TIME,
+    show_default=True,
+    help="seconds of timed runs after which a benchmark stops early.",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False),
+    help=f"file to save the results to; defaults to a timestamped file in {MICROBENCH_FOLDER}",
+)
+@options.verbose
+def microbench(functions, sizes, rounds, max_time, output, verbose):
+    """
+    Benchmarks the hot paths of the analysis on seeded synthetic trees.
+
+    Run from the root of the repository (the min cut supertree is loaded
+    from the method scripts). Results are saved as JSON.
+    """
+    results = run_microbenchmarks(
+        functions=functions or None,
+        sizes=sizes or None,
+        rounds=rounds,
+        max_time=max_time,
+        verbosity=max(verbose, 1),
+    )
+    if output is None:
+        output = MICROBENCH_FOLDER + time.strftime("%Y%m%d-%H%M%S") + ".json"
+    save_microbenchmarks(results, output)
+    print("Saved results to", output)
+
+
+@click.command(no_args_is_help=True)
+@click.argument("baseline", type=click.Path(exists=True, dir_okay=False))
+@click.argument("current", required=False, type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "-T",
+    "--tolerance",
+    default=DEFAULT_TOLERANCE,
+    show_default=True,
+    help="fraction the median time of a benchmark may grow by before it is a regression.",
+)
+@click.option(
+    "-M",
+    "--memory-tolerance",
+    type=float,
+    help="fraction the peak memory of a benchmark may grow by; defaults to the time tolerance.",
+)
+@click.option(
+    "-R",
+    "--rounds",
+    default=DEFAULT_ROUNDS,
+    show_default=True,
+    help="number of timed runs of each benchmark, if running them.",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False),
+    help="file to save the current results to, if running them.",
+)
+def perf_compare(baseline, current, tolerance, memory_tolerance, rounds, output):
+    """
+    Compares micro-benchmark results against a baseline.
+
+    BASELINE is the JSON saved by microbench (or pytest-benchmark).
+
+    CURRENT is the JSON of the results to compare. If not given, the
+    benchmarks in the baseline are run now.
+
+    Exits with a non-zero status if the median time or peak memory of any
+    benchmark regressed beyond the tolerance.
+    """
+    baseline_results = load_microbenchmarks(baseline)
+    if current is None:
+        current_results = run_microbenchmarks(
+            names=list(benchmark_stats(baseline_results)), rounds=rounds
+        )
+        if output is not None:
+            save_microbenchmarks(current_results, output)
+    else:
+        current_results = load_microbenchmarks(current)
+
+    comparisons = compare_benchmarks(
+        baseline_results, current_results, tolerance, memory_tolerance
+    )
+    print(format_comparison_table(comparisons))
+
+    regressions = [comparison for comparison in comparisons if comparison.regressed]
+    if len(regressions) > 0:
+        print(f"{len(regressions)} of {len(comparisons)} benchmarks regressed.")
+        sys.exit(1)
+    print("No regressions.")
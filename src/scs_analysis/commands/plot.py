@@ -0,0 +1,34 @@
+import os
+
+import click
+
+from scs_analysis.commands import options
+from scs_analysis.experiment.graph import graph_results
+
+
+@click.command(no_args_is_help=False)
+@click.option(
+    "-w",
+    "--workers",
+    type=int,
+    default=None,
+    help="number of processes drawing figures. Defaults to the number of CPUs.",
+)
+@click.option(
+    "-f",
+    "--force",
+    is_flag=True,
+    help="redraw figures whose data has not changed.",
+)
+@options.verbose
+def plot(workers, force, verbose):
+    """
+    Draws graphs for all experiments distances have been calculated for.
+
+    Only figures whose data or parameters changed since they were last
+    drawn are redrawn (see images/.figure_manifest.json).
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    drawn = graph_results("images/", verbosity=verbose, workers=workers, force=force)
+    print(f"Drew {drawn} figures.")
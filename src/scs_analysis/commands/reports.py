@@ -0,0 +1,64 @@
+import click
+
+from scs_analysis.commands import options
+from scs_analysis.experiment.events import event_report as event_report_table
+from scs_analysis.perf.profiling import DEFAULT_TOP, SORT_KEYS
+from scs_analysis.perf.profiling import profile_report as profile_report_table
+
+
+@click.command(no_args_is_help=False)
+@click.option(
+    "-k",
+    "--top",
+    default=DEFAULT_TOP,
+    show_default=True,
+    help="number of functions to show for each experiment.",
+)
+@click.option(
+    "-s",
+    "--sort",
+    type=click.Choice(SORT_KEYS),
+    default="tottime",
+    show_default=True,
+    help="what to rank the functions by.",
+)
+@options.name
+@click.argument(
+    "results-folder",
+    required=False,
+    default=None,
+    type=click.Path(exists=True, file_okay=False),
+)
+def profile_report(top, sort, name, results_folder):
+    """
+    Shows the hottest functions in the profiles written with --profile.
+
+    The profiles of each experiment directory (one per dataset size) are
+    merged per method, separately for method runs and distance calculations.
+
+    RESULTS_FOLDER is the folder the profiles are searched for in,
+    results/ by default.
+    """
+    if results_folder is None:
+        # Deferred, as the experiment module imports cogent3
+        from scs_analysis.experiment.experiment import RESULTS_FOLDER
+
+        results_folder = RESULTS_FOLDER
+    method = None if name is None else name.upper()
+    report = profile_report_table(results_folder, top=top, sort=sort, method=method)
+    print(report if report else "No profiles found.")
+
+
+@click.command(no_args_is_help=True)
+@options.name
+@click.argument("event-log", type=click.Path(exists=True, dir_okay=False))
+def event_report(name, event_log):
+    """
+    Shows where the time of the jobs logged with --event-log went.
+
+    The events of EVENT_LOG (and its rotated files) are totalled by method
+    and phase, with the share of the method's time each phase took and the
+    rate the phases reading or writing data handled it at.
+    """
+    method = None if name is None else name.upper()
+    print(event_report_table(event_log, method=method))
@@ -1,42 +1,89 @@
 import os
-from typing import List, Optional, Union
+import threading
+import time
 
-from ..distance.distance import (
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from cogent3 import make_tree
+from cogent3.core.tree import TreeNode
+
+from scs_analysis.distance.distance import (
     matching_cluster_distance,
     rooted_f1_distance,
     rooted_rf_distance,
 )
+from scs_analysis.experiment.events import (
+    BIFURCATE,
+    METRIC,
+    PARSE,
+    READ,
+    WRITE,
+    captured_events,
+    event_context,
+    events_enabled,
+    file_size,
+    log_events,
+    phase,
+)
+from scs_analysis.experiment.experiment import (
+    BCD,
+    BCDG,
+    BCDN,
+    DISTANCE_FILE_SUFFIX,
+    DISTANCE_NUM_FIELDS,
+    MCS,
+    RESULTS_FOLDER,
+    SCS,
+    SCS_FAST,
+    SUP,
+    ResultsLogger,
+)
+from scs_analysis.experiment.progress import ProgressReporter
+from scs_analysis.experiment.result_files import (
+    append_record,
+    needs_recovery,
+    parse_record,
+    read_records,
+    recover_records,
+)
+from scs_analysis.perf.profiling import DISTANCES, profile_path, profiled
+from scs_analysis.storage.metrics_cache import write_metrics_cache
+from scs_analysis.storage.results_index import RecordIndex, record_index
+from scs_analysis.storage.tree_cache import load_tree
+from scs_analysis.storage.tree_store import TreeStore
 
-from .experiment import BCD, BCDG, BCDN, MCS, RESULTS_FOLDER, SCS, SCS_FAST, SUP
-from cogent3.core.tree import TreeNode
-from cogent3 import make_tree
 
 ORDERING = {BCD: 0, BCDG: 0.5, BCDN: 0.75, SCS_FAST: 0.9, SCS: 1, SUP: 2, MCS: 3}
 
 
 class DistanceLogger:
-    def __init__(self, write_directory: str) -> None:
+    NUM_FIELDS = DISTANCE_NUM_FIELDS
+
+    def __init__(self, write_directory: str, verbosity: int = 1) -> None:
         self.write_directory = write_directory
-        self.file_suffix = "_results_with_distances.tsv"
+        self.file_suffix = DISTANCE_FILE_SUFFIX
+        self.tree_store = TreeStore(self.write_directory)
 
         if not os.path.exists(self.write_directory):
             os.makedirs(self.write_directory)
 
+        self.recover(verbosity=verbosity)
+
+    def recover(self, verbosity: int = 1) -> None:
+        """
+        Repairs distance files left inconsistent by an interrupted run.
+        """
+        for file in sorted(os.listdir(self.write_directory)):
+            if not file.endswith(self.file_suffix):
+                continue
+            file_path = self.write_directory + file
+            if needs_recovery(file_path):
+                recover_records(file_path, verbosity=verbosity)
+
     def result_already_exists(self, method: str, source_tree_file: str) -> bool:
-        file_path = self.format_file_path(method)
-        if not os.path.exists(file_path):
-            return False
-
-        with open(file_path, "r") as f:
-            for line in f:
-                all_data = line.strip("\n").split("\t")
-                mtf, stf, wall_time, cpu_time = all_data[:4]
-                # b for forced bifurcation
-                rf_distance, mc_distance, brf_distance, bmc_distance = all_data[4:8]
-                tree = all_data[8]
-                if stf == source_tree_file:
-                    return True
-        return False
+        return source_tree_file in self.index(method)
 
     def write_results(
         self,
@@ -64,17 +111,218 @@ class DistanceLogger:
             str(brf_distance),
             str(bmc_distance),
             str(bf1_distance),
-            str(tree),
+            self.tree_store.store(tree),
         ]
-        with open(self.format_file_path(method), "a") as f:
-            f.write("\t".join(parts) + "\n")
+        with phase(
+            WRITE,
+            method=method,
+            source_tree_file=source_tree_file,
+            bytes=sum(map(len, parts)),
+        ):
+            append_record(self.format_file_path(method), parts)
+            self.index(method).refresh()
+
+    def index(self, method: str) -> RecordIndex:
+        return record_index(self.format_file_path(method), self.NUM_FIELDS, 1)
 
     def format_file_path(self, method: str) -> str:
         return self.write_directory + method + self.file_suffix
 
 
+def load_model_tree(model_tree_file: str) -> TreeNode:
+    with phase(READ, file=model_tree_file, bytes=file_size(model_tree_file)):
+        model_tree = load_tree(model_tree_file)
+        if "SMIDGenOutgrouped" in model_tree_file:
+            model_tree = model_tree.get_sub_tree(
+                set(model_tree.get_tip_names()).difference(("OUTGROUP",))
+            )
+    return model_tree
+
+
+def calculate_distances(
+    model_tree: TreeNode, tree: TreeNode
+) -> Tuple[int, int, float, int, int, float]:
+    """
+    Calculates the distances between a model and an estimated tree.
+
+    Returns:
+        Tuple[int, int, float, int, int, float]: The RF distance, matching
+        cluster distance and F1 score, then the same again once both trees
+        are made bifurcating.
+    """
+    rf = _timed_metric("rf", rooted_rf_distance, model_tree, tree)
+    mc = _timed_metric("mc", matching_cluster_distance, model_tree, tree)
+    f1 = _timed_metric("f1", rooted_f1_distance, model_tree, tree)
+
+    with phase(BIFURCATE):
+        b_model_tree = model_tree.bifurcating()
+        b_tree = tree.bifurcating()
+
+    brf = _timed_metric("brf", rooted_rf_distance, b_model_tree, b_tree)
+    bmc = _timed_metric("bmc", matching_cluster_distance, b_model_tree, b_tree)
+    bf1 = _timed_metric("bf1", rooted_f1_distance, b_model_tree, b_tree)
+
+    return rf, mc, f1, brf, bmc, bf1
+
+
+def _timed_metric(name: str, metric: Callable, model_tree: TreeNode, tree: TreeNode):
+    with phase(METRIC, metric=name):
+        return metric(model_tree, tree)
+
+
+def print_distances(method: str, distances: Tuple) -> None:
+    rf, mc, f1, brf, bmc, bf1 = distances
+    if brf != rf or bmc != mc or bf1 != f1:
+        print(f"{method}: RF={rf} MC={mc} F1={f1} BRF={brf} BMC={bmc} BF1={bf1}")
+    else:
+        print(f"{method}: RF={rf} MC={mc} F1={f1}")
+
+
+@lru_cache(maxsize=16)
+def _cached_model_tree(model_tree_file: str) -> TreeNode:
+    return load_model_tree(model_tree_file)
+
+
+def _distances_for_newick(
+    model_tree_file: str,
+    newick: str,
+    profile_file: Optional[str] = None,
+    event_fields: Optional[Dict[str, Any]] = None,
+) -> Tuple[Tuple[int, int, float, int, int, float], List[Dict[str, Any]]]:
+    """
+    The distances of an estimated tree, along with the events of their
+    phases if event fields are given (the parent process logs them).
+    """
+    with captured_events(event_fields is not None) as events, event_context(
+        **(event_fields or {})
+    ), profiled(profile_file):
+        model_tree = _cached_model_tree(model_tree_file)
+        with phase(PARSE, bytes=len(newick)):
+            tree = make_tree(newick)
+        distances = calculate_distances(model_tree, tree)
+    return distances, events
+
+
+class DistancePool:
+    """
+    Calculates distances for trees as soon as they are produced.
+
+    Trees are handed to a pool of processes (each keeping the model trees
+    it parsed), and their distance records are written to the
+    *_results_with_distances.tsv files as each calculation finishes, so
+    method runs and distance calculations overlap. The metrics caches of
+    the experiment folders are brought up to date on close.
+    """
+
+    def __init__(
+        self, workers: int = 1, verbosity: int = 1, profile: bool = False
+    ) -> None:
+        self.verbosity = verbosity
+        self.profile = profile
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._loggers: Dict[str, DistanceLogger] = {}
+        self._futures: List[Future] = []
+        self._errors: List[Exception] = []
+        self._lock = threading.Lock()
+
+    def _logger(self, write_directory: str) -> DistanceLogger:
+        with self._lock:
+            if write_directory not in self._loggers:
+                self._loggers[write_directory] = DistanceLogger(write_directory)
+            return self._loggers[write_directory]
+
+    def submit(
+        self,
+        write_directory: str,
+        method: str,
+        model_tree_file: str,
+        source_tree_file: str,
+        wall_time: Union[float, str],
+        cpu_time: Union[float, str, None],
+        tree: Union[TreeNode, str, None],
+    ) -> None:
+        """
+        Queues the distance calculation for an estimated tree.
+
+        Args:
+            write_directory (str): The folder of the experiment's results.
+            method (str): The supertree method.
+            model_tree_file (str): Path to the model tree.
+            source_tree_file (str): Path to the source trees.
+            wall_time (Union[float, str]): Wall time of the method run.
+            cpu_time (Union[float, str, None]): CPU time of the method run.
+            tree (Union[TreeNode, str, None]): The estimated tree.
+        """
+        if tree is None:
+            return  # The method failed, there is no tree to compare
+        logger = self._logger(write_directory)
+        if logger.result_already_exists(method, source_tree_file):
+            return
+        newick = str(tree)
+
+        def write(future: Future) -> None:
+            if future.exception() is not None:
+                return  # Raised on close
+            distances, events = future.result()
+            log_events(events)
+            if self.verbosity >= 1:
+                print_distances(method, distances)
+            with self._lock:
+                try:
+                    logger.write_results(
+                        method,
+                        model_tree_file,
+                        source_tree_file,
+                        wall_time,
+                        str(cpu_time),
+                        *distances,
+                        newick,  # type: ignore
+                    )
+                except Exception as e:
+                    self._errors.append(e)
+
+        profile_file = None
+        if self.profile:
+            profile_file = profile_path(
+                write_directory, method, source_tree_file, DISTANCES
+            )
+        event_fields = None
+        if events_enabled():
+            event_fields = {"method": method, "source_tree_file": source_tree_file}
+        future = self._executor.submit(
+            _distances_for_newick, model_tree_file, newick, profile_file, event_fields
+        )
+        future.add_done_callback(write)
+        with self._lock:
+            self._futures.append(future)
+
+    def close(self) -> None:
+        """
+        Waits for all queued calculations to be written, then raises the
+        first error of any of them.
+        """
+        self._executor.shutdown(wait=True)
+        # The distances that were written are cached even if others failed
+        for write_directory in self._loggers:
+            write_metrics_cache(write_directory)
+        for future in self._futures:
+            future.result()
+        for error in self._errors:
+            raise error
+
+    def __enter__(self) -> "DistancePool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
 def calculate_distances_for_experiment(
-    directory: str, result_files: List[str], verbosity: int = 1
+    directory: str,
+    result_files: List[str],
+    verbosity: int = 1,
+    profile: bool = False,
+    progress: Optional[ProgressReporter] = None,
 ):
     logger = DistanceLogger(directory + "/")
 
@@ -95,7 +343,10 @@ def calculate_distances_for_experiment(
         for method, line in zip(methods, next_lines):
             if line == "":
                 continue
-            mtf, stf, wall_time, cpu_time, tree = line.strip("\n").split("\t")
+            all_data = parse_record(line, ResultsLogger.NUM_FIELDS)
+            if all_data is None:
+                continue  # Not a complete record
+            mtf, stf, wall_time, cpu_time, tree = all_data
             if logger.result_already_exists(method, stf):
                 if verbosity >= 1:
                     print(
@@ -110,53 +361,109 @@ def calculate_distances_for_experiment(
                 print("Calculating distances for", stf)
                 already_gave_stf = True
 
-            all_data = line.strip("\n").split("\t")
-            mtf, stf, wall_time, cpu_time, tree = all_data
-            tree = make_tree(tree)
-
-            with open(mtf, "r") as f:
-                model_tree = make_tree(f.read().strip())
-                if "SMIDGenOutgrouped" in mtf:
-                    model_tree = model_tree.get_sub_tree(
-                        set(model_tree.get_tip_names()).difference(("OUTGROUP",))
-                    )
-
-            rf = rooted_rf_distance(model_tree, tree)
-            mc = matching_cluster_distance(model_tree, tree)
-            f1 = rooted_f1_distance(model_tree, tree)
-
-            b_model_tree = model_tree.bifurcating()
-            b_tree = tree.bifurcating()
+            profile_file = None
+            if profile:
+                profile_file = profile_path(
+                    logger.write_directory, method, stf, DISTANCES
+                )
+            start_time = time.time()
+            with event_context(method=method, source_tree_file=stf), profiled(
+                profile_file
+            ):
+                model_tree = load_model_tree(mtf)
+                with phase(READ) as event:
+                    newick = logger.tree_store.resolve(tree)
+                    event["bytes"] = len(newick)
+                with phase(PARSE, bytes=len(newick)):
+                    tree = make_tree(newick)
 
-            brf = rooted_rf_distance(b_model_tree, b_tree)
-            bmc = matching_cluster_distance(b_model_tree, b_tree)
-            bf1 = rooted_f1_distance(b_model_tree, b_tree)
+                distances = calculate_distances(model_tree, tree)
 
             if verbosity >= 1:
-                if brf != rf or bmc != mc or bf1 != f1:
-                    print(
-                        f"{method}: RF={rf} MC={mc} F1={f1} BRF={brf} BMC={bmc} BF1={bf1}"
-                    )
-                else:
-                    print(f"{method}: RF={rf} MC={mc} F1={f1}")
+                print_distances(method, distances)
             logger.write_results(
-                method, mtf, stf, wall_time, cpu_time, rf, mc, f1, brf, bmc, bf1, tree
+                method, mtf, stf, wall_time, cpu_time, *distances, newick  # type: ignore
             )
+            if progress is not None:
+                progress.complete(method, time.time() - start_time)
 
         next_lines = [file_object.readline() for file_object in file_objects]
 
     for file_object in file_objects:
         file_object.close()
 
+    write_metrics_cache(directory)
+
+
+def _distance_progress(
+    experiments: List[Tuple[str, List[str]]],
+    verbosity: int = 1,
+    progress_interval: Optional[float] = None,
+) -> ProgressReporter:
+    """
+    A progress reporter over the estimated trees of the experiments,
+    counting those that already have distances as skipped.
+    """
+    counts = []
+    for root, result_files in experiments:
+        logger = DistanceLogger(root + "/", verbosity=verbosity)
+        for result_file in result_files:
+            method = result_file[:-12]
+            done = set(logger.index(method).keys())
+            for parts in read_records(
+                root + "/" + result_file, ResultsLogger.NUM_FIELDS
+            ):
+                counts.append((method, parts[1] in done))
+
+    progress = ProgressReporter(
+        len(counts),
+        interval=progress_interval if verbosity >= 1 else 0,
+        label="trees",
+    )
+    progress.skip(sum(done for _, done in counts))
+    for method, done in counts:
+        if not done:
+            progress.expect(method)
+    return progress
+
+
+def _calculate_distances_for_experiments(
+    experiments: List[Tuple[str, List[str]]],
+    verbosity: int = 1,
+    profile: bool = False,
+    progress_interval: Optional[float] = None,
+):
+    with _distance_progress(experiments, verbosity, progress_interval) as progress:
+        for root, result_files in experiments:
+            calculate_distances_for_experiment(
+                root,
+                result_files,
+                verbosity=verbosity,
+                profile=profile,
+                progress=progress,
+            )
+
 
-def calculate_all_distances(verbosity: int = 1):
+def calculate_all_distances(
+    verbosity: int = 1, profile: bool = False, progress_interval: Optional[float] = None
+):
+    experiments = []
     for root, subdirs, files in os.walk(RESULTS_FOLDER):
         result_files = list(filter(lambda x: x.endswith("_results.tsv"), files))
         if len(result_files) > 0:
-            calculate_distances_for_experiment(root, result_files, verbosity=verbosity)
+            experiments.append((root, result_files))
+    _calculate_distances_for_experiments(
+        experiments, verbosity, profile, progress_interval
+    )
 
 
-def calculate_experiment_distances(experiment_folder_identifier, verbosity: int = 1):
+def calculate_experiment_distances(
+    experiment_folder_identifier,
+    verbosity: int = 1,
+    profile: bool = False,
+    progress_interval: Optional[float] = None,
+):
+    experiments = []
     for root, subdirs, files in os.walk(RESULTS_FOLDER):
         if experiment_folder_identifier not in root:
             continue
@@ -164,4 +471,7 @@ def calculate_experiment_distances(experiment_folder_identifier, verbosity: int
             continue
         result_files = list(filter(lambda x: x.endswith("_results.tsv"), files))
         if len(result_files) > 0:
-            calculate_distances_for_experiment(root, result_files, verbosity=verbosity)
+            experiments.append((root, result_files))
+    _calculate_distances_for_experiments(
+        experiments, verbosity, profile, progress_interval
+    )
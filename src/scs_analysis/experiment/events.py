@@ -0,0 +1,235 @@
+"""
+A structured log of where the time of the pipeline goes.
+
+With an event log configured (see configure_event_log), each phase of a
+job is recorded as a JSON line with its start time, duration and the size
+of the data it handled. The phases are reading input, running the method,
+parsing the estimated tree, making trees bifurcating, calculating each
+metric and writing results. The log file is rotated once it grows large,
+and event_report aggregates the log (with its rotated files) by method
+and phase.
+
+Phases timed in distance calculation processes are captured there and
+logged by the parent process, so that only one process writes the log.
+"""
+
+import glob
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+EVENT_LOGGER_NAME = "scs_analysis.events"
+
+DEFAULT_MAX_BYTES = 50 * 2**20
+DEFAULT_BACKUP_COUNT = 5
+
+# Phases
+READ = "read"
+RUN = "run"
+PARSE = "parse"
+BIFURCATE = "bifurcate"
+METRIC = "metric"
+WRITE = "write"
+
+_logger = logging.getLogger(EVENT_LOGGER_NAME)
+_logger.propagate = False
+_logger.setLevel(logging.INFO)
+
+# The capture buffer and context fields of each thread
+_local = threading.local()
+
+
+class _JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, default=str)
+
+
+def configure_event_log(
+    file_path: str,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    backup_count: int = DEFAULT_BACKUP_COUNT,
+) -> None:
+    """
+    Starts logging phase events to a file, replacing any earlier event log.
+
+    Args:
+        file_path (str): The log file, appended to if it exists.
+        max_bytes (int): Size after which the file is rotated.
+        backup_count (int): Number of rotated files to keep.
+    """
+    close_event_log()
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        file_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    handler.setFormatter(_JsonLinesFormatter())
+    _logger.addHandler(handler)
+
+
+def close_event_log() -> None:
+    for handler in list(_logger.handlers):
+        _logger.removeHandler(handler)
+        handler.close()
+
+
+def events_enabled() -> bool:
+    """
+    Whether phase events are being logged (or captured) by this thread.
+    """
+    return getattr(_local, "events", None) is not None or len(_logger.handlers) > 0
+
+
+def log_event(event: Dict[str, Any]) -> None:
+    events = getattr(_local, "events", None)
+    if events is not None:
+        events.append(event)
+    elif len(_logger.handlers) > 0:
+        _logger.info(event)
+
+
+def log_events(events: List[Dict[str, Any]]) -> None:
+    for event in events:
+        log_event(event)
+
+
+@contextmanager
+def event_context(**fields: Any) -> Iterator[None]:
+    """
+    Adds the fields (such as the method and source tree file) to the
+    events of the phases in the body.
+    """
+    previous = getattr(_local, "context", {})
+    _local.context = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _local.context = previous
+
+
+@contextmanager
+def captured_events(capture: bool = True) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Collects the events of the phases in the body into the yielded list
+    instead of logging them. Nothing is collected if capture is False.
+    """
+    events: List[Dict[str, Any]] = []
+    if not capture:
+        yield events
+        return
+    previous = getattr(_local, "events", None)
+    _local.events = events
+    try:
+        yield events
+    finally:
+        _local.events = previous
+
+
+@contextmanager
+def phase(name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Times the body as a phase. The body may add fields to the yielded
+    event, such as the size of what it produced.
+    """
+    if not events_enabled():
+        yield {}
+        return
+    event = {
+        "time": time.time(),
+        "phase": name,
+        **getattr(_local, "context", {}),
+        **fields,
+    }
+    start = time.perf_counter()
+    try:
+        yield event
+    except BaseException as e:
+        event["error"] = type(e).__name__
+        raise
+    finally:
+        event["duration"] = time.perf_counter() - start
+        event["pid"] = os.getpid()
+        log_event(event)
+
+
+def file_size(file_path: str) -> Optional[int]:
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return None
+
+
+def read_events(file_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    The events of a log, oldest first, including its rotated files.
+    """
+    rotated = glob.glob(glob.escape(file_path) + ".*")
+    rotated = [path for path in rotated if path.rsplit(".", 1)[1].isdigit()]
+    rotated.sort(key=lambda path: -int(path.rsplit(".", 1)[1]))
+    for path in rotated + [file_path]:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line cut short by an interrupted run
+
+
+def phase_totals(
+    events: Iterator[Dict[str, Any]]
+) -> Dict[Tuple[str, str], Tuple[int, float, int]]:
+    """
+    The number of events, total duration and total bytes of each method
+    and phase (metrics are split by metric).
+    """
+    totals: Dict[Tuple[str, str], Tuple[int, float, int]] = {}
+    for event in events:
+        name = event["phase"]
+        if "metric" in event:
+            name += ":" + event["metric"]
+        key = (str(event.get("method", "-")), name)
+        count, duration, size = totals.get(key, (0, 0.0, 0))
+        totals[key] = (
+            count + 1,
+            duration + event["duration"],
+            size + (event.get("bytes") or 0),
+        )
+    return totals
+
+
+def event_report(file_path: str, method: Optional[str] = None) -> str:
+    """
+    A table of the time spent in each phase of each method, with its share
+    of the method's total time and the rate data was handled at.
+    """
+    totals = phase_totals(read_events(file_path))
+    method_durations: Dict[str, float] = {}
+    for (event_method, _), (_, duration, _) in totals.items():
+        method_durations[event_method] = (
+            method_durations.get(event_method, 0.0) + duration
+        )
+
+    lines = [
+        f"{'method':<12} {'phase':<28} {'count':>8} {'total':>10} "
+        f"{'mean':>10} {'share':>7} {'MB/s':>8}"
+    ]
+    for (event_method, name), (count, duration, size) in sorted(totals.items()):
+        if method is not None and event_method != method:
+            continue
+        share = duration / method_durations[event_method] if duration > 0 else 0.0
+        rate = f"{size / 2**20 / duration:.2f}" if size > 0 and duration > 0 else "-"
+        lines.append(
+            f"{event_method:<12} {name:<28} {count:>8} {duration:>9.2f}s "
+            f"{duration / count:>9.4f}s {share:>7.1%} {rate:>8}"
+        )
+    return "\n".join(lines)
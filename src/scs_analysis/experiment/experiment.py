@@ -1,10 +1,14 @@
+import hashlib
+import importlib.metadata
+import json
 import os
 import random
-import subprocess
 import sys
 import time
 
-from typing import List, Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
 
 from cogent3 import make_tree
 from cogent3.core.tree import TreeNode
@@ -13,6 +17,31 @@ from scs_analysis.distance.distance import (
     matching_cluster_distance,
     rooted_rf_distance,
 )
+from scs_analysis.experiment.result_files import (
+    append_record,
+    needs_recovery,
+    read_records,
+    recover_records,
+    remove_records,
+    update_records,
+)
+from scs_analysis.experiment.events import (
+    BIFURCATE,
+    PARSE,
+    RUN,
+    WRITE,
+    file_size,
+    phase,
+)
+from scs_analysis.experiment.timing import RunStats, parse_run_stats, run_command
+from scs_analysis.perf.profiling import PROFILE_ENV
+from scs_analysis.storage.results_index import RecordIndex, record_index
+from scs_analysis.storage.tree_cache import load_tree
+from scs_analysis.storage.tree_store import TreeStore, is_tree_ref
+
+
+if TYPE_CHECKING:
+    from scs_analysis.experiment.distance_calculator import DistancePool
 
 
 SUPER_TRIPLET_D = (25, 50, 75)
@@ -48,6 +77,12 @@ METHODS = {
 SCRIPT_PATH = "scripts/method_scripts/"
 RESULTS_FOLDER = "results/"
 
+# Format of the files written by the distance calculator's DistanceLogger
+DISTANCE_FILE_SUFFIX = "_results_with_distances.tsv"
+DISTANCE_NUM_FIELDS = 11
+RUN_STATS_FILE_SUFFIX = "_run_stats.tsv"
+KEY_FILE_SUFFIX = "_results_keys.tsv"
+
 SCRIPTS = {
     SUP: "run_sup.sh",
     SCS: "run_scs.sh",
@@ -60,11 +95,117 @@ SCRIPTS = {
 OPTIONS = {}
 DEFAULT_OPTIONS = []
 
+# Files the method scripts run, beyond the script itself
+METHOD_SOURCES = {
+    SCS: ["methods/scs/run_scs.py"],
+    SCS_FAST: ["methods/scs/run_scs.py"],
+    MCS: ["methods/mcs/run_mcs.py", "methods/mcs/min_cut_supertree.py"],
+    BCDG: ["methods/bcd/BCDSupertrees.jar"],
+    BCDN: ["methods/bcd/BCDSupertrees.jar"],
+}
+
+# Installed packages the method scripts run
+METHOD_PACKAGES = {
+    SCS: ["sc-supertree", "cogent3"],
+    SCS_FAST: ["sc-supertree", "cogent3"],
+    MCS: ["sc-supertree", "cogent3", "networkx"],
+}
+
+
+@lru_cache(maxsize=None)
+def _file_digest(file_path: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_digest(file_path: str) -> Optional[str]:
+    """
+    The SHA-256 digest of a file's contents, or None if it does not exist.
+    """
+    if not os.path.exists(file_path):
+        return None
+    stat = os.stat(file_path)
+    return _file_digest(file_path, stat.st_mtime_ns, stat.st_size)
+
+
+def _package_version(package: str) -> Optional[str]:
+    try:
+        return importlib.metadata.version(package)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def job_key(
+    method: str,
+    source_tree_file: str,
+    seed: Optional[int] = None,
+    force_bifurcating: bool = False,
+) -> str:
+    """
+    Content-addressed key of a method run.
+
+    The key changes whenever the contents of the source trees, the method
+    script (and the files and package versions it runs), the method's
+    options, the seed or forced bifurcation change.
+
+    Args:
+        method (str): The supertree method.
+        source_tree_file (str): Path to the source trees.
+        seed (Optional[int]): The seed of the run, None if the run is not
+            meant to be reproducible from its seed.
+        force_bifurcating (bool): Whether the resulting tree is made bifurcating.
+
+    Returns:
+        str: The hexadecimal key.
+    """
+    script = SCRIPT_PATH + SCRIPTS[method]
+    content = {
+        "method": method,
+        "source_trees": file_digest(source_tree_file),
+        "sources": {
+            path: file_digest(path) for path in [script, *METHOD_SOURCES.get(method, [])]
+        },
+        "packages": {
+            package: _package_version(package)
+            for package in METHOD_PACKAGES.get(method, [])
+        },
+        "options": OPTIONS.get(method, DEFAULT_OPTIONS),
+        "seed": seed,
+        "force_bifurcating": force_bifurcating,
+    }
+    return hashlib.sha256(
+        json.dumps(content, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
 
 class ResultsLogger:
-    def __init__(self, results_folder: str, experiment_directory: str) -> None:
+    """
+    Writes the results of method runs, one tab separated file per method.
+
+    Alongside each results file, the key (see job_key) of the run that
+    produced each record is kept in a keys file. Results without a
+    recorded key predate keys and are trusted as they are. The resource
+    usage of runs (see RunStats) is kept in a run stats file. Estimated
+    trees are kept in the tree store of the experiment directory, and
+    referenced from the results by hash. Records are looked up by source
+    tree file through the sidecar index of each file (see RecordIndex).
+    """
+
+    NUM_FIELDS = 5
+    NUM_KEY_FIELDS = 2
+    NUM_RUN_STATS_FIELDS = 7
+
+    def __init__(
+        self, results_folder: str, experiment_directory: str, verbosity: int = 1
+    ) -> None:
         self.write_directory = results_folder + experiment_directory
         self.file_suffix = "_results.tsv"
+        self.key_file_suffix = KEY_FILE_SUFFIX
+        self.run_stats_file_suffix = RUN_STATS_FILE_SUFFIX
+        self.tree_store = TreeStore(self.write_directory)
 
         if not os.path.exists(self.write_directory):
             try:
@@ -74,17 +215,77 @@ class ResultsLogger:
                 if not os.path.exists(self.write_directory):
                     raise e
 
-    def result_already_exists(self, method: str, source_tree_file: str) -> bool:
-        file_path = self.format_file_path(method)
-        if not os.path.exists(file_path):
-            return False
+        self.recover(verbosity=verbosity)
 
-        with open(file_path, "r") as f:
-            for line in f:
-                mtf, stf, wall_time, cpu_time, tree = line.strip("\n").split("\t")
-                if stf == source_tree_file:
-                    return True
-        return False
+    def recover(self, verbosity: int = 1) -> None:
+        """
+        Repairs result files left inconsistent by an interrupted run.
+        """
+        for file in sorted(os.listdir(self.write_directory)):
+            if not file.endswith(".tsv"):
+                continue
+            file_path = self.write_directory + file
+            if needs_recovery(file_path):
+                recover_records(file_path, verbosity=verbosity)
+
+    def result_key(self, method: str, source_tree_file: str) -> Optional[str]:
+        """
+        The key of the run that produced the result for a source tree file,
+        or None if the result has no recorded key.
+        """
+        record = self.key_index(method).record(source_tree_file)
+        if record is None:
+            return None
+        return record[1]
+
+    def result_already_exists(
+        self, method: str, source_tree_file: str, key: Optional[str] = None
+    ) -> bool:
+        """
+        Whether there is a result for the method on the source tree file.
+
+        If a key is given, a result produced by a run with a different
+        key is stale and does not count.
+        """
+        if source_tree_file not in self.results_index(method):
+            return False
+        if key is None:
+            return True
+        recorded_key = self.result_key(method, source_tree_file)
+        return recorded_key is None or recorded_key == key
+
+    def read_result(self, method: str, source_tree_file: str) -> Optional[List[str]]:
+        """
+        The fields of the result for the method on the source tree file,
+        None if there is none.
+        """
+        return self.results_index(method).record(source_tree_file)
+
+    def discard_results(self, method: str, source_tree_file: str) -> None:
+        """
+        Removes the results (and any distances calculated from them) for
+        the method on the source tree file.
+        """
+        # Each file with the column its source tree file is recorded in
+        for file_path, num_fields, column in (
+            (self.format_file_path(method), self.NUM_FIELDS, 1),
+            (self.format_key_file_path(method), self.NUM_KEY_FIELDS, 0),
+            (
+                self.format_run_stats_file_path(method),
+                self.NUM_RUN_STATS_FIELDS,
+                0,
+            ),
+            (
+                self.write_directory + method + DISTANCE_FILE_SUFFIX,
+                DISTANCE_NUM_FIELDS,
+                1,
+            ),
+        ):
+            remove_records(
+                file_path,
+                num_fields,
+                lambda parts: parts[column] == source_tree_file,
+            )
 
     def write_results(
         self,
@@ -94,24 +295,277 @@ class ResultsLogger:
         wall_time: float,
         cpu_time: float,
         tree: TreeNode,
+        key: Optional[str] = None,
     ) -> None:
-        with open(self.format_file_path(method), "a") as f:
-            f.write(
-                str(model_tree_file)
-                + "\t"
-                + source_tree_file
-                + "\t"
-                + str(wall_time)
-                + "\t"
-                + str(cpu_time)
-                + "\t"
-                + str(tree)
-                + "\n",
-            )
+        parts = [
+            str(model_tree_file),
+            source_tree_file,
+            str(wall_time),
+            str(cpu_time),
+            self.tree_store.store(tree),
+        ]
+        with phase(
+            WRITE,
+            method=method,
+            source_tree_file=source_tree_file,
+            bytes=sum(map(len, parts)),
+        ):
+            if key is not None:
+                # Replace any stale result (the files are only rewritten if
+                # there is one, found through the indexes)
+                if (
+                    source_tree_file in self.results_index(method)
+                    or source_tree_file in self.key_index(method)
+                ):
+                    self.discard_results(method, source_tree_file)
+                append_record(
+                    self.format_key_file_path(method), [source_tree_file, key]
+                )
+                self.key_index(method).refresh()
+            append_record(self.format_file_path(method), parts)
+            self.results_index(method).refresh()
+
+    def write_run_stats(
+        self, method: str, source_tree_file: str, stats: RunStats
+    ) -> None:
+        append_record(
+            self.format_run_stats_file_path(method),
+            [
+                source_tree_file,
+                str(stats.max_rss_kb),
+                str(stats.voluntary_switches),
+                str(stats.involuntary_switches),
+                str(stats.max_load),
+                str(stats.cpu),
+                str(stats.disturbed),
+            ],
+        )
+
+    def read_run_stats(self, method: str) -> Dict[str, RunStats]:
+        """
+        The recorded resource usage of each run of the method, by source
+        tree file.
+        """
+        file_path = self.format_run_stats_file_path(method)
+        if not os.path.exists(file_path):
+            return {}
+        return {
+            parts[0]: parse_run_stats(parts[1:])
+            for parts in read_records(file_path, self.NUM_RUN_STATS_FIELDS)
+        }
+
+    def results_index(self, method: str) -> RecordIndex:
+        return record_index(self.format_file_path(method), self.NUM_FIELDS, 1)
+
+    def key_index(self, method: str) -> RecordIndex:
+        return record_index(
+            self.format_key_file_path(method), self.NUM_KEY_FIELDS, 0
+        )
 
     def format_file_path(self, method: str) -> str:
         return self.write_directory + method + self.file_suffix
 
+    def format_key_file_path(self, method: str) -> str:
+        return self.write_directory + method + self.key_file_suffix
+
+    def format_run_stats_file_path(self, method: str) -> str:
+        return self.write_directory + method + self.run_stats_file_suffix
+
+
+def store_result_trees(results_folder: str = RESULTS_FOLDER, verbosity: int = 1) -> int:
+    """
+    Moves the trees held in full in the results and distance files of the
+    results folder into the tree stores of their experiment directories.
+
+    Returns:
+        int: The number of records whose tree was moved.
+    """
+    moved = 0
+    for root, subdirs, files in os.walk(results_folder):
+        store = TreeStore(root)
+
+        def update(parts: List[str]) -> Optional[List[str]]:
+            # The tree is the last field of both kinds of file
+            if is_tree_ref(parts[-1]) or parts[-1] == str(None):
+                return None
+            return parts[:-1] + [store.put(parts[-1])]
+
+        for file in sorted(files):
+            if file.endswith(DISTANCE_FILE_SUFFIX):
+                num_fields = DISTANCE_NUM_FIELDS
+            elif file.endswith("_results.tsv"):
+                num_fields = ResultsLogger.NUM_FIELDS
+            else:
+                continue
+            file_moved = update_records(os.path.join(root, file), num_fields, update)
+            if verbosity >= 1 and file_moved > 0:
+                print(f"Moved {file_moved} trees of {os.path.join(root, file)}")
+            moved += file_moved
+    return moved
+
+
+def index_results(
+    results_folder: str = RESULTS_FOLDER, rebuild: bool = False, verbosity: int = 1
+) -> int:
+    """
+    Brings the sidecar indexes of the results, keys and distance files of
+    the results folder up to date.
+
+    Args:
+        results_folder (str): The results folder.
+        rebuild (bool): Whether to index each file from scratch.
+        verbosity (int): Verbosity level.
+
+    Returns:
+        int: The number of files indexed.
+    """
+    indexed = 0
+    for root, subdirs, files in os.walk(results_folder):
+        for file in sorted(files):
+            if file.endswith(DISTANCE_FILE_SUFFIX):
+                num_fields, key_column = DISTANCE_NUM_FIELDS, 1
+            elif file.endswith("_results.tsv"):
+                num_fields, key_column = ResultsLogger.NUM_FIELDS, 1
+            elif file.endswith("_results_keys.tsv"):
+                num_fields, key_column = ResultsLogger.NUM_KEY_FIELDS, 0
+            else:
+                continue
+            index = record_index(os.path.join(root, file), num_fields, key_column)
+            if rebuild:
+                index.rebuild()
+            else:
+                index.refresh()
+            indexed += 1
+            if verbosity >= 2:
+                print(f"Indexed {len(index)} records of {os.path.join(root, file)}")
+    return indexed
+
+
+@dataclass
+class Job:
+    """A single supertree method run over one source tree file."""
+
+    method: str
+    source_tree_file: str
+    model_tree_file: str
+    experiment_directory: str
+    seed: Optional[int] = None
+    key: Optional[str] = None
+
+
+def attach_job_keys(
+    jobs: Sequence[Job], force_bifurcating: bool = False, seeded: bool = True
+) -> None:
+    """
+    Sets the content-addressed key of each job.
+
+    Args:
+        jobs (Sequence[Job]): The jobs.
+        force_bifurcating (bool): Whether resulting trees are made bifurcating.
+        seeded (bool): Whether the seeds are part of the keys. When the seeds
+            were not chosen reproducibly (e.g. drawn from the system time),
+            a result of any earlier seed is reused.
+    """
+    for job in jobs:
+        job.key = job_key(
+            job.method,
+            job.source_tree_file,
+            seed=job.seed if seeded else None,
+            force_bifurcating=force_bifurcating,
+        )
+
+
+def run_method_measured(
+    method: str,
+    source_tree_file: str,
+    seed: Optional[int] = None,
+    force_bifurcating: bool = False,
+    verbosity: int = 1,
+    cpu: Optional[int] = None,
+    profile_file: Optional[str] = None,
+    workers: int = 1,
+) -> Tuple[Optional[TreeNode], float, Optional[float], RunStats]:
+    """
+    Runs a supertree method script over a source tree file.
+
+    Args:
+        method (str): The supertree method to run.
+        source_tree_file (str): Path to the source trees.
+        seed (Optional[int]): Random seed passed to the method (used by SCS).
+        force_bifurcating (bool): Whether the resulting tree is made bifurcating.
+        verbosity (int): Verbosity level.
+        cpu (Optional[int]): If given, the run is pinned to this logical CPU.
+        profile_file (Optional[str]): If given, Python methods write a
+            profile of the run to this file.
+        workers (int): The number of methods run alongside each other.
+
+    Returns:
+        Tuple[Optional[TreeNode], float, Optional[float], RunStats]: The
+        estimated tree (None on failure), the wall time and the CPU time
+        of the run, and its resource usage.
+    """
+    command = [
+        SCRIPT_PATH + SCRIPTS[method],
+        *OPTIONS.get(method, DEFAULT_OPTIONS),
+    ]
+    if seed is not None:
+        command.extend(["-s", str(seed)])
+    command.append(source_tree_file)
+
+    if verbosity >= 1:
+        print(" ".join(command))
+
+    env = None
+    if profile_file is not None:
+        os.makedirs(os.path.dirname(profile_file), exist_ok=True)
+        env = dict(os.environ, **{PROFILE_ENV: os.path.abspath(profile_file)})
+
+    fields = {"method": method, "source_tree_file": source_tree_file}
+    with phase(RUN, bytes=file_size(source_tree_file), **fields):
+        start_time = time.time()
+        stdout, stderr, stats = run_command(
+            command, cpu=cpu, env=env, workers=workers
+        )
+        end_time = time.time()
+
+    try:
+        with phase(PARSE, bytes=len(stdout), **fields):
+            tree = make_tree(stdout.decode("utf-8").strip())  # type: ignore
+        cpu_time = sum(map(float, stderr.decode("utf-8").strip().split("_")))
+        if force_bifurcating:
+            with phase(BIFURCATE, **fields):
+                tree = tree.bifurcating()
+    except Exception as e:
+        print(e)
+        tree = None
+        cpu_time = None
+
+    return tree, end_time - start_time, cpu_time, stats
+
+
+def run_method(
+    method: str,
+    source_tree_file: str,
+    seed: Optional[int] = None,
+    force_bifurcating: bool = False,
+    verbosity: int = 1,
+) -> Tuple[Optional[TreeNode], float, Optional[float]]:
+    """
+    Runs a supertree method script over a source tree file.
+
+    Returns:
+        Tuple[Optional[TreeNode], float, Optional[float]]: The estimated tree
+        (None on failure), the wall time and the CPU time of the run.
+    """
+    tree, wall_time, cpu_time, _ = run_method_measured(
+        method,
+        source_tree_file,
+        seed=seed,
+        force_bifurcating=force_bifurcating,
+        verbosity=verbosity,
+    )
+    return tree, wall_time, cpu_time
+
 
 def run_methods(
     source_tree_file: str,
@@ -122,14 +576,23 @@ def run_methods(
     calculate_distances: bool = True,
     logger: Optional[ResultsLogger] = None,
     rng: Optional[random.Random] = None,
+    distance_pool: Optional["DistancePool"] = None,
 ):
+    """
+    Runs the supertree methods over a source tree file.
+
+    If a distance pool is given (and results are logged), each estimated
+    tree is handed to the pool as soon as it is produced so its distances
+    are calculated while the remaining methods run.
+    """
     if rng is None:
         rng = random.Random()
 
     results = {}
     for method in methods:
+        key = job_key(method, source_tree_file, force_bifurcating=force_bifurcating)
         if logger is not None:
-            if logger.result_already_exists(method, source_tree_file):
+            if logger.result_already_exists(method, source_tree_file, key):
                 if verbosity >= 1:
                     print(
                         "Result already exists for",
@@ -142,46 +605,40 @@ def run_methods(
         if verbosity >= 2:
             print("Running Method", method)
 
-        command = [
-            SCRIPT_PATH + SCRIPTS[method],
-            *OPTIONS.get(method, DEFAULT_OPTIONS),
-        ]
-        if "SCS" in method:
-            command.extend(["-s", str(rng.randrange(2**32))])
-        command.append(source_tree_file)
-
-        if verbosity >= 1:
-            print(" ".join(command))
-
-        start_time = time.time()
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        end_time = time.time()
-
-        try:
-            tree = make_tree(result.stdout.decode("utf-8").strip())  # type: ignore
-            cpu_time = sum(map(float, result.stderr.decode("utf-8").strip().split("_")))
-            if force_bifurcating:
-                tree = tree.bifurcating()
-        except Exception as e:
-            print(e)
-            tree = None
-            cpu_time = None
+        seed = rng.randrange(2**32) if "SCS" in method else None
+        tree, wall_time, cpu_time, stats = run_method_measured(
+            method,
+            source_tree_file,
+            seed=seed,
+            force_bifurcating=force_bifurcating,
+            verbosity=verbosity,
+        )
 
-        results[method] = (tree, end_time - start_time)
+        results[method] = (tree, wall_time)
 
         if logger is not None:
             logger.write_results(
-                method, model_tree_file, source_tree_file, end_time - start_time, cpu_time, tree  # type: ignore
+                method, model_tree_file, source_tree_file, wall_time, cpu_time, tree, key  # type: ignore
             )
+            logger.write_run_stats(method, source_tree_file, stats)
+            if distance_pool is not None:
+                distance_pool.submit(
+                    logger.write_directory,
+                    method,
+                    model_tree_file,
+                    source_tree_file,
+                    wall_time,
+                    cpu_time,
+                    tree,
+                )
 
-    with open(model_tree_file, "r") as f:
-        model = make_tree(f.read().strip())
-        if "SMIDGenOutgrouped" in model_tree_file:
-            model = model.get_sub_tree(
-                set(model.get_tip_names()).difference(("OUTGROUP",))
-            )
-        if force_bifurcating:
-            model = model.bifurcating()
+    model = load_tree(model_tree_file)
+    if "SMIDGenOutgrouped" in model_tree_file:
+        model = model.get_sub_tree(
+            set(model.get_tip_names()).difference(("OUTGROUP",))
+        )
+    if force_bifurcating:
+        model = model.bifurcating()
 
     for method in methods:
         if method not in results:
@@ -204,112 +661,167 @@ def run_methods(
     return results
 
 
-def run_experiment_super_triplets(
-    d: int,
-    k: int,
-    methods: List,
-    verbosity: int = 1,
-    calculate_distances: bool = True,
-    result_logging: bool = False,
-    rng: Optional[random.Random] = None,
-):
+def super_triplets_files(d: int, k: int) -> Tuple[str, List[Tuple[str, str]]]:
     assert d in SUPER_TRIPLET_D
     assert k in SUPER_TRIPLET_K
 
-    if rng is None:
-        rng = random.Random()
-
-    if result_logging:
-        logger = ResultsLogger(RESULTS_FOLDER, f"SuperTripletsBenchmark/d{d}/k{k}/")
-    else:
-        logger = None
-
     number_of_experiments = 100
 
+    files = []
     for i in range(number_of_experiments):
         tree_number = i + 1
         source_file = f"data/SuperTripletsBenchmark/source-trees/d{d}/k{k}/data-d{d}-k{k}-{tree_number}_phybp-s0r.nwk.source_trees"
         model_file = f"data/SuperTripletsBenchmark/model-trees/model-{tree_number}.nwk.model_tree"
-        print(f"Results for {i} ({source_file}):")
-        run_methods(
-            source_file,
-            model_file,
-            methods,
-            verbosity=verbosity,
-            calculate_distances=calculate_distances,
-            logger=logger,
-            rng=rng,
-        )
+        files.append((source_file, model_file))
+    return f"SuperTripletsBenchmark/d{d}/k{k}/", files
 
 
-def run_experiment_smidgen_og(
-    taxa: int,
-    density: int,
-    methods: List,
-    verbosity: int = 1,
-    calculate_distances: bool = True,
-    result_logging: bool = False,
-    rng: Optional[random.Random] = None,
-):
+def smidgen_og_files(taxa: int, density: int) -> Tuple[str, List[Tuple[str, str]]]:
     assert taxa in SMIDGEN_OG_NORMAL_TAXA or taxa == 10000
     if taxa == 10000:
         assert density == 0
     else:
         assert density in SMIDGEN_OG_DENSITY
 
-    if rng is None:
-        rng = random.Random()
-
-    if result_logging:
-        logger = ResultsLogger(RESULTS_FOLDER, f"SMIDGenOutgrouped/{taxa}/{density}/")
-    else:
-        logger = None
-
     number_of_experiments = 30 if taxa != 10000 else 10
 
+    files = []
     for i in range(number_of_experiments):
         source_file = f"data/SMIDGenOutgrouped/{taxa}/{density}/Source_Trees/RaxML/smo.{i}.sourceTrees.tre"
         model_file = f"data/SMIDGenOutgrouped/{taxa}/{density}/Model_Trees/pruned/smo.{i}.modelTree.tre"
-        if verbosity >= 1:
-            print(f"Results for {i} ({source_file}):")
-        run_methods(
-            source_file,
-            model_file,
-            methods,
-            verbosity=verbosity,
-            calculate_distances=calculate_distances,
-            logger=logger,
-            rng=rng,
-        )
+        files.append((source_file, model_file))
+    return f"SMIDGenOutgrouped/{taxa}/{density}/", files
 
 
-def run_experiment_dcm_exact(
-    taxa: int,
-    subtree_size: int,
+def dcm_exact_files(
+    taxa: int, subtree_size: int
+) -> Tuple[str, List[Tuple[str, str]]]:
+    assert taxa in DCM_TAXA
+    assert subtree_size in DCM_SUBTREE_SIZE
+
+    number_of_experiments = 10
+
+    files = []
+    for i in range(number_of_experiments):
+        source_file = f"data/birth_death/{taxa}/dcm_source_trees/{subtree_size}/bd.{i}.source_trees"
+        model_file = f"data/birth_death/{taxa}/model_trees/bd.{i}.model_tree"
+        files.append((source_file, model_file))
+    return f"birth_death/{taxa}/dcm_source_trees/{subtree_size}/", files
+
+
+def dcm_files(taxa: int, subtree_size: int) -> Tuple[str, List[Tuple[str, str]]]:
+    assert taxa in DCM_TAXA
+    assert subtree_size in DCM_SUBTREE_SIZE
+
+    number_of_experiments = 10
+
+    files = []
+    for i in range(number_of_experiments):
+        source_file = f"data/birth_death/{taxa}/iq_source_trees/{subtree_size}/bd.{i}.source_trees"
+        model_file = f"data/birth_death/{taxa}/model_trees/bd.{i}.model_tree"
+        files.append((source_file, model_file))
+    return f"birth_death/{taxa}/iq_source_trees/{subtree_size}/", files
+
+
+# Dataset name -> (file listing, default first parameters, default second parameters)
+DATASETS: Dict[
+    str,
+    Tuple[
+        Callable[[int, int], Tuple[str, List[Tuple[str, str]]]],
+        Sequence[int],
+        Sequence[int],
+    ],
+] = {
+    "supertriplets": (super_triplets_files, SUPER_TRIPLET_D, SUPER_TRIPLET_K),
+    "smidgenog": (smidgen_og_files, SMIDGEN_OG_NORMAL_TAXA, SMIDGEN_OG_DENSITY),
+    "smidgenog10000": (smidgen_og_files, (10000,), (0,)),
+    "dcmexact": (dcm_exact_files, DCM_TAXA, DCM_SUBTREE_SIZE),
+    "dcm": (dcm_files, DCM_TAXA, DCM_SUBTREE_SIZE),
+}
+
+
+def dataset_files(dataset_name: str) -> List[Tuple[str, str]]:
+    """
+    The (source tree file, model tree file) pairs of all of a dataset's
+    parameters.
+    """
+    files_function, params_1, params_2 = DATASETS[dataset_name]
+    files = []
+    for param_1 in params_1:
+        for param_2 in params_2:
+            try:
+                files.extend(files_function(param_1, param_2)[1])
+            except AssertionError:
+                continue  # Not every combination exists (e.g. 10000 taxa SMIDGen)
+    return files
+
+
+def experiment_jobs(
+    dataset_name: str,
+    dataset_params: Tuple[int, int],
+    methods: List[str],
+    rng: Optional[random.Random] = None,
+) -> List[Job]:
+    """
+    Expands a dataset and its parameters into the grid of method runs.
+
+    A parameter of 0 expands to all of that dataset's values. Seeds for
+    SCS runs are drawn from the rng in grid order so the seeds do not
+    depend on the order the jobs are later run in.
+
+    Args:
+        dataset_name (str): One of the keys of DATASETS.
+        dataset_params (Tuple[int, int]): The dataset parameters.
+        methods (List[str]): The supertree methods to run.
+        rng (Optional[random.Random]): Source of the SCS seeds.
+
+    Returns:
+        List[Job]: The jobs in grid order.
+    """
+    if dataset_name not in DATASETS:
+        raise ValueError("Invalid Experiment")
+
+    if rng is None:
+        rng = random.Random()
+
+    files_function, default_params_1, default_params_2 = DATASETS[dataset_name]
+    if dataset_name == "smidgenog10000":
+        params_1, params_2 = default_params_1, default_params_2
+    else:
+        params_1 = default_params_1 if dataset_params[0] == 0 else [dataset_params[0]]
+        params_2 = default_params_2 if dataset_params[1] == 0 else [dataset_params[1]]
+
+    jobs = []
+    for param_1 in params_1:
+        for param_2 in params_2:
+            experiment_directory, files = files_function(param_1, param_2)
+            for source_file, model_file in files:
+                for method in methods:
+                    seed = rng.randrange(2**32) if "SCS" in method else None
+                    jobs.append(
+                        Job(method, source_file, model_file, experiment_directory, seed)
+                    )
+    return jobs
+
+
+def run_experiment_files(
+    experiment_directory: str,
+    files: List[Tuple[str, str]],
     methods: List,
     verbosity: int = 1,
     calculate_distances: bool = True,
     result_logging: bool = False,
     rng: Optional[random.Random] = None,
 ):
-    assert taxa in DCM_TAXA
-    assert subtree_size in DCM_SUBTREE_SIZE
-
     if rng is None:
         rng = random.Random()
 
     if result_logging:
-        logger = ResultsLogger(
-            RESULTS_FOLDER, f"birth_death/{taxa}/dcm_source_trees/{subtree_size}/"
-        )
+        logger = ResultsLogger(RESULTS_FOLDER, experiment_directory)
     else:
         logger = None
 
-    number_of_experiments = 10
-
-    for i in range(number_of_experiments):
-        source_file = f"data/birth_death/{taxa}/dcm_source_trees/{subtree_size}/bd.{i}.source_trees"
-        model_file = f"data/birth_death/{taxa}/model_trees/bd.{i}.model_tree"
+    for i, (source_file, model_file) in enumerate(files):
         if verbosity >= 1:
             print(f"Results for {i} ({source_file}):")
         run_methods(
@@ -323,41 +835,77 @@ def run_experiment_dcm_exact(
         )
 
 
-def run_experiment_dcm(
+def run_experiment_super_triplets(
+    d: int,
+    k: int,
+    methods: List,
+    verbosity: int = 1,
+    calculate_distances: bool = True,
+    result_logging: bool = False,
+    rng: Optional[random.Random] = None,
+):
+    run_experiment_files(
+        *super_triplets_files(d, k),
+        methods,
+        verbosity=verbosity,
+        calculate_distances=calculate_distances,
+        result_logging=result_logging,
+        rng=rng,
+    )
+
+
+def run_experiment_smidgen_og(
     taxa: int,
-    subtree_size: int,
+    density: int,
     methods: List,
     verbosity: int = 1,
     calculate_distances: bool = True,
     result_logging: bool = False,
     rng: Optional[random.Random] = None,
 ):
-    assert taxa in DCM_TAXA
-    assert subtree_size in DCM_SUBTREE_SIZE
+    run_experiment_files(
+        *smidgen_og_files(taxa, density),
+        methods,
+        verbosity=verbosity,
+        calculate_distances=calculate_distances,
+        result_logging=result_logging,
+        rng=rng,
+    )
 
-    if rng is None:
-        rng = random.Random()
 
-    if result_logging:
-        logger = ResultsLogger(
-            RESULTS_FOLDER, f"birth_death/{taxa}/iq_source_trees/{subtree_size}/"
-        )
-    else:
-        logger = None
+def run_experiment_dcm_exact(
+    taxa: int,
+    subtree_size: int,
+    methods: List,
+    verbosity: int = 1,
+    calculate_distances: bool = True,
+    result_logging: bool = False,
+    rng: Optional[random.Random] = None,
+):
+    run_experiment_files(
+        *dcm_exact_files(taxa, subtree_size),
+        methods,
+        verbosity=verbosity,
+        calculate_distances=calculate_distances,
+        result_logging=result_logging,
+        rng=rng,
+    )
 
-    number_of_experiments = 10
 
-    for i in range(number_of_experiments):
-        source_file = f"data/birth_death/{taxa}/iq_source_trees/{subtree_size}/bd.{i}.source_trees"
-        model_file = f"data/birth_death/{taxa}/model_trees/bd.{i}.model_tree"
-        if verbosity >= 1:
-            print(f"Results for {i} ({source_file}):")
-        run_methods(
-            source_file,
-            model_file,
-            methods,
-            verbosity=verbosity,
-            calculate_distances=calculate_distances,
-            logger=logger,
-            rng=rng,
-        )
+def run_experiment_dcm(
+    taxa: int,
+    subtree_size: int,
+    methods: List,
+    verbosity: int = 1,
+    calculate_distances: bool = True,
+    result_logging: bool = False,
+    rng: Optional[random.Random] = None,
+):
+    run_experiment_files(
+        *dcm_files(taxa, subtree_size),
+        methods,
+        verbosity=verbosity,
+        calculate_distances=calculate_distances,
+        result_logging=result_logging,
+        rng=rng,
+    )
@@ -1,8 +1,14 @@
+import hashlib
+import json
 import os
+import uuid
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import List, Optional
 
 import pandas as pd
 import seaborn as sns
-import numpy as np
 
 from matplotlib import pyplot as plt
 from matplotlib.ticker import (
@@ -13,8 +19,30 @@ from matplotlib.ticker import (
     StrMethodFormatter,
 )
 
-from scs_analysis.experiment.distance_calculator import ORDERING
-from scs_analysis.experiment.experiment import BCDG, BCDN, MCS, SCS_FAST
+from scs_analysis.experiment.experiment import (
+    BCDG,
+    BCDN,
+    DISTANCE_FILE_SUFFIX,
+    KEY_FILE_SUFFIX,
+    MCS,
+    SCS_FAST,
+)
+from scs_analysis.experiment.method_benchmark import (
+    BENCHMARK_FILE_SUFFIX,
+    BENCHMARK_HEADER,
+)
+from scs_analysis.experiment import summary as summary_module
+from scs_analysis.experiment.summary import (
+    SUMMARY_FILE,
+    SUMMARY_METRICS,
+    summarise,
+    write_summary,
+)
+from scs_analysis.storage.metrics_cache import (
+    MODEL_TREE_FILE,
+    SOURCE_TREE_FILE,
+    load_metrics,
+)
 
 
 sns.set_theme()
@@ -24,54 +52,146 @@ sns.set_style("whitegrid")
 METHOD_MAP = {SCS_FAST: "SCS", BCDG: "BCD (GSCM)", BCDN: "BCD (No GSCM)", MCS: "MCS"}
 
 
+# The columns of the data frames, by metric field of the metrics cache
+METRIC_COLUMNS = {
+    "wall_time": "Wall Time",
+    "cpu_time": "CPU Time",
+    "rf": "RF Distance",
+    "mc": "Matching Cluster Distance",
+    "f1": "F1 Score",
+    "brf": "Bifurcating RF Distance",
+    "bmc": "Bifurcating Matching Cluster Distance",
+    "bf1": "Bifurcating F1 Score",
+}
+
+
 def load_data(folder):
-    distance_files = list(
-        filter(lambda x: x.endswith("_with_distances.tsv"), os.listdir(folder))
-    )
-    distance_files = sorted(
-        distance_files, key=lambda x: (ORDERING.get(x[:-12], float("inf")), x)
-    )
-    methods = [file[:-27] for file in distance_files]
-    distance_file_paths = [folder + "/" + file for file in distance_files]
-
-    header = [
-        "Model Tree",
-        "Source Tree",
-        "Wall Time",
-        "CPU Time",
-        "RF Distance",
-        "Matching Cluster Distance",
-        "F1 Score",
-        "Bifurcating RF Distance",
-        "Bifurcating Matching Cluster Distance",
-        "Bifurcating F1 Score",
-        "Tree",
-    ]
-    drops = ["Model Tree", "Source Tree", "Tree"]
+    """
+    The metrics of each method of an experiment folder (with the model and
+    source tree they were measured on), read from its metrics cache (so
+    the trees of the distance files are never read).
+    """
+    metrics = load_metrics(folder)
+    methods = sorted(metrics, key=lambda method: method + DISTANCE_FILE_SUFFIX)
+
     dfs = []
-    for method, distance_file in zip(methods, distance_file_paths):
+    for method in methods:
         if method not in METHOD_MAP:
             continue
 
-        df = pd.read_csv(distance_file, delimiter="\t", names=header)
-        df = df.drop(columns=drops)
+        columns = metrics[method]
+        df = pd.DataFrame(
+            {
+                "Model Tree": columns[MODEL_TREE_FILE],
+                "Source Tree": columns[SOURCE_TREE_FILE],
+                **{
+                    column: columns[field]
+                    for field, column in METRIC_COLUMNS.items()
+                },
+            }
+        )
+        df = use_benchmark_times(
+            df,
+            folder + "/" + method + BENCHMARK_FILE_SUFFIX,
+            folder + "/" + method + KEY_FILE_SUFFIX,
+        )
         df["Method"] = METHOD_MAP[method]
         dfs.append(df)
     return pd.concat(dfs, ignore_index=True)
 
 
-def graph_smidgenog_combined(image_folder: str, methods):
+def compact_frame(df):
+    """
+    Narrows the integer columns of a frame to the smallest type holding
+    their values, and makes the Method column categorical.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_integer_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+    df["Method"] = pd.Categorical(df["Method"], categories=list(METHOD_MAP.values()))
+    return df
+
+
+class DataRegistry:
+    """
+    The data of the experiment folders, each loaded (with load_data) once
+    and shared by every graph drawn from it, whichever methods it shows.
+
+    The frames handed out are shared, and must not be modified in place.
+    """
+
+    def __init__(self):
+        self._folders = {}
+        self._datasets = {}
+
+    def folder(self, folder):
+        """
+        The data of an experiment folder.
+        """
+        if folder not in self._folders:
+            self._folders[folder] = compact_frame(load_data(folder))
+        return self._folders[folder]
+
+    def dataset(self, folders, x_col=None):
+        """
+        The data of several experiment folders as one frame.
+
+        Args:
+            folders: The folders, each paired with the value of x_col for
+                its rows.
+            x_col: The column the folders are told apart by, or None.
+        """
+        key = (tuple(folders), x_col)
+        if key not in self._datasets:
+            dfs = []
+            for folder, value in folders:
+                df = self.folder(folder)
+                if x_col is not None:
+                    df = df.assign(**{x_col: value})
+                dfs.append(df)
+            self._datasets[key] = pd.concat(dfs, ignore_index=True)
+        return self._datasets[key]
+
+
+def use_benchmark_times(df, benchmark_file, key_file):
+    """
+    Replaces the single-run wall and CPU times with the medians of the
+    repeated runs of bench-methods, where the method was benchmarked by a
+    run with the same key as the result (so of the same job).
+    """
+    if not os.path.exists(benchmark_file) or not os.path.exists(key_file):
+        return df
+    benchmarks = pd.read_csv(benchmark_file, delimiter="\t", names=BENCHMARK_HEADER)
+    keys = pd.read_csv(
+        key_file, delimiter="\t", names=["Source Tree", "Key"], dtype=str
+    ).drop_duplicates("Source Tree", keep="last")
+    benchmarks = benchmarks.astype({"Key": str}).merge(keys, on=["Source Tree", "Key"])
+    benchmarks = benchmarks.set_index("Source Tree")
+    for column in ("Wall Time", "CPU Time"):
+        medians = df["Source Tree"].map(benchmarks[column + " Median"])
+        df[column] = medians.fillna(df[column])
+    return df
+
+
+def graph_smidgenog_combined(image_folder: str, methods, registry=None, draw=None):
+    if registry is None:
+        registry = DataRegistry()
+    if draw is None:
+        draw = graph_combined
+
     # Original SMIDGenOG
     densities = (20, 50, 75, 100)
     for taxa in (100, 500, 1000):
-        dfs = []
-        for density in densities:
-            df = load_data(f"results/SMIDGenOutgrouped/{taxa}/{density}")
-            df["Scaffold Factor"] = density
-            dfs.append(df)
-        df = pd.concat(dfs, ignore_index=True)
-
-        graph_combined(
+        df = registry.dataset(
+            [
+                (f"results/SMIDGenOutgrouped/{taxa}/{density}", density)
+                for density in densities
+            ],
+            "Scaffold Factor",
+        )
+
+        draw(
             image_folder + f"combined/SMIDGenOutgrouped/{taxa}/",
             df,
             "Scaffold Factor",
@@ -80,8 +200,8 @@ def graph_smidgenog_combined(image_folder: str, methods):
         )
 
     # SMIDGenOG-5500
-    df = load_data(f"results/SMIDGenOutgrouped/10000/0")
-    graph_combined(
+    df = registry.folder(f"results/SMIDGenOutgrouped/10000/0")
+    draw(
         image_folder + f"combined/SMIDGenOutgrouped/10000/0/",
         df,
         None,
@@ -90,17 +210,20 @@ def graph_smidgenog_combined(image_folder: str, methods):
     )
 
 
-def graph_supertriplets_combined(image_folder: str, methods):
+def graph_supertriplets_combined(image_folder: str, methods, registry=None, draw=None):
+    if registry is None:
+        registry = DataRegistry()
+    if draw is None:
+        draw = graph_combined
+
     ks = (10, 20, 30, 40, 50)
     for d in (25, 50, 75):
-        dfs = []
-        for k in ks:
-            df = load_data(f"results/SuperTripletsBenchmark/d{d}/k{k}")
-            df["Source Trees (k)"] = k
-            dfs.append(df)
-        df = pd.concat(dfs, ignore_index=True)
-
-        graph_combined(
+        df = registry.dataset(
+            [(f"results/SuperTripletsBenchmark/d{d}/k{k}", k) for k in ks],
+            "Source Trees (k)",
+        )
+
+        draw(
             image_folder + f"combined/SuperTripletsBenchmark/d{d}/",
             df,
             "Source Trees (k)",
@@ -109,17 +232,20 @@ def graph_supertriplets_combined(image_folder: str, methods):
         )
 
 
-def graph_dcm_combined(image_folder: str, methods):
+def graph_dcm_combined(image_folder: str, methods, registry=None, draw=None):
+    if registry is None:
+        registry = DataRegistry()
+    if draw is None:
+        draw = graph_combined
+
     ms = (50, 100)
     for taxa in (500, 1000, 2000, 5000, 10000):
-        dfs = []
-        for m in ms:
-            df = load_data(f"results/birth_death/{taxa}/dcm_source_trees/{m}/")
-            df["Max Subproblem Size"] = m
-            dfs.append(df)
-        df = pd.concat(dfs, ignore_index=True)
-
-        graph_combined(
+        df = registry.dataset(
+            [(f"results/birth_death/{taxa}/dcm_source_trees/{m}/", m) for m in ms],
+            "Max Subproblem Size",
+        )
+
+        draw(
             image_folder + f"combined/birth_death/{taxa}/dcm_source_trees/",
             df,
             "Max Subproblem Size",
@@ -128,17 +254,20 @@ def graph_dcm_combined(image_folder: str, methods):
         )
 
 
-def graph_iq_combined(image_folder: str, methods):
+def graph_iq_combined(image_folder: str, methods, registry=None, draw=None):
+    if registry is None:
+        registry = DataRegistry()
+    if draw is None:
+        draw = graph_combined
+
     ms = (50, 100)
     for taxa in (500, 1000, 2000, 5000, 10000):
-        dfs = []
-        for m in ms:
-            df = load_data(f"results/birth_death/{taxa}/iq_source_trees/{m}/")
-            df["Max Subproblem Size"] = m
-            dfs.append(df)
-        df = pd.concat(dfs, ignore_index=True)
-
-        graph_combined(
+        df = registry.dataset(
+            [(f"results/birth_death/{taxa}/iq_source_trees/{m}/", m) for m in ms],
+            "Max Subproblem Size",
+        )
+
+        draw(
             image_folder + f"combined/birth_death/{taxa}/iq_source_trees/",
             df,
             "Max Subproblem Size",
@@ -166,45 +295,53 @@ def include_code(methods):
     return code
 
 
-def graph_combined(image_directory, df, x_col, suptitle, methods):
-    # print()
-    # print(image_directory)
-    all_results = []
-    if x_col is not None:
-        for data_point, x_df in df.groupby(x_col):
-            scs_df = x_df[x_df["Method"] == "SCS"]
-            bcd_df = x_df[x_df["Method"] == "BCD (GSCM)"]
-            if len(bcd_df) == 0:
-                continue
-            # print(scs_df)
-            results = {}
-            for metric in ("CPU Time", "RF Distance", "Matching Cluster Distance"):
-                # print(scs_df[metric].to_numpy() / bcd_df[metric].to_numpy())
-                results["SCS/BCD: " + metric] = np.median(
-                    scs_df[metric].to_numpy() / bcd_df[metric].to_numpy()
-                )
-                results["BCD/SCS: " + metric] = np.median(
-                    bcd_df[metric].to_numpy() / scs_df[metric].to_numpy()
-                )
-            # print(results)
-            all_results.append((data_point, results))
+def figure_file_name(methods, suptitle):
+    title = (
+        suptitle.lower()
+        .replace(" ", "_")
+        .replace("(", "")
+        .replace(")", "")
+        .replace("%", "")
+        .replace("=", "_")
+    )
+    return f"{include_code(methods)}_{title}.pdf"
+
+
+def write_improvements(image_directory, summary, x_col):
+    """
+    Writes the median ratios of SCS to BCD (GSCM) (and the other way
+    around) of each data point to its .imp file.
+    """
+    names = {
+        ("SCS", "BCD (GSCM)"): "SCS/BCD",
+        ("BCD (GSCM)", "SCS"): "BCD/SCS",
+    }
+    ratios = summary[
+        [(m, b) in names for m, b in zip(summary["Method"], summary["Baseline"])]
+    ]
+    ratios = ratios[ratios["Metric"].isin(SUMMARY_METRICS)]
+    if x_col is None:
+        data_points = [(None, ratios)] if len(ratios) > 0 else []
+        separator = " "
     else:
-        scs_df = df[df["Method"] == "SCS"]
-        bcd_df = df[df["Method"] == "BCD (GSCM)"]
-        if len(bcd_df) > 0:
-            # print(scs_df)
-            results = {}
-            for metric in ("CPU Time", "RF Distance", "Matching Cluster Distance"):
-                # print(scs_df[metric].to_numpy() / bcd_df[metric].to_numpy())
-                results["SCS/BCD " + metric] = np.median(
-                    scs_df[metric].to_numpy() / bcd_df[metric].to_numpy()
-                )
-                results["BCD/SCS " + metric] = np.median(
-                    bcd_df[metric].to_numpy() / scs_df[metric].to_numpy()
-                )
-            # print(results)
-
-            all_results.append((None, results))
+        data_points = list(ratios.groupby(x_col))
+        separator = ": "
+
+    for data_point, rows in data_points:
+        results = {
+            names[(method, baseline)] + separator + metric: ratio
+            for method, baseline, metric, ratio in zip(
+                rows["Method"], rows["Baseline"], rows["Metric"], rows["Median Ratio"]
+            )
+        }
+        with open(image_directory + f"{data_point}.imp", "w") as f:
+            for key in sorted(results):
+                f.write(f"{key}: {results[key]}\n")
+
+
+def graph_combined(image_directory, df, x_col, suptitle, methods, summary=None):
+    if summary is None:
+        summary = summarise(df, x_col)
 
     if not os.path.exists(image_directory):
         os.makedirs(image_directory)
@@ -302,18 +439,13 @@ def graph_combined(image_directory, df, x_col, suptitle, methods):
 
     fig.savefig(
         image_directory
-        + f"{include_code(methods)}_{suptitle.lower().replace(' ','_').replace('(','').replace(')','').replace('%','').replace('=','_')}.pdf",
+        + figure_file_name(methods, suptitle),
         bbox_inches="tight",
     )
     plt.close(fig)
 
     # Stats
-    for datapoint, results in all_results:
-        with open(image_directory + f"{datapoint}.imp", "w") as f:
-            header = sorted(results.keys())
-
-            for key in sorted(results):
-                f.write(f"{key}: {results[key]}\n")
+    write_improvements(image_directory, summary, x_col)
 
     # Supplementary
 
@@ -400,7 +532,8 @@ def graph_combined(image_directory, df, x_col, suptitle, methods):
 
     fig.savefig(
         image_directory
-        + f"f1_{include_code(methods)}_{suptitle.lower().replace(' ','_').replace('(','').replace(')','').replace('%','').replace('=','_')}.pdf",
+        + "f1_"
+        + figure_file_name(methods, suptitle),
         bbox_inches="tight",
     )
     plt.close(fig)
@@ -477,26 +610,204 @@ def method_combinations():
     return methods
 
 
-def graph_results(image_folder: str, verbosity: int = 0):
+FIGURE_MANIFEST = ".figure_manifest.json"
+
+
+@dataclass
+class FigureJob:
+    """The arguments of one graph_combined call, drawn independently."""
+
+    image_directory: str
+    df: pd.DataFrame
+    x_col: Optional[str]
+    suptitle: str
+    methods: List[str]
+    summary: Optional[pd.DataFrame] = None
+
+    @property
+    def name(self) -> str:
+        return self.image_directory + figure_file_name(self.methods, self.suptitle)
+
+    def outputs(self) -> List[str]:
+        file_name = figure_file_name(self.methods, self.suptitle)
+        return [
+            self.image_directory + file_name,
+            self.image_directory + "f1_" + file_name,
+        ]
+
+    def digest(self) -> str:
+        """
+        A hash of the data and parameters of the figure, and of the code
+        drawing it.
+        """
+        h = hashlib.sha256()
+        for module_file in (__file__, summary_module.__file__):
+            with open(module_file, "rb") as f:
+                h.update(f.read())
+        h.update(
+            json.dumps(
+                [
+                    self.image_directory,
+                    self.x_col,
+                    self.suptitle,
+                    list(self.methods),
+                    [(str(c), str(t)) for c, t in self.df.dtypes.items()],
+                ]
+            ).encode("utf-8")
+        )
+        h.update(pd.util.hash_pandas_object(self.df).to_numpy().tobytes())
+        return h.hexdigest()
+
+
+def _load_manifest(file_path):
+    if not os.path.exists(file_path):
+        return {}
+    try:
+        with open(file_path, "r") as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+
+def _save_manifest(file_path, manifest):
+    temporary_file = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    with open(temporary_file, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(temporary_file, file_path)
+
+
+def _init_renderer():
+    plt.switch_backend("Agg")
+
+
+def _render(job: FigureJob) -> None:
+    graph_combined(
+        job.image_directory,
+        job.df,
+        job.x_col,
+        job.suptitle,
+        job.methods,
+        job.summary,
+    )
+
+
+def render_figures(
+    jobs: List[FigureJob],
+    image_folder: str,
+    workers: int = 1,
+    force: bool = False,
+    verbosity: int = 0,
+) -> int:
+    """
+    Draws the figures whose data or parameters changed since they were
+    last drawn, in parallel.
+
+    The hash of each figure drawn is kept in a manifest in the image
+    folder, so a figure is only redrawn when its hash changes (or its
+    files are missing).
+
+    Args:
+        jobs (List[FigureJob]): The figures.
+        image_folder (str): The folder holding the manifest.
+        workers (int): The number of processes drawing figures.
+        force (bool): Whether to redraw figures that are up to date.
+        verbosity (int): Verbosity level.
+
+    Returns:
+        int: The number of figures drawn.
+    """
+    os.makedirs(image_folder, exist_ok=True)
+    manifest_file = os.path.join(image_folder, FIGURE_MANIFEST)
+    manifest = _load_manifest(manifest_file)
+
+    pending = []
+    for job in jobs:
+        digest = job.digest()
+        up_to_date = manifest.get(job.name) == digest and all(
+            os.path.exists(output) for output in job.outputs()
+        )
+        if force or not up_to_date:
+            pending.append((job, digest))
+    if verbosity >= 1:
+        print(f"Drawing {len(pending)} of {len(jobs)} figures.")
+
+    try:
+        if workers <= 1:
+            for job, digest in pending:
+                _render(job)
+                manifest[job.name] = digest
+                if verbosity >= 2:
+                    print("Drew", job.name)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_renderer
+            ) as executor:
+                futures = {
+                    executor.submit(_render, job): (job, digest)
+                    for job, digest in pending
+                }
+                for future in as_completed(futures):
+                    job, digest = futures[future]
+                    future.result()
+                    manifest[job.name] = digest
+                    if verbosity >= 2:
+                        print("Drew", job.name)
+    finally:
+        # Figures drawn before a failure are not redrawn next time
+        _save_manifest(manifest_file, manifest)
+    return len(pending)
+
+
+def graph_results(
+    image_folder: str, verbosity: int = 0, workers: int = 1, force: bool = False
+) -> int:
+    """
+    Draws the graphs of all experiments, redrawing only those whose data
+    changed since they were last drawn.
+
+    Returns:
+        int: The number of figures drawn.
+    """
     method_combs = method_combinations()
+    # Each folder is loaded once, however many method combinations it is
+    # graphed for
+    registry = DataRegistry()
+    jobs = []
+    summaries = {}
+
+    def draw(image_directory, df, x_col, suptitle, methods):
+        # Summarised once for all the method combinations, and written out
+        # alongside the figures
+        key = (image_directory, x_col, id(df))
+        if key not in summaries:
+            summaries[key] = summarise(df, x_col)
+            os.makedirs(image_directory, exist_ok=True)
+            write_summary(summaries[key], image_directory + SUMMARY_FILE)
+        jobs.append(
+            FigureJob(image_directory, df, x_col, suptitle, methods, summaries[key])
+        )
 
     if verbosity:
         print("GRAPHING", "SMIDGenOG")
 
     for methods in method_combs:
-        graph_smidgenog_combined(image_folder, methods)
+        graph_smidgenog_combined(image_folder, methods, registry, draw)
 
     if verbosity:
         print("GRAPHING", "SuperTriplets")
     for methods in method_combs:
-        graph_supertriplets_combined(image_folder, methods)
+        graph_supertriplets_combined(image_folder, methods, registry, draw)
 
     if verbosity:
         print("GRAPHING", "DCM")
     for methods in method_combs:
-        graph_dcm_combined(image_folder, methods)
+        graph_dcm_combined(image_folder, methods, registry, draw)
 
     if verbosity:
         print("GRAPHING", "IQ")
     for methods in method_combs:
-        graph_iq_combined(image_folder, methods)
+        graph_iq_combined(image_folder, methods, registry, draw)
+
+    return render_figures(
+        jobs, image_folder, workers=workers, force=force, verbosity=verbosity
+    )
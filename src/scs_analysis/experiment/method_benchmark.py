@@ -0,0 +1,249 @@
+"""
+Repeated measurement of supertree method runs.
+
+Each job is run a number of times (after optional warmup runs whose
+measurements are discarded), with the runs of all jobs interleaved in a
+random order so that drift in the machine's state is spread over the
+methods rather than landing on whichever ran last. The median,
+interquartile range and minimum of the wall time, CPU time and peak
+memory of the runs are stored in a benchmark table per method, apart
+from the single-run results.
+"""
+
+import os
+import random
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from scs_analysis.experiment.experiment import (
+    RESULTS_FOLDER,
+    Job,
+    attach_job_keys,
+    run_method_measured,
+)
+from scs_analysis.experiment.result_files import (
+    append_record,
+    needs_recovery,
+    read_records,
+    recover_records,
+    remove_records,
+)
+from scs_analysis.experiment.timing import physical_cores
+
+
+BENCHMARK_FILE_SUFFIX = "_benchmark.tsv"
+
+# Model tree, source tree, key, repeats and a median, IQR and minimum per measure
+MEASURES = ("Wall Time", "CPU Time", "Max RSS")
+STATISTICS = ("Median", "IQR", "Min")
+BENCHMARK_NUM_FIELDS = 4 + len(MEASURES) * len(STATISTICS)
+
+BENCHMARK_HEADER = [
+    "Model Tree",
+    "Source Tree",
+    "Key",
+    "Repeats",
+    *(f"{measure} {statistic}" for measure in MEASURES for statistic in STATISTICS),
+]
+
+
+def summarise(values: Sequence[float]) -> Tuple[float, float, float]:
+    """
+    The median, interquartile range and minimum of the values.
+    """
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    return float(median), float(q3 - q1), float(min(values))
+
+
+class BenchmarkLogger:
+    """
+    Reads and writes the benchmark table of each method of an experiment.
+    """
+
+    def __init__(
+        self, results_folder: str, experiment_directory: str, verbosity: int = 1
+    ) -> None:
+        self.write_directory = results_folder + experiment_directory
+        self._benchmarks: Dict[str, Dict[str, Tuple[str, int]]] = {}
+        os.makedirs(self.write_directory, exist_ok=True)
+        for file in os.listdir(self.write_directory):
+            file_path = self.write_directory + file
+            if file.endswith(BENCHMARK_FILE_SUFFIX) and needs_recovery(file_path):
+                recover_records(file_path, verbosity=verbosity)
+
+    def format_file_path(self, method: str) -> str:
+        return self.write_directory + method + BENCHMARK_FILE_SUFFIX
+
+    def benchmarked(
+        self, method: str, source_tree_file: str, key: Optional[str], repeats: int
+    ) -> bool:
+        """
+        Whether the job was benchmarked with at least the given number of
+        repeats by a run with the same key.
+        """
+        if method not in self._benchmarks:
+            self._benchmarks[method] = {}
+            file_path = self.format_file_path(method)
+            if os.path.exists(file_path):
+                for parts in read_records(file_path, BENCHMARK_NUM_FIELDS):
+                    self._benchmarks[method][parts[1]] = (parts[2], int(parts[3]))
+        if source_tree_file not in self._benchmarks[method]:
+            return False
+        benchmark_key, benchmark_repeats = self._benchmarks[method][source_tree_file]
+        return benchmark_key == str(key) and benchmark_repeats >= repeats
+
+    def write_benchmark(
+        self,
+        method: str,
+        model_tree_file: str,
+        source_tree_file: str,
+        key: Optional[str],
+        samples: Sequence[Tuple[float, float, float]],
+    ) -> None:
+        """
+        Records the summary of the (wall time, CPU time, max RSS) samples
+        of a job, replacing any earlier benchmark of it.
+        """
+        file_path = self.format_file_path(method)
+        remove_records(
+            file_path,
+            BENCHMARK_NUM_FIELDS,
+            lambda parts: parts[1] == source_tree_file,
+        )
+        statistics = []
+        for values in zip(*samples):
+            statistics.extend(summarise(values))
+        append_record(
+            file_path,
+            [model_tree_file, source_tree_file, str(key), str(len(samples))]
+            + list(map(str, statistics)),
+        )
+        self._benchmarks.pop(method, None)
+
+
+def benchmark_jobs(
+    jobs: Sequence[Job],
+    repeats: int = 5,
+    warmup: int = 1,
+    shuffle: bool = True,
+    rng: Optional[random.Random] = None,
+    isolate_timing: bool = False,
+    force_bifurcating: bool = False,
+    results_folder: str = RESULTS_FOLDER,
+    seeded: bool = True,
+    verbosity: int = 1,
+) -> None:
+    """
+    Benchmarks the jobs that do not have an up to date benchmark.
+
+    The runs are executed one at a time. Each job is given the same seed
+    on every run so that its repeats perform the same work.
+
+    Args:
+        jobs (Sequence[Job]): The jobs to benchmark.
+        repeats (int): Number of measured runs of each job.
+        warmup (int): Number of unmeasured runs of each job beforehand.
+        shuffle (bool): Whether to run the repeats in a random order.
+        rng (Optional[random.Random]): Random generator for the order.
+        isolate_timing (bool): Whether to pin the runs to a single core.
+        force_bifurcating (bool): Whether resulting trees are made bifurcating.
+        results_folder (str): The folder benchmarks are written to.
+        seeded (bool): Whether the job seeds are part of the job keys.
+        verbosity (int): Verbosity level.
+
+    Raises:
+        ValueError: If there are no measured runs to summarise.
+    """
+    if repeats < 1:
+        raise ValueError(f"At least one measured run is needed, not {repeats}")
+    if rng is None:
+        rng = random.Random()
+    attach_job_keys(jobs, force_bifurcating=force_bifurcating, seeded=seeded)
+
+    loggers: Dict[str, BenchmarkLogger] = {}
+    pending = []
+    for job in jobs:
+        if job.experiment_directory not in loggers:
+            loggers[job.experiment_directory] = BenchmarkLogger(
+                results_folder, job.experiment_directory, verbosity=verbosity
+            )
+        logger = loggers[job.experiment_directory]
+        if logger.benchmarked(job.method, job.source_tree_file, job.key, repeats):
+            continue
+        pending.append(job)
+
+    if verbosity >= 1 and len(pending) < len(jobs):
+        print(f"Skipping {len(jobs) - len(pending)} jobs with existing benchmarks.")
+    if len(pending) == 0:
+        return
+
+    cpu = physical_cores()[0] if isolate_timing else None
+
+    warmup_runs = [i for i in range(len(pending)) for _ in range(warmup)]
+    runs = [i for i in range(len(pending)) for _ in range(repeats)]
+    if shuffle:
+        rng.shuffle(warmup_runs)
+        rng.shuffle(runs)
+
+    if verbosity >= 1:
+        print(
+            f"Benchmarking {len(pending)} jobs with {warmup} warmup "
+            f"and {repeats} measured runs each."
+        )
+
+    failed = set()
+    for i in warmup_runs:
+        job = pending[i]
+        run_method_measured(
+            job.method,
+            job.source_tree_file,
+            seed=job.seed,
+            force_bifurcating=force_bifurcating,
+            verbosity=verbosity - 1,
+            cpu=cpu,
+        )
+
+    samples: List[List[Tuple[float, float, float]]] = [[] for _ in pending]
+    for i in runs:
+        if i in failed:
+            continue
+        job = pending[i]
+        tree, wall_time, cpu_time, stats = run_method_measured(
+            job.method,
+            job.source_tree_file,
+            seed=job.seed,
+            force_bifurcating=force_bifurcating,
+            verbosity=verbosity - 1,
+            cpu=cpu,
+        )
+        if tree is None or cpu_time is None:
+            failed.add(i)
+            if verbosity >= 1:
+                print(
+                    f"{job.method} failed on {job.source_tree_file}, not benchmarked."
+                )
+            continue
+        if isolate_timing and stats.disturbed and verbosity >= 1:
+            print(
+                f"Warning: a run of {job.method} on {job.source_tree_file} "
+                "was likely disturbed."
+            )
+        samples[i].append((wall_time, cpu_time, float(stats.max_rss_kb)))
+
+        if len(samples[i]) == repeats:
+            loggers[job.experiment_directory].write_benchmark(
+                job.method,
+                job.model_tree_file,
+                job.source_tree_file,
+                job.key,
+                samples[i],
+            )
+            if verbosity >= 1:
+                wall, _, _ = summarise([sample[0] for sample in samples[i]])
+                cpu_median, _, _ = summarise([sample[1] for sample in samples[i]])
+                print(
+                    f"{job.method}: median wall={wall:.2f}s "
+                    f"cpu={cpu_median:.2f}s ({job.source_tree_file})"
+                )
@@ -0,0 +1,236 @@
+"""
+Progress reporting for long runs over a grid of jobs.
+
+A ProgressReporter knows every job of the expanded grid up front, and
+prints a summary line of the completed and remaining jobs, the jobs per
+minute of each method and the estimated time remaining. The lines are
+printed every few seconds on a terminal and every few minutes otherwise,
+so that the log of a multi-day run shows how far along it is without
+being swamped.
+"""
+
+import sys
+import threading
+import time
+
+from typing import Dict, List, Optional, TextIO
+
+
+# Seconds between summary lines on a terminal and in a log file
+TTY_INTERVAL = 5.0
+LOG_INTERVAL = 300.0
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours > 0:
+        return f"{hours}h{minutes:02}m{seconds:02}s"
+    if minutes > 0:
+        return f"{minutes}m{seconds:02}s"
+    return f"{seconds}s"
+
+
+class ProgressReporter:
+    """
+    Tracks the jobs of a run and periodically prints a summary of them.
+
+    Each job to run is registered with expect (with its predicted wall
+    time, if there is a cost model) and reported with complete once done.
+    Jobs with existing results are reported with skip. With predictions,
+    the time remaining is the predicted time of the remaining jobs, scaled
+    by how the times of the completed jobs compared with their predictions.
+    Otherwise it is extrapolated from the mean time of each method's
+    completed jobs.
+    """
+
+    def __init__(
+        self,
+        total: int,
+        workers: int = 1,
+        interval: Optional[float] = None,
+        label: str = "jobs",
+        stream: Optional[TextIO] = None,
+    ) -> None:
+        """
+        Args:
+            total (int): The number of jobs in the grid.
+            workers (int): The number of jobs run at once.
+            interval (Optional[float]): Seconds between summary lines, chosen
+                by whether the output is a terminal if None. 0 prints none.
+            label (str): What the jobs are called in the summary.
+            stream (Optional[TextIO]): Where to print, stdout if None.
+        """
+        self.total = total
+        self.workers = max(workers, 1)
+        self.label = label
+        self.stream = sys.stdout if stream is None else stream
+        if interval is None:
+            interval = TTY_INTERVAL if self.stream.isatty() else LOG_INTERVAL
+        self.interval = interval
+
+        self.completed = 0
+        self.skipped = 0
+        self.failed = 0
+        self._pending: Dict[str, List[float]] = {}
+        self._method_completed: Dict[str, int] = {}
+        self._method_time: Dict[str, float] = {}
+        self._completed_time = 0.0
+        self._completed_prediction = 0.0
+        self._predicted = True
+        self._start = time.time()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def remaining(self) -> int:
+        return self.total - self.completed - self.skipped
+
+    def expect(self, method: str, predicted_time: Optional[float] = None) -> None:
+        """
+        Registers a job that is to be run.
+        """
+        with self._lock:
+            if predicted_time is None:
+                self._predicted = False
+                predicted_time = 0.0
+            self._pending.setdefault(method, []).append(predicted_time)
+
+    def skip(self, count: int = 1) -> None:
+        """
+        Records jobs that did not need to run.
+        """
+        with self._lock:
+            self.skipped += count
+
+    def complete(
+        self,
+        method: str,
+        duration: float,
+        predicted_time: Optional[float] = None,
+        failed: bool = False,
+    ) -> None:
+        """
+        Records a finished job.
+
+        Args:
+            method (str): The method of the job.
+            duration (float): The wall time the job took.
+            predicted_time (Optional[float]): The time the job was expected
+                to take when it was registered.
+            failed (bool): Whether the job failed.
+        """
+        with self._lock:
+            self.completed += 1
+            self.failed += failed
+            self._method_completed[method] = self._method_completed.get(method, 0) + 1
+            self._method_time[method] = self._method_time.get(method, 0.0) + duration
+            pending = self._pending.get(method, [])
+            if predicted_time is not None and predicted_time in pending:
+                pending.remove(predicted_time)
+                self._completed_time += duration
+                self._completed_prediction += predicted_time
+            elif len(pending) > 0:
+                pending.pop()
+
+    def eta(self) -> Optional[float]:
+        """
+        The estimated seconds until the remaining jobs are done, or None
+        if nothing is known to estimate it from.
+        """
+        with self._lock:
+            return self._eta()
+
+    def _eta(self) -> Optional[float]:
+        if self._predicted:
+            if self._completed_prediction > 0:
+                scale = self._completed_time / self._completed_prediction
+            elif self.completed == 0:
+                scale = 1.0
+            else:
+                return None
+            costs = [cost for pending in self._pending.values() for cost in pending]
+            if len(costs) == 0:
+                return 0.0
+            return scale * max(sum(costs) / self.workers, max(costs))
+
+        if self.completed == 0:
+            return None
+        mean_time = sum(self._method_time.values()) / self.completed
+        total_time = 0.0
+        for method, pending in self._pending.items():
+            if method in self._method_completed:
+                method_mean = self._method_time[method] / self._method_completed[method]
+            else:
+                method_mean = mean_time
+            total_time += method_mean * len(pending)
+        return total_time / self.workers
+
+    def summary(self) -> str:
+        """
+        A line with the number of completed and remaining jobs, the rate
+        of each method and the estimated time remaining.
+        """
+        with self._lock:
+            elapsed = time.time() - self._start
+            line = (
+                f"Progress: {self.completed + self.skipped}/{self.total} {self.label} "
+                f"done"
+            )
+            details = []
+            if self.skipped > 0:
+                details.append(f"{self.skipped} skipped")
+            if self.failed > 0:
+                details.append(f"{self.failed} failed")
+            if len(details) > 0:
+                line += f" ({', '.join(details)})"
+            line += f", {self.remaining} remaining, elapsed {format_duration(elapsed)}"
+
+            eta = self._eta()
+            if eta is not None and self.remaining > 0:
+                line += f", ETA {format_duration(eta)}"
+
+            rates = [
+                f"{method} {count / elapsed * 60:.1f}/min"
+                for method, count in sorted(self._method_completed.items())
+                if elapsed > 0
+            ]
+            if len(rates) > 0:
+                line += " | " + " ".join(rates)
+            return line
+
+    def report(self) -> None:
+        print(self.summary(), file=self.stream, flush=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def start(self) -> None:
+        """
+        Starts printing summary lines every interval.
+        """
+        self._start = time.time()
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stops the summary lines, printing a final one.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.interval > 0:
+            self.report()
+
+    def __enter__(self) -> "ProgressReporter":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,353 @@
+"""
+Crash-safe appends to the tab separated result files.
+
+Every record is first committed to a journal file by atomic rename, then
+appended to the result file and flushed to disk, and only then is the
+journal removed. If the process is killed part way through, recovery
+truncates the partial record left at the end of the result file and
+replays any journal whose record did not make it into the file, so an
+interrupted run resumes exactly where it stopped.
+
+Records are removed by rewriting the file in place from a rewrite
+journal holding its new contents, which recovery finishes applying if
+the rewrite was interrupted.
+
+Appends, rewrites and recovery hold an exclusive lock on the result
+file, so several processes (or threads) can safely write to the same file.
+
+A result file may have a sidecar index of where its records are (see
+scs_analysis.storage.results_index), which is emptied whenever the file
+is rewritten, so that it is rebuilt on its next use.
+"""
+
+import fcntl
+import mmap
+import os
+import threading
+import uuid
+
+from contextlib import contextmanager
+from typing import IO, Callable, Iterator, List, Optional
+
+
+JOURNAL_DIRECTORY = ".journal/"
+JOURNAL_SUFFIX = ".journal"
+REWRITE_SUFFIX = ".rewrite"
+INDEX_SUFFIX = ".index"
+
+# POSIX record locks are held per process, threads are serialised separately
+_THREAD_LOCK = threading.RLock()
+
+
+@contextmanager
+def locked(file_path: str) -> Iterator[IO[bytes]]:
+    """
+    Opens a result file for appending while holding an exclusive lock on it.
+    """
+    with _THREAD_LOCK:
+        with open(file_path, "ab+") as f:
+            fcntl.lockf(f, fcntl.LOCK_EX)
+            try:
+                yield f
+            finally:
+                fcntl.lockf(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def mapped(file_path: str) -> Iterator[Optional[mmap.mmap]]:
+    """
+    Memory-maps a result file while holding a shared lock on it, so that
+    it is not rewritten (and truncated under the map) meanwhile.
+
+    Returns:
+        Iterator[Optional[mmap.mmap]]: The map, None if the file is empty.
+    """
+    with _THREAD_LOCK:
+        with open(file_path, "rb") as f:
+            fcntl.lockf(f, fcntl.LOCK_SH)
+            try:
+                if os.fstat(f.fileno()).st_size == 0:
+                    yield None
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                        yield m
+            finally:
+                fcntl.lockf(f, fcntl.LOCK_UN)
+
+
+def index_path(file_path: str) -> str:
+    return file_path + INDEX_SUFFIX
+
+
+def _invalidate_index(file_path: str) -> None:
+    if os.path.exists(index_path(file_path)):
+        with locked(index_path(file_path)) as index:
+            index.truncate(0)
+
+
+def _journal_directory(file_path: str) -> str:
+    return os.path.join(os.path.dirname(file_path), JOURNAL_DIRECTORY)
+
+
+def _journal_files(file_path: str) -> List[str]:
+    journal_directory = _journal_directory(file_path)
+    if not os.path.exists(journal_directory):
+        return []
+    prefix = os.path.basename(file_path) + "."
+    return sorted(
+        journal_directory + file
+        for file in os.listdir(journal_directory)
+        if file.startswith(prefix) and file.endswith(JOURNAL_SUFFIX)
+    )
+
+
+def _write_journal(file_path: str, record: bytes) -> str:
+    journal_directory = _journal_directory(file_path)
+    os.makedirs(journal_directory, exist_ok=True)
+    journal_path = (
+        journal_directory
+        + f"{os.path.basename(file_path)}.{uuid.uuid4().hex}{JOURNAL_SUFFIX}"
+    )
+    tmp_path = journal_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(record)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, journal_path)
+    return journal_path
+
+
+def _append(f: IO[bytes], record: bytes) -> None:
+    f.write(record)
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def append_record(file_path: str, parts: List[str]) -> None:
+    """
+    Appends a record to a result file through the write-ahead journal.
+
+    Args:
+        file_path (str): The result file.
+        parts (List[str]): The fields of the record.
+    """
+    record = ("\t".join(parts) + "\n").encode("utf-8")
+    with locked(file_path) as f:
+        journal_path = _write_journal(file_path, record)
+        _append(f, record)
+        os.remove(journal_path)
+
+
+def _rewrite_journal_path(file_path: str) -> str:
+    return _journal_directory(file_path) + os.path.basename(file_path) + REWRITE_SUFFIX
+
+
+def _apply_rewrite(f: IO[bytes], file_path: str, rewrite_path: str) -> None:
+    f.truncate(0)
+    with open(rewrite_path, "rb") as rewrite:
+        while chunk := rewrite.read(1 << 20):
+            f.write(chunk)
+    f.flush()
+    os.fsync(f.fileno())
+    _invalidate_index(file_path)
+    os.remove(rewrite_path)
+
+
+def _rewrite_records(f: IO[bytes], file_path: str, lines: List[bytes]) -> None:
+    """
+    Replaces the contents of a locked result file with the lines, through
+    a rewrite journal.
+    """
+    os.makedirs(_journal_directory(file_path), exist_ok=True)
+    rewrite_path = _rewrite_journal_path(file_path)
+    with open(rewrite_path + ".tmp", "wb") as rewrite:
+        rewrite.writelines(lines)
+        rewrite.flush()
+        os.fsync(rewrite.fileno())
+    os.replace(rewrite_path + ".tmp", rewrite_path)
+    _apply_rewrite(f, file_path, rewrite_path)
+
+
+def remove_records(
+    file_path: str, num_fields: int, remove: Callable[[List[str]], bool]
+) -> int:
+    """
+    Removes the records of a result file matching a predicate.
+
+    Args:
+        file_path (str): The result file.
+        num_fields (int): The number of fields of a record.
+        remove (Callable[[List[str]], bool]): Whether to remove a record.
+
+    Returns:
+        int: The number of records removed.
+    """
+    if not os.path.exists(file_path):
+        return 0
+    with locked(file_path) as f:
+        f.seek(0)
+        kept = []
+        removed = 0
+        for line in f:
+            parts = parse_record(line.decode("utf-8"), num_fields)
+            if parts is not None and remove(parts):
+                removed += 1
+            else:
+                kept.append(line)
+        if removed == 0:
+            return 0
+        _rewrite_records(f, file_path, kept)
+    return removed
+
+
+def update_records(
+    file_path: str,
+    num_fields: int,
+    update: Callable[[List[str]], Optional[List[str]]],
+) -> int:
+    """
+    Replaces records of a result file.
+
+    Args:
+        file_path (str): The result file.
+        num_fields (int): The number of fields of a record.
+        update (Callable[[List[str]], Optional[List[str]]]): The new fields of
+            a record, or None to keep it as it is.
+
+    Returns:
+        int: The number of records replaced.
+    """
+    if not os.path.exists(file_path):
+        return 0
+    with locked(file_path) as f:
+        f.seek(0)
+        lines = []
+        updated = 0
+        for line in f:
+            parts = parse_record(line.decode("utf-8"), num_fields)
+            new_parts = None if parts is None else update(parts)
+            if new_parts is None:
+                lines.append(line)
+            else:
+                lines.append(("\t".join(new_parts) + "\n").encode("utf-8"))
+                updated += 1
+        if updated == 0:
+            return 0
+        _rewrite_records(f, file_path, lines)
+    return updated
+
+
+def _truncate_partial_record(f: IO[bytes]) -> bool:
+    """
+    Truncates anything after the last newline of the file.
+    """
+    end = f.seek(0, os.SEEK_END)
+    position = end
+    chunk_size = 1 << 16
+    while position > 0:
+        start = max(position - chunk_size, 0)
+        f.seek(start)
+        chunk = f.read(position - start)
+        newline = chunk.rfind(b"\n")
+        if newline != -1:
+            position = start + newline + 1
+            break
+        position = start
+    if position == end:
+        return False
+    f.truncate(position)
+    f.flush()
+    os.fsync(f.fileno())
+    return True
+
+
+def _contains_record(f: IO[bytes], record: bytes) -> bool:
+    f.seek(0)
+    for line in f:
+        if line == record:
+            return True
+    return False
+
+
+def recover_records(file_path: str, verbosity: int = 1) -> None:
+    """
+    Drops a partially written record at the end of a result file and
+    replays records which were journaled but not appended.
+
+    Args:
+        file_path (str): The result file.
+        verbosity (int): Verbosity level.
+    """
+    with locked(file_path) as f:
+        rewrite_path = _rewrite_journal_path(file_path)
+        if os.path.exists(rewrite_path):
+            _apply_rewrite(f, file_path, rewrite_path)
+            if verbosity >= 1:
+                print("Finished an interrupted rewrite of", file_path)
+
+        if _truncate_partial_record(f) and verbosity >= 1:
+            print("Dropped a partially written record from", file_path)
+
+        for journal_path in _journal_files(file_path):
+            with open(journal_path, "rb") as journal:
+                record = journal.read()
+            if record.endswith(b"\n") and not _contains_record(f, record):
+                f.seek(0, os.SEEK_END)
+                _append(f, record)
+                if verbosity >= 1:
+                    print("Recovered a journaled record into", file_path)
+            os.remove(journal_path)
+
+        # Journals that were never committed were never applied to the file
+        journal_directory = _journal_directory(file_path)
+        if os.path.exists(journal_directory):
+            prefix = os.path.basename(file_path) + "."
+            for file in os.listdir(journal_directory):
+                if file.startswith(prefix) and file.endswith(".tmp"):
+                    os.remove(journal_directory + file)
+
+
+def needs_recovery(file_path: str) -> bool:
+    """
+    Whether a result file was left in an inconsistent state by a crash.
+    """
+    if len(_journal_files(file_path)) > 0:
+        return True
+    if os.path.exists(_rewrite_journal_path(file_path)):
+        return True
+    if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+        return False
+    with open(file_path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def read_records(file_path: str, num_fields: int) -> Iterator[List[str]]:
+    """
+    Reads the complete, well-formed records of a result file.
+
+    Args:
+        file_path (str): The result file.
+        num_fields (int): The number of fields of a record.
+
+    Returns:
+        Iterator[List[str]]: The fields of each record.
+    """
+    with open(file_path, "r") as f:
+        for line in f:
+            parsed = parse_record(line, num_fields)
+            if parsed is not None:
+                yield parsed
+
+
+def parse_record(line: str, num_fields: int) -> Optional[List[str]]:
+    """
+    Splits a line of a result file into its fields, or returns None
+    if the line is not a complete record.
+    """
+    if not line.endswith("\n"):
+        return None
+    parts = line[:-1].split("\t")
+    if len(parts) != num_fields:
+        return None
+    return parts
@@ -0,0 +1,436 @@
+import heapq
+import math
+import os
+import re
+
+from abc import ABC, abstractmethod
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from scs_analysis.experiment.distance_calculator import DistancePool
+from scs_analysis.experiment.experiment import (
+    RESULTS_FOLDER,
+    RUN_STATS_FILE_SUFFIX,
+    Job,
+    ResultsLogger,
+    attach_job_keys,
+    run_method_measured,
+)
+from scs_analysis.experiment.progress import ProgressReporter, format_duration
+from scs_analysis.experiment.result_files import read_records
+from scs_analysis.experiment.timing import CorePool, physical_cores
+from scs_analysis.perf.profiling import profile_path
+
+
+# Tip names follow an opening bracket or a comma, internal node labels follow ")"
+TIP_NAME_PATTERN = re.compile(r"[(,]\s*([^(),:;\s]+)")
+
+# Fallback used when there is no history to fit against at all. Only the
+# relative cost between jobs matters for ordering.
+DEFAULT_SECONDS_PER_TAXON_TREE = 1e-3
+
+# Fallback peak RSS of a method run regardless of its input, in kilobytes
+DEFAULT_BASE_RSS_KB = 200 * 1024
+
+# Minimum number of historical runs to fit a per-method model
+MIN_FIT_SAMPLES = 3
+
+
+@lru_cache(maxsize=None)
+def source_tree_features(source_tree_file: str) -> Tuple[int, int]:
+    """
+    Cheaply computes the number of taxa and number of source trees in
+    a source tree file without parsing the trees.
+
+    Args:
+        source_tree_file (str): Path to the source trees (one per line).
+
+    Returns:
+        Tuple[int, int]: The number of distinct taxa and of source trees.
+    """
+    taxa = set()
+    num_trees = 0
+    with open(source_tree_file, "r") as f:
+        for line in f:
+            line = line.strip()
+            if len(line) == 0:
+                continue
+            num_trees += 1
+            taxa.update(TIP_NAME_PATTERN.findall(line))
+    return len(taxa), num_trees
+
+
+def _design_row(taxa: int, num_trees: int) -> List[float]:
+    return [1.0, math.log(max(taxa, 1)), math.log(max(num_trees, 1))]
+
+
+class _LogLinearModel(ABC):
+    """
+    Predicts a quantity of a job from its recorded value in the history,
+    or otherwise from a log-linear model on the number of taxa and source
+    trees fitted per method over the history (or over all methods when a
+    method has too little history).
+    """
+
+    def __init__(self, results_folder: str = RESULTS_FOLDER) -> None:
+        self.history: Dict[Tuple[str, str], float] = {}
+        self._coefficients: Optional[Dict[Optional[str], np.ndarray]] = None
+        self._load_history(results_folder)
+
+    @abstractmethod
+    def _load_history(self, results_folder: str) -> None:
+        """Fills the history with the recorded values of past jobs."""
+
+    @abstractmethod
+    def _default(self, taxa: int, num_trees: int) -> float:
+        """The prediction when there is too little history to fit."""
+
+    def _fit(self) -> Dict[Optional[str], np.ndarray]:
+        samples: Dict[Optional[str], Tuple[List, List]] = {None: ([], [])}
+        for (method, source_tree_file), value in self.history.items():
+            if value <= 0 or not os.path.exists(source_tree_file):
+                continue
+            row = _design_row(*source_tree_features(source_tree_file))
+            for key in (method, None):
+                xs, ys = samples.setdefault(key, ([], []))
+                xs.append(row)
+                ys.append(math.log(value))
+
+        coefficients = {}
+        for key, (xs, ys) in samples.items():
+            if len(xs) < MIN_FIT_SAMPLES:
+                continue
+            coefficients[key], *_ = np.linalg.lstsq(
+                np.array(xs), np.array(ys), rcond=None
+            )
+        return coefficients
+
+    def predict(self, job: Job) -> float:
+        """
+        Predicts the quantity for a job.
+        """
+        if (job.method, job.source_tree_file) in self.history:
+            return self.history[(job.method, job.source_tree_file)]
+
+        if not os.path.exists(job.source_tree_file):
+            return 0.0
+        taxa, num_trees = source_tree_features(job.source_tree_file)
+
+        if self._coefficients is None:
+            self._coefficients = self._fit()
+        coefficients = self._coefficients.get(
+            job.method, self._coefficients.get(None)
+        )
+        if coefficients is None:
+            return self._default(taxa, num_trees)
+        return math.exp(float(np.dot(coefficients, _design_row(taxa, num_trees))))
+
+
+class CostModel(_LogLinearModel):
+    """
+    Predicts the wall time of a job in seconds. The history is the wall
+    times recorded in the existing results.
+    """
+
+    def _load_history(self, results_folder: str) -> None:
+        for root, subdirs, files in os.walk(results_folder):
+            for file in files:
+                if not file.endswith("_results.tsv"):
+                    continue
+                method = file[:-12]
+                with open(os.path.join(root, file), "r") as f:
+                    for line in f:
+                        parts = line.split("\t", 4)
+                        if len(parts) < 5 or not line.endswith("\n"):
+                            continue
+                        try:
+                            wall_time = float(parts[2])
+                        except ValueError:
+                            continue
+                        self.history[(method, parts[1])] = wall_time
+
+    def _default(self, taxa: int, num_trees: int) -> float:
+        return DEFAULT_SECONDS_PER_TAXON_TREE * taxa * num_trees
+
+
+class MemoryModel(_LogLinearModel):
+    """
+    Predicts the peak resident memory of a job in kilobytes. The history
+    is the peak RSS recorded in the run stats. With no run stats at all,
+    a dense taxa by taxa matrix of doubles (as built by the min cut) is
+    assumed on top of the memory of the interpreter.
+    """
+
+    def _load_history(self, results_folder: str) -> None:
+        for root, subdirs, files in os.walk(results_folder):
+            for file in files:
+                if not file.endswith(RUN_STATS_FILE_SUFFIX):
+                    continue
+                method = file[: -len(RUN_STATS_FILE_SUFFIX)]
+                for parts in read_records(
+                    os.path.join(root, file), ResultsLogger.NUM_RUN_STATS_FIELDS
+                ):
+                    try:
+                        max_rss_kb = float(parts[1])
+                    except ValueError:
+                        continue
+                    self.history[(method, parts[0])] = max_rss_kb
+
+    def _default(self, taxa: int, num_trees: int) -> float:
+        return DEFAULT_BASE_RSS_KB + 8 * taxa**2 / 1024
+
+
+def longest_processing_time_order(
+    jobs: Sequence[Job], costs: Sequence[float]
+) -> List[Tuple[Job, float]]:
+    """
+    Orders the jobs by decreasing predicted cost. Ties keep grid order.
+    """
+    return sorted(zip(jobs, costs), key=lambda x: -x[1])
+
+
+def predicted_makespan(costs: Sequence[float], workers: int) -> float:
+    """
+    The makespan of greedily assigning the costs (in the given order)
+    to whichever worker frees up first.
+    """
+    loads = [0.0] * max(workers, 1)
+    for cost in costs:
+        heapq.heappush(loads, heapq.heappop(loads) + cost)
+    return max(loads)
+
+
+def run_jobs(
+    jobs: Sequence[Job],
+    workers: int = 1,
+    verbosity: int = 1,
+    force_bifurcating: bool = False,
+    cost_model: Optional[CostModel] = None,
+    results_folder: str = RESULTS_FOLDER,
+    seeded: bool = True,
+    distance_pool: Optional[DistancePool] = None,
+    isolate_timing: bool = False,
+    memory_budget_kb: Optional[float] = None,
+    memory_model: Optional[MemoryModel] = None,
+    profile: bool = False,
+    progress_interval: Optional[float] = None,
+) -> None:
+    """
+    Runs the jobs that do not have up to date results over a number of
+    workers, dispatching the jobs with the longest predicted wall time first.
+
+    A result is up to date if it was produced by a run with the same key
+    (see job_key), stale results are replaced.
+
+    In isolated timing mode, each job is pinned to a physical core of its
+    own (so at most one job runs per core) and runs whose timing was
+    likely disturbed by other work on the machine are reported.
+
+    Given a memory budget, a job is only started while the predicted peak
+    memory of the running jobs (including it) fits in the budget. When the
+    next longest job does not fit, shorter jobs that do are started in the
+    meantime. A job that exceeds the budget on its own is run alone.
+
+    Args:
+        jobs (Sequence[Job]): The jobs to run.
+        workers (int): Number of jobs to run at once.
+        verbosity (int): Verbosity level.
+        force_bifurcating (bool): Whether resulting trees are made bifurcating.
+        cost_model (Optional[CostModel]): Predicts job wall times. Built from
+            the results folder if not given.
+        results_folder (str): The folder results are written to.
+        seeded (bool): Whether the job seeds are part of the job keys.
+        distance_pool (Optional[DistancePool]): If given, the distances of
+            each estimated tree are calculated as soon as it is produced.
+        isolate_timing (bool): Whether to run each job on a dedicated core.
+        memory_budget_kb (Optional[float]): If given, the total predicted
+            peak memory of the running jobs is kept within this budget.
+        memory_model (Optional[MemoryModel]): Predicts job peak memory. Built
+            from the results folder if not given.
+        profile (bool): Whether to write a profile of each run (of the Python
+            methods) next to its results.
+        progress_interval (Optional[float]): Seconds between progress summary
+            lines (see ProgressReporter), by default chosen by whether the
+            output is a terminal. 0 prints none.
+    """
+    attach_job_keys(jobs, force_bifurcating=force_bifurcating, seeded=seeded)
+
+    loggers: Dict[str, ResultsLogger] = {}
+    pending = []
+    for job in jobs:
+        if job.experiment_directory not in loggers:
+            loggers[job.experiment_directory] = ResultsLogger(
+                results_folder, job.experiment_directory
+            )
+        logger = loggers[job.experiment_directory]
+        if logger.result_already_exists(job.method, job.source_tree_file, job.key):
+            if verbosity >= 2:
+                print(
+                    "Result already exists for",
+                    job.method,
+                    "on",
+                    job.source_tree_file + "... skipping.",
+                )
+            continue
+        pending.append(job)
+
+    if verbosity >= 1 and len(pending) < len(jobs):
+        print(f"Skipping {len(jobs) - len(pending)} jobs with existing results.")
+    if len(pending) == 0:
+        return
+
+    if cost_model is None:
+        cost_model = CostModel(results_folder)
+    ordered = longest_processing_time_order(
+        pending, [cost_model.predict(job) for job in pending]
+    )
+
+    core_pool = None
+    if isolate_timing:
+        core_pool = CorePool(physical_cores())
+        if workers > len(core_pool.cores):
+            if verbosity >= 1:
+                print(
+                    f"Only {len(core_pool.cores)} physical cores are available "
+                    "for isolated timing, reducing the number of workers."
+                )
+            workers = len(core_pool.cores)
+
+    if verbosity >= 1:
+        makespan = predicted_makespan([cost for _, cost in ordered], workers)
+        total = sum(cost for _, cost in ordered)
+        print(
+            f"Running {len(ordered)} jobs on {workers} workers. "
+            f"Predicted total time {format_duration(total)}, "
+            f"predicted makespan {format_duration(makespan)}."
+        )
+
+    progress = ProgressReporter(
+        len(jobs),
+        workers=workers,
+        interval=progress_interval if verbosity >= 1 else 0,
+    )
+    progress.skip(len(jobs) - len(pending))
+    predictions = {id(job): cost for job, cost in ordered}
+    for job, cost in ordered:
+        progress.expect(job.method, cost)
+
+    def execute(job: Job) -> None:
+        profile_file = None
+        if profile:
+            profile_file = profile_path(
+                loggers[job.experiment_directory].write_directory,
+                job.method,
+                job.source_tree_file,
+            )
+        if core_pool is None:
+            tree, wall_time, cpu_time, stats = run_method_measured(
+                job.method,
+                job.source_tree_file,
+                seed=job.seed,
+                force_bifurcating=force_bifurcating,
+                verbosity=verbosity,
+                profile_file=profile_file,
+                workers=workers,
+            )
+        else:
+            with core_pool.core() as cpu:
+                tree, wall_time, cpu_time, stats = run_method_measured(
+                    job.method,
+                    job.source_tree_file,
+                    seed=job.seed,
+                    force_bifurcating=force_bifurcating,
+                    verbosity=verbosity,
+                    cpu=cpu,
+                    profile_file=profile_file,
+                    workers=workers,
+                )
+        if verbosity >= 1:
+            if tree is None:
+                print(
+                    f"{job.method}: wall={wall_time:.2f}s failed: {job.source_tree_file}"
+                )
+            else:
+                print(
+                    f"{job.method}: wall={wall_time:.2f}s cpu={cpu_time:.2f}s ({job.source_tree_file})"
+                )
+        loggers[job.experiment_directory].write_results(
+            job.method,
+            job.model_tree_file,
+            job.source_tree_file,
+            wall_time,
+            cpu_time,  # type: ignore
+            tree,  # type: ignore
+            job.key,
+        )
+        loggers[job.experiment_directory].write_run_stats(
+            job.method, job.source_tree_file, stats
+        )
+        if isolate_timing and stats.disturbed and verbosity >= 1:
+            print(
+                f"Warning: the timing of {job.method} on {job.source_tree_file} "
+                f"was likely disturbed (load {stats.max_load:.2f}, "
+                f"{stats.involuntary_switches} involuntary context switches)."
+            )
+        if distance_pool is not None:
+            distance_pool.submit(
+                loggers[job.experiment_directory].write_directory,
+                job.method,
+                job.model_tree_file,
+                job.source_tree_file,
+                wall_time,
+                cpu_time,
+                tree,
+            )
+        progress.complete(
+            job.method, wall_time, predictions[id(job)], failed=tree is None
+        )
+
+    memory = {}
+    if memory_budget_kb is not None:
+        if memory_model is None:
+            memory_model = MemoryModel(results_folder)
+        for job, _ in ordered:
+            memory[id(job)] = memory_model.predict(job)
+            if verbosity >= 1 and memory[id(job)] > memory_budget_kb:
+                print(
+                    f"Warning: {job.method} on {job.source_tree_file} is predicted "
+                    f"to use {memory[id(job)] / 1024:.0f}MB, over the memory budget. "
+                    "It will be run alone."
+                )
+
+    queued = [job for job, _ in ordered]
+    running: Dict[Future, Job] = {}
+    memory_in_use = 0.0
+
+    def admissible(job: Job) -> bool:
+        if memory_budget_kb is None or len(running) == 0:
+            return True
+        return memory_in_use + memory[id(job)] <= memory_budget_kb
+
+    with progress, ThreadPoolExecutor(max_workers=workers) as executor:
+        while len(queued) > 0 or len(running) > 0:
+            # Start the longest jobs that fit, filling gaps with shorter ones
+            i = 0
+            while i < len(queued) and len(running) < workers:
+                job = queued[i]
+                if not admissible(job):
+                    i += 1
+                    continue
+                del queued[i]
+                running[executor.submit(execute, job)] = job
+                memory_in_use += memory.get(id(job), 0.0)
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                memory_in_use -= memory.get(id(job), 0.0)
+                future.result()
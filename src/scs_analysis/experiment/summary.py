@@ -0,0 +1,143 @@
+"""
+Summary statistics comparing the methods of an experiment.
+
+The results of each pair of methods are joined on the model and source
+trees they were estimated from (rather than by their position), and for
+each pair and metric the summary holds the median of the ratios of the
+method's values to the baseline's, a bootstrap confidence interval of
+that median, and how often the method did better than, worse than and as
+well as the baseline (lower is better for every metric summarised).
+"""
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+KEY_COLUMNS = ["Model Tree", "Source Tree"]
+SUMMARY_METRICS = ("CPU Time", "RF Distance", "Matching Cluster Distance")
+
+BOOTSTRAP_SAMPLES = 1000
+CONFIDENCE = 0.95
+SEED = 0
+
+SUMMARY_FILE = "summary.tsv"
+
+
+def paired_results(
+    df: pd.DataFrame,
+    group_col: Optional[str] = None,
+    metrics: Sequence[str] = SUMMARY_METRICS,
+) -> pd.DataFrame:
+    """
+    The values of each metric of every ordered pair of methods on the same
+    model and source trees, one row per pair, metric and source tree file.
+
+    Args:
+        df (pd.DataFrame): The results, as loaded by graph.load_data.
+        group_col (Optional[str]): A column the results are grouped by.
+        metrics (Sequence[str]): The metrics to pair.
+
+    Returns:
+        pd.DataFrame: The group (if any), Method, Baseline, Metric, Value,
+        Baseline Value and Ratio of each pairing.
+    """
+    index = ([] if group_col is None else [group_col]) + KEY_COLUMNS
+    df = df.drop_duplicates(index + ["Method"], keep="last")
+    long = df.melt(
+        id_vars=index + ["Method"],
+        value_vars=list(metrics),
+        var_name="Metric",
+        value_name="Value",
+    )
+    long["Method"] = long["Method"].astype(str)
+    pairs = long.merge(
+        long.rename(columns={"Method": "Baseline", "Value": "Baseline Value"}),
+        on=index + ["Metric"],
+    )
+    pairs = pairs[pairs["Method"] != pairs["Baseline"]].reset_index(drop=True)
+    values = pairs["Value"].to_numpy(float)
+    baseline_values = pairs["Baseline Value"].to_numpy(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pairs["Ratio"] = values / baseline_values
+    return pairs
+
+
+def bootstrap_median_ci(
+    values: np.ndarray,
+    rng: np.random.Generator,
+    samples: int = BOOTSTRAP_SAMPLES,
+    confidence: float = CONFIDENCE,
+) -> np.ndarray:
+    """
+    A percentile bootstrap confidence interval of the median of the values
+    (ignoring undefined values), NaNs if there are none.
+    """
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.array([np.nan, np.nan])
+    resamples = values[rng.integers(0, len(values), size=(samples, len(values)))]
+    medians = np.median(resamples, axis=1)
+    tail = (1 - confidence) / 2
+    return np.quantile(medians, [tail, 1 - tail])
+
+
+def summarise(
+    df: pd.DataFrame,
+    group_col: Optional[str] = None,
+    metrics: Sequence[str] = SUMMARY_METRICS,
+    samples: int = BOOTSTRAP_SAMPLES,
+    confidence: float = CONFIDENCE,
+    seed: int = SEED,
+) -> pd.DataFrame:
+    """
+    Compares every ordered pair of methods on each metric.
+
+    Ratios that are undefined (both values being 0) are left out of the
+    medians.
+
+    Args:
+        df (pd.DataFrame): The results, as loaded by graph.load_data.
+        group_col (Optional[str]): A column to summarise each group of
+            separately, such as the number of source trees.
+        metrics (Sequence[str]): The metrics to compare (lower is better).
+        samples (int): The number of bootstrap resamples.
+        confidence (float): The confidence level of the intervals.
+        seed (int): The seed of the bootstrap resampling.
+
+    Returns:
+        pd.DataFrame: The group (if any), Method, Baseline, Metric, Pairs,
+        Median Ratio, CI Low, CI High, Wins, Losses and Ties of each pair
+        of methods and metric.
+    """
+    groups: List[str] = [] if group_col is None else [group_col]
+    pairs = paired_results(df, group_col, metrics)
+    pairs["Wins"] = pairs["Value"] < pairs["Baseline Value"]
+    pairs["Losses"] = pairs["Value"] > pairs["Baseline Value"]
+    pairs["Ties"] = pairs["Value"] == pairs["Baseline Value"]
+
+    by = groups + ["Method", "Baseline", "Metric"]
+    grouped = pairs.groupby(by, sort=True)
+    summary = grouped.agg(
+        Pairs=("Ratio", "size"),
+        **{"Median Ratio": ("Ratio", "median")},
+        Wins=("Wins", "sum"),
+        Losses=("Losses", "sum"),
+        Ties=("Ties", "sum"),
+    )
+
+    rng = np.random.default_rng(seed)
+    intervals = np.array(
+        [
+            bootstrap_median_ci(ratios.to_numpy(), rng, samples, confidence)
+            for _, ratios in grouped["Ratio"]
+        ]
+    ).reshape(-1, 2)
+    summary.insert(2, "CI Low", intervals[:, 0])
+    summary.insert(3, "CI High", intervals[:, 1])
+    return summary.reset_index()
+
+
+def write_summary(summary: pd.DataFrame, file_path: str) -> None:
+    summary.to_csv(file_path, sep="\t", index=False)
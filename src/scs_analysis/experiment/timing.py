@@ -0,0 +1,217 @@
+"""
+Measurement of method runs.
+
+Each method script is run as a child process and reaped with wait4, which
+gives the resource usage (peak RSS, context switches) of the script and
+everything it waited on. In isolated timing mode, each run is pinned to a
+dedicated physical core, leaving the SMT siblings of the cores in use
+idle, and runs whose timing was likely disturbed by other work are flagged.
+"""
+
+import os
+import queue
+import subprocess
+import threading
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+
+TASKSET = "taskset"
+
+LOADAVG_PATH = "/proc/loadavg"
+CPU_TOPOLOGY_PATH = "/sys/devices/system/cpu/cpu{}/topology/thread_siblings_list"
+
+# Seconds between samples of the load average during a run
+LOADAVG_INTERVAL = 5.0
+
+# A CPU bound process alone on a core is rarely preempted, more involuntary
+# context switches than this per second of CPU time mean it shared its core
+MAX_INVOLUNTARY_SWITCH_RATE = 20.0
+
+
+@dataclass
+class RunStats:
+    """Resource usage of a method run."""
+
+    max_rss_kb: int
+    voluntary_switches: int
+    involuntary_switches: int
+    max_load: float
+    cpu: Optional[int] = None
+    disturbed: bool = False
+
+
+def parse_run_stats(parts: Sequence[str]) -> RunStats:
+    """
+    Reads run stats back from the fields they were recorded as.
+    """
+    max_rss_kb, voluntary, involuntary, max_load, cpu, disturbed = parts
+    return RunStats(
+        max_rss_kb=int(max_rss_kb),
+        voluntary_switches=int(voluntary),
+        involuntary_switches=int(involuntary),
+        max_load=float(max_load),
+        cpu=None if cpu == "None" else int(cpu),
+        disturbed=disturbed == "True",
+    )
+
+
+def _parse_cpu_list(cpu_list: str) -> Set[int]:
+    cpus = set()
+    for part in cpu_list.strip().split(","):
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.update(range(int(start), int(end) + 1))
+        elif part:
+            cpus.add(int(part))
+    return cpus
+
+
+def physical_cores() -> List[int]:
+    """
+    One logical CPU (the lowest numbered SMT sibling) for each physical
+    core this process may run on.
+    """
+    allowed = os.sched_getaffinity(0)
+    cores = set()
+    for cpu in allowed:
+        try:
+            with open(CPU_TOPOLOGY_PATH.format(cpu), "r") as f:
+                siblings = _parse_cpu_list(f.read())
+        except OSError:
+            siblings = {cpu}
+        cores.add(min(siblings & allowed or {cpu}))
+    return sorted(cores)
+
+
+@lru_cache(maxsize=1)
+def _num_physical_cores() -> int:
+    return len(physical_cores())
+
+
+def read_loadavg() -> float:
+    """
+    The one minute load average, or 0 if it is unavailable.
+    """
+    try:
+        with open(LOADAVG_PATH, "r") as f:
+            return float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class CorePool:
+    """
+    Hands out dedicated cores to concurrently running jobs.
+    """
+
+    def __init__(self, cores: Sequence[int]) -> None:
+        self.cores = list(cores)
+        self._free: "queue.Queue[int]" = queue.Queue()
+        for core in self.cores:
+            self._free.put(core)
+
+    @contextmanager
+    def core(self) -> Iterator[int]:
+        core = self._free.get()
+        try:
+            yield core
+        finally:
+            self._free.put(core)
+
+
+def run_command(
+    command: Sequence[str],
+    cpu: Optional[int] = None,
+    env: Optional[Dict[str, str]] = None,
+    workers: int = 1,
+) -> Tuple[bytes, bytes, RunStats]:
+    """
+    Runs a command, collecting the resource usage of it and its children.
+
+    Args:
+        command (Sequence[str]): The command to run.
+        cpu (Optional[int]): If given, the command (and everything it runs)
+            is pinned to this logical CPU.
+        env (Optional[Dict[str, str]]): The environment of the command, the
+            environment of this process if None.
+        workers (int): The number of runs made alongside each other, this
+            one included, whose load is not counted as other work.
+
+    Returns:
+        Tuple[bytes, bytes, RunStats]: The standard output, standard error
+        and resource usage of the command.
+    """
+    max_load = read_loadavg()
+    finished = threading.Event()
+
+    def sample_load() -> None:
+        nonlocal max_load
+        while not finished.wait(LOADAVG_INTERVAL):
+            max_load = max(max_load, read_loadavg())
+
+    if cpu is not None:
+        # Pinned by taskset before the command starts (a preexec_fn is not
+        # safe with the threads of this process)
+        command = [TASKSET, "-c", str(cpu), *command]
+
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+    )
+    stderr: List[bytes] = []
+    stderr_reader = threading.Thread(
+        target=lambda: stderr.append(process.stderr.read())  # type: ignore
+    )
+    load_sampler = threading.Thread(target=sample_load, daemon=True)
+    stderr_reader.start()
+    load_sampler.start()
+
+    stdout = process.stdout.read()  # type: ignore
+    stderr_reader.join()
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    finished.set()
+    load_sampler.join()
+    max_load = max(max_load, read_loadavg())
+
+    stats = RunStats(
+        max_rss_kb=rusage.ru_maxrss,
+        voluntary_switches=rusage.ru_nvcsw,
+        involuntary_switches=rusage.ru_nivcsw,
+        max_load=max_load,
+        cpu=cpu,
+    )
+    stats.disturbed = is_disturbed(
+        stats, rusage.ru_utime + rusage.ru_stime, workers=workers
+    )
+    return stdout, stderr[0], stats
+
+
+def is_disturbed(
+    stats: RunStats,
+    cpu_time: float,
+    available_cores: Optional[int] = None,
+    workers: int = 1,
+) -> bool:
+    """
+    Whether the timing of a run was likely disturbed by other work.
+
+    Either the load average, less the runs made alongside each other by the
+    workers, exceeded the physical cores left over after the workers at
+    some point during the run, or the run was preempted more than a CPU
+    bound process on a core of its own is.
+    """
+    if available_cores is None:
+        available_cores = _num_physical_cores()
+    other_load = stats.max_load - workers
+    if other_load > max(available_cores - workers, 0):
+        return True
+    return stats.involuntary_switches > MAX_INVOLUNTARY_SWITCH_RATE * max(
+        cpu_time, 1.0
+    )
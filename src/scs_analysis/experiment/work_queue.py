@@ -0,0 +1,466 @@
+"""
+A job queue held in a directory on a shared filesystem.
+
+Jobs move between sub-directories of the queue by renaming, which is
+atomic within a filesystem, so any number of workers (on any number of
+machines sharing the directory) can drain the same queue:
+
+    pending/  jobs waiting to be run
+    claimed/  jobs a worker has claimed by renaming them out of pending/
+    leases/   one lease per claimed job, refreshed by the worker's heartbeat
+    done/     finished jobs
+    failed/   jobs whose execution raised an exception
+    shards/   one results folder per worker
+
+A claimed job whose lease has not been refreshed within the lease
+timeout (the worker died or lost the filesystem) is moved back to
+pending/. Lease times are wall clock times, so machines are assumed to
+have synchronised clocks (well within the lease timeout).
+"""
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from scs_analysis.experiment.experiment import (
+    RESULTS_FOLDER,
+    Job,
+    ResultsLogger,
+    attach_job_keys,
+    run_method_measured,
+)
+from scs_analysis.experiment.result_files import read_records
+from scs_analysis.experiment.scheduler import (
+    CostModel,
+    longest_processing_time_order,
+)
+
+
+PENDING = "pending"
+CLAIMED = "claimed"
+LEASES = "leases"
+DONE = "done"
+FAILED = "failed"
+SHARDS = "shards"
+
+QUEUE_DIRECTORIES = (PENDING, CLAIMED, LEASES, DONE, FAILED, SHARDS)
+
+DEFAULT_LEASE_TIMEOUT = 600.0
+DEFAULT_HEARTBEAT_INTERVAL = 30.0
+DEFAULT_POLL_INTERVAL = 10.0
+
+
+def _queue_path(queue_directory: str, *parts: str) -> str:
+    return os.path.join(queue_directory, *parts)
+
+
+def make_queue(queue_directory: str) -> None:
+    for directory in QUEUE_DIRECTORIES:
+        os.makedirs(_queue_path(queue_directory, directory), exist_ok=True)
+
+
+def job_digest(job: Job) -> str:
+    """
+    Identifies a job independently of its position in the queue.
+    """
+    identifier = "\t".join(
+        (job.method, job.source_tree_file, job.experiment_directory, str(job.key))
+    )
+    return hashlib.sha1(identifier.encode("utf-8")).hexdigest()
+
+
+def _digest_of(job_file: str) -> str:
+    return job_file.split("_", 1)[1].split(".", 1)[0]
+
+
+def _job_files(queue_directory: str, directory: str) -> List[str]:
+    return sorted(
+        filter(
+            lambda x: x.endswith(".json"),
+            os.listdir(_queue_path(queue_directory, directory)),
+        )
+    )
+
+
+def _read_job(path: str) -> Job:
+    with open(path, "r") as f:
+        return Job(**json.load(f))
+
+
+def _write_atomic(path: str, content: str) -> None:
+    tmp_path = path + f".{socket.gethostname()}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def enqueue_jobs(
+    queue_directory: str,
+    jobs: Sequence[Job],
+    results_folder: str = RESULTS_FOLDER,
+    cost_model: Optional[CostModel] = None,
+    seeded: bool = True,
+    verbosity: int = 1,
+) -> int:
+    """
+    Adds jobs to the queue, longest predicted wall time first.
+
+    Jobs that already have up to date results in the results folder (see
+    job_key), or are already in the queue (in any state), are not added again.
+
+    Returns:
+        int: The number of jobs added.
+    """
+    make_queue(queue_directory)
+    attach_job_keys(jobs, seeded=seeded)
+
+    queued: Set[str] = set()
+    for directory in (PENDING, CLAIMED, DONE, FAILED):
+        queued.update(map(_digest_of, _job_files(queue_directory, directory)))
+
+    loggers: Dict[str, ResultsLogger] = {}
+    new_jobs = []
+    for job in jobs:
+        if job_digest(job) in queued:
+            continue
+        if job.experiment_directory not in loggers:
+            loggers[job.experiment_directory] = ResultsLogger(
+                results_folder, job.experiment_directory
+            )
+        if loggers[job.experiment_directory].result_already_exists(
+            job.method, job.source_tree_file, job.key
+        ):
+            continue
+        queued.add(job_digest(job))
+        new_jobs.append(job)
+
+    if cost_model is None:
+        cost_model = CostModel(results_folder)
+    ordered = longest_processing_time_order(
+        new_jobs, [cost_model.predict(job) for job in new_jobs]
+    )
+
+    for rank, (job, _) in enumerate(ordered):
+        job_file = f"{rank:06}_{job_digest(job)}.json"
+        _write_atomic(
+            _queue_path(queue_directory, PENDING, job_file), json.dumps(asdict(job))
+        )
+
+    if verbosity >= 1:
+        print(f"Enqueued {len(ordered)} jobs in {queue_directory}.")
+    return len(ordered)
+
+
+def _write_lease(queue_directory: str, job_file: str, worker_id: str) -> None:
+    _write_atomic(
+        _queue_path(queue_directory, LEASES, job_file),
+        json.dumps({"worker": worker_id, "heartbeat": time.time()}),
+    )
+
+
+def _lease_owner(queue_directory: str, job_file: str) -> Optional[str]:
+    """
+    The worker holding the lease on a claimed job, None if there is no lease.
+    """
+    try:
+        with open(_queue_path(queue_directory, LEASES, job_file), "r") as f:
+            return json.load(f)["worker"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def claim_job(queue_directory: str, worker_id: str) -> Optional[str]:
+    """
+    Claims the next pending job by renaming it into claimed/.
+
+    Returns:
+        Optional[str]: The name of the claimed job file, or None if
+        there are no pending jobs left.
+    """
+    for job_file in _job_files(queue_directory, PENDING):
+        try:
+            os.rename(
+                _queue_path(queue_directory, PENDING, job_file),
+                _queue_path(queue_directory, CLAIMED, job_file),
+            )
+        except FileNotFoundError:
+            continue  # Another worker claimed it first
+        _write_lease(queue_directory, job_file, worker_id)
+        return job_file
+    return None
+
+
+def reclaim_expired_leases(
+    queue_directory: str, lease_timeout: float = DEFAULT_LEASE_TIMEOUT
+) -> List[str]:
+    """
+    Moves claimed jobs whose lease expired back into pending/.
+
+    A claimed job without a lease (its worker died between claiming and
+    writing the lease) expires relative to the time it was claimed.
+
+    Returns:
+        List[str]: The reclaimed job files.
+    """
+    now = time.time()
+    reclaimed = []
+    for job_file in _job_files(queue_directory, CLAIMED):
+        claimed_path = _queue_path(queue_directory, CLAIMED, job_file)
+        lease_path = _queue_path(queue_directory, LEASES, job_file)
+        try:
+            with open(lease_path, "r") as f:
+                heartbeat = json.load(f)["heartbeat"]
+        except (FileNotFoundError, ValueError, KeyError):
+            try:
+                heartbeat = os.stat(claimed_path).st_ctime
+            except FileNotFoundError:
+                continue
+        if now - heartbeat < lease_timeout:
+            continue
+        # The lease goes first, so the expired worker's heartbeat stops
+        _remove(lease_path)
+        try:
+            os.rename(claimed_path, _queue_path(queue_directory, PENDING, job_file))
+        except FileNotFoundError:
+            continue  # Finished or reclaimed by someone else
+        reclaimed.append(job_file)
+    return reclaimed
+
+
+def holds_lease(queue_directory: str, job_file: str, worker_id: str) -> bool:
+    """
+    Whether the worker still holds the lease on a job it claimed (which it
+    loses once the lease expires and the job is reclaimed, possibly by
+    another worker).
+    """
+    if not os.path.exists(_queue_path(queue_directory, CLAIMED, job_file)):
+        return False
+    return _lease_owner(queue_directory, job_file) == worker_id
+
+
+class Heartbeat:
+    """
+    Periodically refreshes the lease on a claimed job from a background thread.
+    """
+
+    def __init__(
+        self, queue_directory: str, job_file: str, worker_id: str, interval: float
+    ) -> None:
+        self.queue_directory = queue_directory
+        self.job_file = job_file
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self) -> None:
+        while not self._stop.wait(self.interval):
+            if not holds_lease(self.queue_directory, self.job_file, self.worker_id):
+                return  # Lease was lost, the job has been reclaimed
+            _write_lease(self.queue_directory, self.job_file, self.worker_id)
+
+    def __enter__(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def shard_folder(queue_directory: str, worker_id: str) -> str:
+    return _queue_path(queue_directory, SHARDS, worker_id) + "/"
+
+
+def execute_job(job: Job, results_folder: str, verbosity: int = 1) -> None:
+    """
+    Runs a job and writes its result into the given results folder.
+    """
+    logger = ResultsLogger(results_folder, job.experiment_directory)
+    if logger.result_already_exists(job.method, job.source_tree_file, job.key):
+        return
+    tree, wall_time, cpu_time, stats = run_method_measured(
+        job.method, job.source_tree_file, seed=job.seed, verbosity=verbosity
+    )
+    logger.write_results(
+        job.method,
+        job.model_tree_file,
+        job.source_tree_file,
+        wall_time,
+        cpu_time,  # type: ignore
+        tree,  # type: ignore
+        job.key,
+    )
+    logger.write_run_stats(job.method, job.source_tree_file, stats)
+
+
+def run_worker(
+    queue_directory: str,
+    worker_id: Optional[str] = None,
+    lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+    heartbeat_interval: float = DEFAULT_HEARTBEAT_INTERVAL,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    execute: Callable[[Job, str, int], None] = execute_job,
+    verbosity: int = 1,
+) -> int:
+    """
+    Drains the queue, writing results to this worker's shard.
+
+    The worker returns once nothing is pending or claimed. While other
+    workers still hold claims it keeps polling so that the jobs of a
+    worker that died are picked up once their lease expires.
+
+    Args:
+        queue_directory (str): The queue directory.
+        worker_id (Optional[str]): Unique name of the worker. Defaults to
+            the host name and process id.
+        lease_timeout (float): Seconds without a heartbeat before a claimed
+            job is reclaimed.
+        heartbeat_interval (float): Seconds between lease refreshes.
+        poll_interval (float): Seconds to wait while other workers hold claims.
+        execute (Callable[[Job, str, int], None]): Runs a job, writing the
+            result to the given results folder.
+        verbosity (int): Verbosity level.
+
+    Returns:
+        int: The number of jobs this worker ran.
+    """
+    if worker_id is None:
+        worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    make_queue(queue_directory)
+    results_folder = shard_folder(queue_directory, worker_id)
+
+    jobs_run = 0
+    while True:
+        reclaimed = reclaim_expired_leases(queue_directory, lease_timeout)
+        if verbosity >= 1 and len(reclaimed) > 0:
+            print(f"Reclaimed {len(reclaimed)} jobs with expired leases.")
+
+        job_file = claim_job(queue_directory, worker_id)
+        if job_file is None:
+            if len(_job_files(queue_directory, CLAIMED)) == 0:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        claimed_path = _queue_path(queue_directory, CLAIMED, job_file)
+        job = _read_job(claimed_path)
+        if verbosity >= 1:
+            print(f"[{worker_id}] Running {job.method} on {job.source_tree_file}")
+
+        finished_directory = DONE
+        with Heartbeat(queue_directory, job_file, worker_id, heartbeat_interval):
+            try:
+                execute(job, results_folder, verbosity)
+            except Exception as e:
+                print(e)
+                finished_directory = FAILED
+        jobs_run += 1
+
+        if not holds_lease(queue_directory, job_file, worker_id):
+            # The lease expired and the job was reclaimed, it is left to
+            # whoever holds it now
+            if verbosity >= 1:
+                print(f"[{worker_id}] Lost the lease on {job_file}.")
+            continue
+        try:
+            os.rename(
+                claimed_path, _queue_path(queue_directory, finished_directory, job_file)
+            )
+        except FileNotFoundError:
+            pass  # Reclaimed since the lease was checked
+        _remove(_queue_path(queue_directory, LEASES, job_file))
+
+    if verbosity >= 1:
+        print(f"[{worker_id}] Queue drained after running {jobs_run} jobs.")
+    return jobs_run
+
+
+def _recorded_keys(logger: ResultsLogger, method: str) -> Dict[str, Optional[str]]:
+    """
+    The key of each result of the method by source tree file, None for the
+    results with no recorded key.
+    """
+    file_path = logger.format_file_path(method)
+    if not os.path.exists(file_path):
+        return {}
+    keys: Dict[str, Optional[str]] = {}
+    key_file_path = logger.format_key_file_path(method)
+    if os.path.exists(key_file_path):
+        keys.update(read_records(key_file_path, ResultsLogger.NUM_KEY_FIELDS))
+    return {
+        parts[1]: keys.get(parts[1])
+        for parts in read_records(file_path, ResultsLogger.NUM_FIELDS)
+    }
+
+
+def merge_shards(
+    queue_directory: str, results_folder: str = RESULTS_FOLDER, verbosity: int = 1
+) -> int:
+    """
+    Merges the result shards of all workers into the results folder.
+
+    Records for a method and source tree file that already exist in the
+    results folder with the same key are not added again (a job can be run
+    twice when its lease expired while the worker was still alive).
+
+    Returns:
+        int: The number of records added to the results folder.
+    """
+    shards_path = _queue_path(queue_directory, SHARDS)
+    if not os.path.exists(shards_path):
+        return 0
+
+    added = 0
+    for worker_id in sorted(os.listdir(shards_path)):
+        shard = os.path.join(shards_path, worker_id)
+        for root, subdirs, files in os.walk(shard):
+            for file in sorted(files):
+                if not file.endswith("_results.tsv"):
+                    continue
+                experiment_directory = os.path.relpath(root, shard) + "/"
+                shard_logger = ResultsLogger(shard + "/", experiment_directory)
+                logger = ResultsLogger(results_folder, experiment_directory)
+                method = file[:-12]
+                run_stats = shard_logger.read_run_stats(method)
+                # Read once, rather than looked up in the indexes for each record
+                shard_keys = _recorded_keys(shard_logger, method)
+                existing_keys = _recorded_keys(logger, method)
+
+                for mtf, stf, wall_time, cpu_time, tree in read_records(
+                    os.path.join(root, file), ResultsLogger.NUM_FIELDS
+                ):
+                    key = shard_keys.get(stf)
+                    # As result_already_exists: a result with a different
+                    # key is stale
+                    if stf in existing_keys and (
+                        key is None or existing_keys[stf] in (None, key)
+                    ):
+                        continue
+                    tree = shard_logger.tree_store.resolve(tree)
+                    logger.write_results(
+                        method, mtf, stf, wall_time, cpu_time, tree, key  # type: ignore
+                    )
+                    if stf in run_stats:
+                        logger.write_run_stats(method, stf, run_stats[stf])
+                    existing_keys[stf] = key
+                    added += 1
+
+    if verbosity >= 1:
+        print(f"Merged {added} results into {results_folder}.")
+    return added
@@ -0,0 +1,179 @@
+"""
+Comparison of micro-benchmark results against a stored baseline.
+
+Both the results of `scsa microbench` and the JSON saved by
+pytest-benchmark (--benchmark-json) can be compared. The latter has no
+memory measurements, so only times are compared for it.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_TOLERANCE = 0.1
+
+# Differences in median time below this many seconds are noise
+MIN_TIME_DIFFERENCE = 1e-3
+
+
+@dataclass
+class Comparison:
+    """The change in a benchmark between the baseline and current results."""
+
+    name: str
+    baseline_time: Optional[float]
+    current_time: Optional[float]
+    baseline_memory: Optional[float] = None
+    current_memory: Optional[float] = None
+    time_regressed: bool = False
+    memory_regressed: bool = False
+
+    @property
+    def regressed(self) -> bool:
+        return self.time_regressed or self.memory_regressed
+
+
+def benchmark_stats(
+    results: Dict[str, Any]
+) -> Dict[str, Tuple[float, Optional[float]]]:
+    """
+    The median time and peak memory (if measured) of each benchmark.
+    """
+    stats = {}
+    for benchmark in results["benchmarks"]:
+        if "stats" in benchmark:
+            # pytest-benchmark, the benchmark parameter is the hot path name
+            name = benchmark.get("param") or benchmark["name"]
+            stats[name] = (benchmark["stats"]["median"], None)
+        else:
+            stats[benchmark["name"]] = (
+                benchmark["median"],
+                benchmark.get("peak_memory"),
+            )
+    return stats
+
+
+def _regressed(
+    baseline: Optional[float],
+    current: Optional[float],
+    tolerance: float,
+    min_difference: float = 0.0,
+) -> bool:
+    if baseline is None or current is None:
+        return False
+    return (
+        current > baseline * (1 + tolerance) and current - baseline >= min_difference
+    )
+
+
+def compare_benchmarks(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+    memory_tolerance: Optional[float] = None,
+) -> List[Comparison]:
+    """
+    Compares the current benchmark results against the baseline.
+
+    Args:
+        baseline (Dict[str, Any]): The baseline results.
+        current (Dict[str, Any]): The current results.
+        tolerance (float): The fraction the median time of a benchmark may
+            grow by before it is a regression.
+        memory_tolerance (Optional[float]): The fraction the peak memory of
+            a benchmark may grow by. Defaults to the time tolerance.
+
+    Returns:
+        List[Comparison]: The comparison of each benchmark in either results,
+        in the order of the baseline.
+    """
+    if memory_tolerance is None:
+        memory_tolerance = tolerance
+
+    baseline_stats = benchmark_stats(baseline)
+    current_stats = benchmark_stats(current)
+    names = list(baseline_stats) + [
+        name for name in current_stats if name not in baseline_stats
+    ]
+
+    comparisons = []
+    for name in names:
+        baseline_time, baseline_memory = baseline_stats.get(name, (None, None))
+        current_time, current_memory = current_stats.get(name, (None, None))
+        comparison = Comparison(
+            name, baseline_time, current_time, baseline_memory, current_memory
+        )
+        comparison.time_regressed = _regressed(
+            baseline_time, current_time, tolerance, MIN_TIME_DIFFERENCE
+        )
+        comparison.memory_regressed = _regressed(
+            baseline_memory, current_memory, memory_tolerance
+        )
+        comparisons.append(comparison)
+    return comparisons
+
+
+def _format_change(baseline: Optional[float], current: Optional[float]) -> str:
+    if baseline is None or current is None:
+        return ""
+    if baseline == 0:
+        return "+inf%" if current > 0 else "+0.0%"
+    return f"{(current - baseline) / baseline:+.1%}"
+
+
+def _format_time(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.4f}s"
+
+
+def _format_memory(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value / 2**20:.1f}MB"
+
+
+def format_comparison_table(comparisons: List[Comparison]) -> str:
+    """
+    A table of the baseline and current median time and peak memory of each
+    benchmark, with regressions marked.
+    """
+    header = [
+        "Benchmark",
+        "Baseline",
+        "Current",
+        "Change",
+        "Base Mem",
+        "Mem",
+        "Change",
+        "",
+    ]
+    rows = [header]
+    for comparison in comparisons:
+        if comparison.baseline_time is None:
+            status = "new"
+        elif comparison.current_time is None:
+            status = "missing"
+        elif comparison.regressed:
+            status = "REGRESSION"
+        else:
+            status = "ok"
+        rows.append(
+            [
+                comparison.name,
+                _format_time(comparison.baseline_time),
+                _format_time(comparison.current_time),
+                _format_change(comparison.baseline_time, comparison.current_time),
+                _format_memory(comparison.baseline_memory),
+                _format_memory(comparison.current_memory),
+                _format_change(comparison.baseline_memory, comparison.current_memory),
+                status,
+            ]
+        )
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    lines = []
+    for row in rows:
+        cells = [row[0].ljust(widths[0])]
+        cells.extend(
+            cell.rjust(width) for cell, width in zip(row[1:-1], widths[1:-1])
+        )
+        cells.append(row[-1])
+        lines.append("  ".join(cells).rstrip())
+    return "\n".join(lines)
@@ -0,0 +1,158 @@
+"""
+The hot paths of the analysis, with seeded synthetic inputs to benchmark
+them on.
+"""
+
+import importlib.util
+import os
+import random
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from cogent3 import make_tree
+from cogent3.core.tree import PhyloNode
+
+from scs_analysis.data_generation.birth_death import birth_death_tree
+from scs_analysis.data_generation.dcm3 import dcm3
+from scs_analysis.data_generation.tree_height import randomly_scale_tree_height
+from scs_analysis.distance.day_distance import com_clust, make_psw, rename_trees
+from scs_analysis.distance.distance import (
+    matching_cluster_distance,
+    rooted_f1_distance,
+    rooted_rf_distance,
+)
+
+
+MIN_CUT_SUPERTREE_PATH = "methods/mcs/min_cut_supertree.py"
+
+SIZES = (100, 1000, 10000)
+SEED = 0
+
+# Estimated trees are the model tree with this fraction of tips swapped
+SWAPPED_TIP_FRACTION = 0.005
+
+NUM_SOURCE_TREES = 10
+SOURCE_TREES_PER_TAXON = 3
+
+
+@dataclass
+class HotPath:
+    """
+    A function to benchmark. The setup builds fresh arguments for a run
+    of the function on a number of taxa, and is not timed.
+    """
+
+    name: str
+    setup: Callable[[int], Tuple]
+    run: Callable[..., Any]
+    sizes: Sequence[int] = field(default_factory=lambda: SIZES)
+
+
+@lru_cache(maxsize=None)
+def _synthetic_newick(taxa: int, seed: int) -> str:
+    rng = random.Random(seed)
+    nodes = [f"t{i}:{rng.expovariate(1.0):.6f}" for i in range(taxa)]
+    # Coalesce uniformly random pairs of lineages
+    while len(nodes) > 1:
+        i = rng.randrange(len(nodes))
+        nodes[i], nodes[-1] = nodes[-1], nodes[i]
+        first = nodes.pop()
+        j = rng.randrange(len(nodes))
+        nodes[j] = f"({first},{nodes[j]}):{rng.expovariate(1.0):.6f}"
+    return nodes[0].rsplit(":", 1)[0] + ";"
+
+
+def synthetic_tree(taxa: int, seed: int = SEED) -> PhyloNode:
+    """
+    A random rooted binary tree with branch lengths on the taxa
+    t0, ..., t{taxa - 1}, the same for the same seed.
+    """
+    return make_tree(_synthetic_newick(taxa, seed))
+
+
+def perturbed_tree(taxa: int, seed: int = SEED) -> PhyloNode:
+    """
+    The synthetic tree with a small fraction of its tips swapped, standing
+    in for a tree estimated close to the model tree.
+    """
+    tree = synthetic_tree(taxa, seed)
+    rng = random.Random(seed + 1)
+    tips = tree.tips()
+    for _ in range(max(1, int(SWAPPED_TIP_FRACTION * taxa))):
+        first, second = rng.sample(tips, 2)
+        first.name, second.name = second.name, first.name
+    return tree
+
+
+def synthetic_source_trees(taxa: int, seed: int = SEED) -> List[PhyloNode]:
+    """
+    Overlapping subtrees of the synthetic tree, each taxon in roughly
+    SOURCE_TREES_PER_TAXON of them.
+    """
+    tree = synthetic_tree(taxa, seed)
+    rng = random.Random(seed + 2)
+    groups: List[Set[str]] = [set() for _ in range(NUM_SOURCE_TREES)]
+    for name in tree.get_tip_names():
+        for group in rng.sample(groups, SOURCE_TREES_PER_TAXON):
+            group.add(name)
+    return [tree.get_sub_tree(group) for group in groups if len(group) > 1]
+
+
+def _tree_pair(taxa: int) -> Tuple:
+    return synthetic_tree(taxa), perturbed_tree(taxa)
+
+
+def _psws(taxa: int) -> Tuple:
+    trees = [synthetic_tree(taxa), perturbed_tree(taxa)]
+    rename_trees(trees)
+    return ([make_psw(tree) for tree in trees],)
+
+
+def _load_min_cut_supertree() -> Callable:
+    spec = importlib.util.spec_from_file_location(
+        "min_cut_supertree", MIN_CUT_SUPERTREE_PATH
+    )
+    module = importlib.util.module_from_spec(spec)  # type: ignore
+    spec.loader.exec_module(module)  # type: ignore
+    return module.min_cut_supertree
+
+
+def hot_paths() -> List[HotPath]:
+    """
+    The functions to benchmark. The min cut supertree is only included when
+    run from the root of the repository, where the method scripts are.
+    """
+    paths = [
+        HotPath("rooted_rf_distance", _tree_pair, rooted_rf_distance),
+        HotPath("matching_cluster_distance", _tree_pair, matching_cluster_distance),
+        HotPath("rooted_f1_distance", _tree_pair, rooted_f1_distance),
+        HotPath("com_clust", _psws, com_clust),
+        HotPath(
+            "dcm3",
+            lambda taxa: (synthetic_tree(taxa), max(taxa // 10, 10)),
+            dcm3,
+        ),
+        HotPath(
+            "birth_death_tree",
+            lambda taxa: (1.0, 0.2, None, taxa, True, True, random.Random(SEED)),
+            birth_death_tree,
+        ),
+        HotPath(
+            "randomly_scale_tree_height",
+            lambda taxa: (synthetic_tree(taxa), np.random.RandomState(SEED)),
+            randomly_scale_tree_height,
+        ),
+    ]
+    if os.path.exists(MIN_CUT_SUPERTREE_PATH):
+        paths.append(
+            HotPath(
+                "min_cut_supertree",
+                lambda taxa: (synthetic_source_trees(taxa),),
+                _load_min_cut_supertree(),
+            )
+        )
+    return paths
@@ -0,0 +1,169 @@
+"""
+A local runner for the hot path benchmarks, for machines without
+pytest-benchmark (see benchmarks/ for the pytest-benchmark suite).
+
+Each benchmark first runs once under tracemalloc, which measures its
+peak memory and warms it up, then is timed over a number of rounds
+(fewer if the rounds take too long). The results are saved as JSON.
+"""
+
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from scs_analysis.experiment.method_benchmark import summarise
+from scs_analysis.perf.hot_paths import HotPath, hot_paths
+
+
+MICROBENCH_FOLDER = "benchmarks/results/"
+
+DEFAULT_ROUNDS = 5
+
+# Seconds of timed rounds after which a benchmark stops early
+DEFAULT_MAX_TIME = 60.0
+
+FORMAT_VERSION = 1
+
+
+def benchmark_name(function: str, taxa: int) -> str:
+    return f"{function}[{taxa}]"
+
+
+def run_benchmark(
+    hot_path: HotPath,
+    taxa: int,
+    rounds: int = DEFAULT_ROUNDS,
+    max_time: float = DEFAULT_MAX_TIME,
+) -> Dict[str, Any]:
+    """
+    Benchmarks a hot path on a number of taxa.
+
+    Args:
+        hot_path (HotPath): The function to benchmark.
+        taxa (int): The number of taxa of its input.
+        rounds (int): The number of timed runs.
+        max_time (float): Stop after the round exceeding this many seconds
+            in total, so long benchmarks are run at least once.
+
+    Returns:
+        Dict[str, Any]: The times of the rounds, their summary, the peak
+        memory in bytes and the throughput in taxa per second.
+    """
+    args = hot_path.setup(taxa)
+    tracemalloc.start()
+    try:
+        hot_path.run(*args)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    times: List[float] = []
+    while len(times) < rounds and sum(times) <= max_time:
+        args = hot_path.setup(taxa)
+        start = time.perf_counter()
+        hot_path.run(*args)
+        times.append(time.perf_counter() - start)
+
+    median, iqr, minimum = summarise(times)
+    return {
+        "name": benchmark_name(hot_path.name, taxa),
+        "function": hot_path.name,
+        "taxa": taxa,
+        "rounds": len(times),
+        "times": times,
+        "median": median,
+        "iqr": iqr,
+        "min": minimum,
+        "peak_memory": peak_memory,
+        "throughput": taxa / median if median > 0 else None,
+    }
+
+
+def _commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.decode("utf-8").strip()
+
+
+def machine_info() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_microbenchmarks(
+    functions: Optional[Sequence[str]] = None,
+    sizes: Optional[Sequence[int]] = None,
+    rounds: int = DEFAULT_ROUNDS,
+    max_time: float = DEFAULT_MAX_TIME,
+    verbosity: int = 1,
+    names: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Runs the hot path benchmarks.
+
+    Args:
+        functions (Optional[Sequence[str]]): The hot paths to run, all if None.
+        sizes (Optional[Sequence[int]]): The numbers of taxa to run, all of
+            each hot path's if None.
+        rounds (int): The number of timed runs of each benchmark.
+        max_time (float): Seconds of timed runs after which a benchmark stops.
+        verbosity (int): Verbosity level.
+        names (Optional[Sequence[str]]): If given, only the benchmarks with
+            these names (e.g. "dcm3[1000]") are run.
+
+    Returns:
+        Dict[str, Any]: The benchmark results along with the machine and
+        commit they were run on.
+    """
+    benchmarks = []
+    for hot_path in hot_paths():
+        if functions is not None and hot_path.name not in functions:
+            continue
+        for taxa in hot_path.sizes:
+            if sizes is not None and taxa not in sizes:
+                continue
+            if names is not None and benchmark_name(hot_path.name, taxa) not in names:
+                continue
+            result = run_benchmark(hot_path, taxa, rounds, max_time)
+            if verbosity >= 1:
+                print(
+                    f"{result['name']:<40} median={result['median']:.4f}s "
+                    f"iqr={result['iqr']:.4f}s "
+                    f"peak={result['peak_memory'] / 2**20:.1f}MB"
+                )
+            benchmarks.append(result)
+
+    return {
+        "version": FORMAT_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "machine": machine_info(),
+        "benchmarks": benchmarks,
+    }
+
+
+def save_microbenchmarks(results: Dict[str, Any], file_path: str) -> None:
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(file_path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_microbenchmarks(file_path: str) -> Dict[str, Any]:
+    with open(file_path, "r") as f:
+        return json.load(f)
@@ -0,0 +1,142 @@
+"""
+Profiles of method runs and distance calculations.
+
+With profiling on, each job writes a cProfile profile next to its results,
+to profiles/<method>/<source tree file>.prof for the method run (written
+by the Python method scripts, which profile themselves when the
+SCSA_PROFILE environment variable names a file) and to
+profiles/<method>/<source tree file>.distances.prof for the distance
+calculation. The profiles of an experiment are merged into a table of its
+hottest functions by profile_report.
+"""
+
+import cProfile
+import os
+import pstats
+
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+PROFILE_ENV = "SCSA_PROFILE"
+PROFILE_DIRECTORY = "profiles/"
+PROFILE_SUFFIX = ".prof"
+
+RUN = "run"
+DISTANCES = "distances"
+
+SORT_KEYS = ("tottime", "cumtime", "calls")
+DEFAULT_TOP = 20
+
+
+def profile_path(
+    write_directory: str, method: str, source_tree_file: str, kind: str = RUN
+) -> str:
+    """
+    The profile of a job in an experiment's results folder.
+    """
+    name = os.path.basename(source_tree_file)
+    if kind != RUN:
+        name += "." + kind
+    return write_directory + PROFILE_DIRECTORY + method + "/" + name + PROFILE_SUFFIX
+
+
+@contextmanager
+def profiled(file_path: Optional[str]) -> Iterator[None]:
+    """
+    Profiles the body into the file, or does nothing if it is None.
+    """
+    if file_path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        profiler.dump_stats(file_path)
+
+
+def collect_profiles(results_folder: str) -> Dict[Tuple[str, str, str], List[str]]:
+    """
+    The profiles in the results folder.
+
+    Returns:
+        Dict[Tuple[str, str, str], List[str]]: The profile files of each
+        experiment directory, method and kind (RUN or DISTANCES).
+    """
+    groups: Dict[Tuple[str, str, str], List[str]] = {}
+    for root, subdirs, files in os.walk(results_folder):
+        method_directory, method = os.path.split(root)
+        if os.path.basename(method_directory) + "/" != PROFILE_DIRECTORY:
+            continue
+        experiment_directory = os.path.relpath(
+            os.path.dirname(method_directory), results_folder
+        )
+        for file in sorted(files):
+            if not file.endswith(PROFILE_SUFFIX):
+                continue
+            kind = DISTANCES if file.endswith(f".{DISTANCES}{PROFILE_SUFFIX}") else RUN
+            groups.setdefault((experiment_directory, method, kind), []).append(
+                os.path.join(root, file)
+            )
+    return groups
+
+
+def hot_functions(
+    profile_files: List[str], top: int = DEFAULT_TOP, sort: str = "tottime"
+) -> List[Tuple[str, int, float, float]]:
+    """
+    Merges profiles and finds their hottest functions.
+
+    Args:
+        profile_files (List[str]): The profiles to merge.
+        top (int): The number of functions to keep.
+        sort (str): One of SORT_KEYS, what the functions are ranked by.
+
+    Returns:
+        List[Tuple[str, int, float, float]]: The name, number of calls,
+        total time (excluding subcalls) and cumulative time of the hottest
+        functions.
+    """
+    stats = pstats.Stats(*profile_files)
+    functions = []
+    for (file, line, name), stat in stats.stats.items():  # type: ignore
+        _, calls, tottime, cumtime, _ = stat
+        if file == "~":
+            label = name  # A builtin
+        else:
+            label = f"{name} ({os.path.basename(file)}:{line})"
+        functions.append((label, calls, tottime, cumtime))
+
+    index = {"calls": 1, "tottime": 2, "cumtime": 3}[sort]
+    functions.sort(key=lambda function: -function[index])
+    return functions[:top]
+
+
+def profile_report(
+    results_folder: str,
+    top: int = DEFAULT_TOP,
+    sort: str = "tottime",
+    method: Optional[str] = None,
+) -> str:
+    """
+    A table of the hottest functions of each experiment directory (one per
+    dataset size), method and kind of profile in the results folder.
+    """
+    sections = []
+    for (experiment_directory, group_method, kind), files in sorted(
+        collect_profiles(results_folder).items()
+    ):
+        if method is not None and group_method != method:
+            continue
+        lines = [
+            f"{experiment_directory} {group_method} {kind} ({len(files)} profiles)",
+            f"{'tottime':>10} {'cumtime':>10} {'calls':>10}  function",
+        ]
+        for label, calls, tottime, cumtime in hot_functions(files, top, sort):
+            lines.append(f"{tottime:>10.3f} {cumtime:>10.3f} {calls:>10}  {label}")
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
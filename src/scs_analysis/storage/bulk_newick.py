@@ -0,0 +1,238 @@
+"""
+A bulk loader of Newick files holding many trees, one per line.
+
+make_tree runs each tree through cogent3's general Newick tokeniser and
+builds it node by node through a TreeBuilder, so every tree of a source
+tree file holds fresh copies of the same taxon names. The loader instead
+splits each line with a single regular expression, builds the nodes
+directly, and interns every name through a NameTable shared by all the
+trees loaded with it (every tree of a file by default, or every file of a
+batch), so each distinct name is held once.
+
+The trees are the same as make_tree's, down to the names given to unnamed
+and duplicate nodes. Lines using Newick beyond names and branch lengths
+(quoted labels, comments or whitespace within the tree) are left to
+make_tree.
+
+With several workers, the lines of a file are split into postorder arrays
+over a process pool, and only the nodes are built in this process.
+"""
+
+import gc
+import re
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from cogent3 import make_tree
+from cogent3.core.tree import PhyloNode
+
+
+# Lines with any of these are parsed by make_tree
+_COMPLEX_NEWICK = re.compile(r"""['"\[\]\s]""")
+_TOKEN = re.compile(r"[(),;:]|[^(),;:]+")
+
+# The lines parsed by each task of a worker
+CHUNK_SIZE = 64
+
+# The parent index, name (None if unnamed) and length (None if none) of the
+# nodes of a tree in postorder
+Postorder = Tuple[List[int], List[Optional[str]], List[Optional[float]]]
+
+
+class NameTable:
+    """
+    One shared copy of each node name.
+    """
+
+    def __init__(self) -> None:
+        self._names: Dict[str, str] = {}
+
+    def intern(self, name: str) -> str:
+        return self._names.setdefault(name, name)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+def parse_postorder(newick: str) -> Postorder:
+    """
+    Splits a tree of names and branch lengths into its nodes in postorder.
+
+    Raises:
+        ValueError: If the Newick is malformed.
+    """
+    parents: List[int] = []
+    names: List[Optional[str]] = []
+    lengths: List[Optional[float]] = []
+    stack: List[List[int]] = []
+    siblings: List[int] = []
+    children: Optional[List[int]] = None
+    name: Optional[str] = None
+    length: Optional[float] = None
+    expect_length = False
+
+    tokens = _TOKEN.findall(newick)
+    if ";" not in tokens:
+        tokens.append(";")
+    for token in tokens:
+        if expect_length:
+            length = float(token)
+            expect_length = False
+        elif token == "(":
+            if children is not None or name is not None or length is not None:
+                raise ValueError(f"Misplaced subtree in {newick[:30]}")
+            stack.append(siblings)
+            siblings = []
+        elif token == ":":
+            if length is not None:
+                raise ValueError(f"Two lengths for a node in {newick[:30]}")
+            expect_length = True
+        elif token in "),;":
+            node = len(parents)
+            parents.append(-1)
+            names.append(name)
+            lengths.append(length)
+            for child in children or ():
+                parents[child] = node
+            siblings.append(node)
+            children = name = length = None
+            if token == ";":
+                break
+            if len(stack) == 0:
+                raise ValueError(f"Unbalanced brackets in {newick[:30]}")
+            if token == ")":
+                children = siblings
+                siblings = stack.pop()
+        elif name is None:
+            name = token
+        else:
+            raise ValueError(f"Two names for a node in {newick[:30]}")
+    if len(stack) > 0 or expect_length:
+        raise ValueError(f"Incomplete tree {newick[:30]}")
+    return parents, names, lengths
+
+
+def _unique_name(name: Optional[str], used: Dict[str, int]) -> str:
+    # As TreeBuilder names them: edge.0, edge.1, ... for unnamed nodes, and
+    # mouse, mouse.2, mouse.3, ... for duplicates
+    if not name:
+        name = "edge"
+    while name in used:
+        used[name] += 1
+        name = f"{name}.{used[name]}"
+    used[name] = 1
+    return name
+
+
+def build_tree(postorder: Postorder, names: NameTable) -> PhyloNode:
+    """
+    Builds the tree of its nodes in postorder, as make_tree would.
+    """
+    parents, node_names, lengths = postorder
+    used = {"edge": -1}
+    children: List[List[PhyloNode]] = [[] for _ in parents]
+    node = None
+    for i, parent in enumerate(parents):
+        # Built directly rather than through the constructor, which checks
+        # each child for an existing parent
+        node = PhyloNode.__new__(PhyloNode)
+        node.name_loaded = node_names[i] is not None
+        node.name = names.intern(_unique_name(node_names[i], used))
+        node.params = {"length": lengths[i]}
+        node.children = children[i]
+        node._parent = None
+        for child in node.children:
+            child._parent = node
+        if parent >= 0:
+            children[parent].append(node)
+    if not node.name_loaded:  # type: ignore
+        node.name = "root"  # type: ignore
+    return node  # type: ignore
+
+
+def _parse_lines(lines: Sequence[str]) -> List[Optional[Postorder]]:
+    # None for the lines to leave to make_tree
+    postorders: List[Optional[Postorder]] = []
+    for line in lines:
+        postorder = None
+        if _COMPLEX_NEWICK.search(line) is None:
+            try:
+                postorder = parse_postorder(line)
+            except ValueError:
+                pass  # make_tree reports the error
+        postorders.append(postorder)
+    return postorders
+
+
+def parse_newick_lines(
+    lines: Sequence[str], names: Optional[NameTable] = None, workers: int = 1
+) -> List[PhyloNode]:
+    """
+    Parses Newick trees, one per (stripped, non-empty) line.
+
+    Args:
+        lines (Sequence[str]): The trees.
+        names (Optional[NameTable]): Interns the node names, a new table for
+            these trees if None.
+        workers (int): The number of processes splitting the lines.
+
+    Returns:
+        List[PhyloNode]: The trees, as make_tree would parse them.
+    """
+    if names is None:
+        names = NameTable()
+
+    if workers > 1 and len(lines) > CHUNK_SIZE:
+        chunks = [
+            lines[start : start + CHUNK_SIZE]
+            for start in range(0, len(lines), CHUNK_SIZE)
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            postorders = [
+                postorder
+                for chunk in executor.map(_parse_lines, chunks)
+                for postorder in chunk
+            ]
+    else:
+        postorders = _parse_lines(lines)
+
+    # The many new nodes would otherwise trigger repeated full collections
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        trees = []
+        for line, postorder in zip(lines, postorders):
+            if postorder is None:
+                tree = make_tree(line)
+                for node in tree.postorder():
+                    node.name = names.intern(node.name)
+            else:
+                tree = build_tree(postorder, names)
+            trees.append(tree)
+        return trees
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def load_newick_file(
+    file_path: str, names: Optional[NameTable] = None, workers: int = 1
+) -> List[PhyloNode]:
+    """
+    Parses the trees of a Newick file, one tree per line.
+
+    Args:
+        file_path (str): The Newick file.
+        names (Optional[NameTable]): Interns the node names, a new table for
+            the file if None.
+        workers (int): The number of processes splitting the lines.
+
+    Returns:
+        List[PhyloNode]: The trees, as make_tree would parse them.
+    """
+    with open(file_path, "r") as f:
+        lines = [line.strip() for line in f]
+    return parse_newick_lines(
+        [line for line in lines if len(line) > 0], names=names, workers=workers
+    )
@@ -0,0 +1,163 @@
+"""
+A columnar cache of the metrics of an experiment's distance files.
+
+Plotting needs only the numbers of the *_results_with_distances.tsv files,
+not the trees they also hold. The cache keeps, for each method with a
+distance file in an experiment folder, one NumPy array per metric (and the
+model and source tree files of each record) in a single METRICS_CACHE_FILE
+.npz file in the folder. The cache records the size and modification time
+of each distance file it was made from, and is remade once any of them
+changes.
+
+The cache is written as distances are calculated, and read by plotting.
+"""
+
+import json
+import os
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from scs_analysis.experiment.experiment import (
+    DISTANCE_FILE_SUFFIX,
+    DISTANCE_NUM_FIELDS,
+)
+from scs_analysis.experiment.result_files import read_records
+
+
+METRICS_CACHE_FILE = "metrics_cache.npz"
+FORMAT_VERSION = 2
+
+MODEL_TREE_FILE = "model_tree_file"
+SOURCE_TREE_FILE = "source_tree_file"
+
+# The metric fields of a distance record, from its third field on
+METRIC_FIELDS = (
+    "wall_time",
+    "cpu_time",
+    "rf",
+    "mc",
+    "f1",
+    "brf",
+    "bmc",
+    "bf1",
+)
+
+_SOURCES_KEY = "__sources__"
+
+Metrics = Dict[str, Dict[str, np.ndarray]]
+
+
+def metrics_cache_path(folder: str) -> str:
+    return os.path.join(folder, METRICS_CACHE_FILE)
+
+
+def _distance_sources(folder: str) -> Dict[str, Tuple[int, int]]:
+    """
+    The size and modification time of each distance file of the folder, by
+    method.
+    """
+    sources = {}
+    for file in sorted(os.listdir(folder)):
+        if file.endswith(DISTANCE_FILE_SUFFIX):
+            stat = os.stat(os.path.join(folder, file))
+            sources[file[: -len(DISTANCE_FILE_SUFFIX)]] = (
+                stat.st_size,
+                stat.st_mtime_ns,
+            )
+    return sources
+
+
+def _numeric_column(values: List[str]) -> np.ndarray:
+    """
+    The values as integers if they all are, as floats (with NaN for
+    missing values) otherwise.
+    """
+    strings = np.array(values, dtype=str)
+    try:
+        return strings.astype(np.int64)
+    except ValueError:
+        strings[strings == str(None)] = "nan"
+        return strings.astype(np.float64)
+
+
+def read_metrics(file_path: str) -> Dict[str, np.ndarray]:
+    """
+    The metric columns (and model and source tree files) of a distance file.
+    """
+    columns: List[List[str]] = [[] for _ in range(len(METRIC_FIELDS) + 2)]
+    for parts in read_records(file_path, DISTANCE_NUM_FIELDS):
+        for column, value in zip(columns, parts[: 2 + len(METRIC_FIELDS)]):
+            column.append(value)
+    metrics = {
+        MODEL_TREE_FILE: np.array(columns[0], dtype=str),
+        SOURCE_TREE_FILE: np.array(columns[1], dtype=str),
+    }
+    for field, column in zip(METRIC_FIELDS, columns[2:]):
+        metrics[field] = _numeric_column(column)
+    return metrics
+
+
+def write_metrics_cache(folder: str) -> Metrics:
+    """
+    Caches the metrics of the distance files of an experiment folder.
+
+    Returns:
+        Metrics: The metric columns of each method.
+    """
+    sources = _distance_sources(folder)
+    metrics = {
+        method: read_metrics(os.path.join(folder, method + DISTANCE_FILE_SUFFIX))
+        for method in sources
+    }
+    arrays = {
+        f"{method}/{field}": column
+        for method, columns in metrics.items()
+        for field, column in columns.items()
+    }
+    arrays[_SOURCES_KEY] = np.array(
+        json.dumps({"version": FORMAT_VERSION, "sources": sources})
+    )
+
+    cache_file = metrics_cache_path(folder)
+    temporary_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(temporary_file, "wb") as f:
+        np.savez(f, **arrays)  # type: ignore
+    os.replace(temporary_file, cache_file)
+    return metrics
+
+
+def _cached_metrics(folder: str) -> Optional[Metrics]:
+    cache_file = metrics_cache_path(folder)
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with np.load(cache_file, allow_pickle=False) as cache:
+            header = json.loads(str(cache[_SOURCES_KEY]))
+            if header["version"] != FORMAT_VERSION:
+                return None
+            sources = {
+                method: tuple(source) for method, source in header["sources"].items()
+            }
+            if sources != _distance_sources(folder):
+                return None
+            metrics: Metrics = {method: {} for method in sources}
+            for name in cache.files:
+                if name != _SOURCES_KEY:
+                    method, field = name.rsplit("/", 1)
+                    metrics[method][field] = cache[name]
+            return metrics
+    except (ValueError, KeyError, OSError):
+        return None  # An unreadable cache is remade
+
+
+def load_metrics(folder: str) -> Metrics:
+    """
+    The metric columns of each method with a distance file in the folder,
+    from the cache if it is up to date (remaking it otherwise).
+    """
+    metrics = _cached_metrics(folder)
+    if metrics is None:
+        metrics = write_metrics_cache(folder)
+    return metrics
@@ -0,0 +1,219 @@
+"""
+Sidecar indexes for random access into the tab separated result files.
+
+Finding the record of one source tree file in a result file otherwise
+means reading the file up to it. The index of a result file, kept next to
+it in a file ending in INDEX_SUFFIX, holds a line
+
+    key <TAB> offset <TAB> length
+
+for each record, where the key is the field the records are looked up by
+(such as the source tree file, the method being that of the file) and the
+offset and length locate the bytes of the record in the result file.
+
+Records appended since an index was last used are indexed when it is next
+used, so an index is maintained by appends without the writers having to
+know about it. Rewriting a result file empties its index, which is then
+rebuilt on its next use, as is an index found not to match its file.
+Records are read by memory-mapping the result file and slicing out only
+the requested bytes.
+"""
+
+import os
+
+from functools import lru_cache
+from typing import IO, Dict, Iterable, List, Optional, Tuple
+
+from scs_analysis.experiment.result_files import (
+    index_path,
+    locked,
+    mapped,
+    parse_record,
+)
+
+
+class RecordIndex:
+    """
+    The index of a result file by the field of its records in key_column.
+
+    When several records have the same key, the last of them is indexed.
+    """
+
+    def __init__(self, file_path: str, num_fields: int, key_column: int) -> None:
+        self.file_path = file_path
+        self.index_file = index_path(file_path)
+        self.num_fields = num_fields
+        self.key_column = key_column
+
+        self._entries: Dict[str, Tuple[int, int]] = {}
+        self._end = 0  # The bytes of the result file that are indexed
+        # The sizes of the result file and index (and the index's
+        # modification time) when the index was last brought up to date
+        self._state: Optional[Tuple[int, int, int]] = None
+
+    def _file_state(self) -> Tuple[int, int, int]:
+        if not os.path.exists(self.index_file):
+            return os.path.getsize(self.file_path), -1, -1
+        stat = os.stat(self.index_file)
+        return os.path.getsize(self.file_path), stat.st_size, stat.st_mtime_ns
+
+    def refresh(self) -> None:
+        """
+        Brings the index up to date with the result file, indexing any
+        records appended since it was last used.
+        """
+        if not os.path.exists(self.file_path):
+            self._entries, self._end, self._state = {}, 0, None
+            return
+        if self._state is not None and self._state == self._file_state():
+            return
+
+        with locked(self.index_file) as index:
+            stat = os.fstat(index.fileno())
+            if self._state is None or self._state[1:] != (
+                stat.st_size,
+                stat.st_mtime_ns,
+            ):
+                self._load(index)
+            if not self._matches_file():
+                self._clear(index)
+            size = self._extend(index)
+            stat = os.fstat(index.fileno())
+            self._state = (size, stat.st_size, stat.st_mtime_ns)
+
+    def rebuild(self) -> None:
+        """
+        Indexes the result file from scratch.
+        """
+        self._state = None
+        if not os.path.exists(self.file_path):
+            self._entries, self._end = {}, 0
+            return
+        with locked(self.index_file) as index:
+            self._clear(index)
+            size = self._extend(index)
+            stat = os.fstat(index.fileno())
+            self._state = (size, stat.st_size, stat.st_mtime_ns)
+
+    def _clear(self, index: IO[bytes]) -> None:
+        index.truncate(0)
+        self._entries = {}
+        self._end = 0
+
+    def _load(self, index: IO[bytes]) -> None:
+        self._entries = {}
+        self._end = 0
+        index.seek(0)
+        data = index.read().decode("utf-8")
+        if not data.endswith("\n"):
+            # Empty, or left part written by a crash
+            self._clear(index)
+            return
+        for line in data.splitlines():
+            key, offset, length = line.rsplit("\t", 2)
+            self._entries[key] = (int(offset), int(length))
+            self._end = max(self._end, int(offset) + int(length))
+
+    def _matches_file(self) -> bool:
+        """
+        Whether the indexed bytes are (still) whole records of the file.
+        """
+        if self._end == 0:
+            return True
+        with open(self.file_path, "rb") as f:
+            if f.seek(0, os.SEEK_END) < self._end:
+                return False
+            f.seek(self._end - 1)
+            return f.read(1) == b"\n"
+
+    def _extend(self, index: IO[bytes]) -> int:
+        """
+        Indexes the complete records after the indexed bytes.
+
+        Returns:
+            int: The size of the result file.
+        """
+        lines = []
+        with open(self.file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(self._end)
+            position = self._end
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Being written, or left by a crash
+                parts = parse_record(line.decode("utf-8"), self.num_fields)
+                if parts is not None:
+                    key = parts[self.key_column]
+                    self._entries[key] = (position, len(line))
+                    lines.append(f"{key}\t{position}\t{len(line)}\n")
+                position += len(line)
+        if len(lines) > 0:
+            index.write("".join(lines).encode("utf-8"))
+            index.flush()
+            self._end = position
+        return size
+
+    def __contains__(self, key: str) -> bool:
+        self.refresh()
+        return key in self._entries
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._entries)
+
+    def keys(self) -> List[str]:
+        self.refresh()
+        return list(self._entries)
+
+    def location(self, key: str) -> Optional[Tuple[int, int]]:
+        """
+        The offset and length of the record for the key in the result file.
+        """
+        self.refresh()
+        return self._entries.get(key)
+
+    def _read(self, keys: List[str]) -> Tuple[Dict[str, List[str]], bool]:
+        records: Dict[str, List[str]] = {}
+        if not os.path.exists(self.file_path):
+            return records, False
+        with mapped(self.file_path) as m:
+            for key in keys:
+                if key not in self._entries:
+                    continue
+                offset, length = self._entries[key]
+                if m is None or offset + length > len(m):
+                    return records, True
+                parts = parse_record(
+                    m[offset : offset + length].decode("utf-8"), self.num_fields
+                )
+                if parts is None or parts[self.key_column] != key:
+                    return records, True
+                records[key] = parts
+        return records, False
+
+    def records(self, keys: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        The fields of the records for the keys that have one.
+        """
+        keys = list(keys)
+        self.refresh()
+        records, stale = self._read(keys)
+        if stale:
+            # The file was changed without its index being emptied
+            self.rebuild()
+            records, _ = self._read(keys)
+        return records
+
+    def record(self, key: str) -> Optional[List[str]]:
+        """
+        The fields of the record for the key, None if there is none.
+        """
+        return self.records([key]).get(key)
+
+
+@lru_cache(maxsize=256)
+def record_index(file_path: str, num_fields: int, key_column: int) -> RecordIndex:
+    """
+    The index of a result file, shared within the process.
+    """
+    return RecordIndex(file_path, num_fields, key_column)
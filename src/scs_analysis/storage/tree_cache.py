@@ -0,0 +1,327 @@
+"""
+A pre-parsed binary cache of Newick tree files.
+
+Parsing the Newick of a source tree file with thousands of taxa dominates
+the start of every method run. The cache stores the trees of a file (one
+tree per line) next to it, in a file ending in TREE_CACHE_SUFFIX, as
+
+    MAGIC, header length (uint64), JSON header, padding to 8 bytes
+    offsets   int64[trees + 1]  the first node of each tree
+    parents   int32[nodes]      the parent of each node within its tree
+    name_ids  int32[nodes]      the node's index in the header's names
+    lengths   float32[nodes]    the branch length of each node (NaN if none)
+
+with the nodes of each tree in postorder (the root last, with parent -1).
+The header holds the registry of taxon (and internal node) names the name
+ids index into, and the size and modification time of the Newick file the
+cache was made from, so stale caches are ignored. The names cogent3 makes
+up for unnamed nodes (such as edge.0) are stored as -1 - their index, so
+the rebuilt trees are named and written exactly as parsed ones.
+
+CachedTrees memory-maps a cache, so opening one copies nothing, and
+rebuilds cogent3 trees from the arrays on demand.
+"""
+
+import gc
+import json
+import mmap
+import os
+import struct
+
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cogent3.core.tree import PhyloNode
+
+from scs_analysis.storage.bulk_newick import (
+    NameTable,
+    load_newick_file,
+    parse_newick_lines,
+)
+
+
+TREE_CACHE_SUFFIX = ".tcache"
+MAGIC = b"SCSTREE1"
+FORMAT_VERSION = 1
+
+_HEADER_LENGTH = struct.Struct("<Q")
+
+
+def cache_path(file_path: str) -> str:
+    return file_path + TREE_CACHE_SUFFIX
+
+
+def _source_stat(file_path: str) -> Tuple[int, int]:
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def parse_newick_file(
+    file_path: str, names: Optional[NameTable] = None
+) -> List[PhyloNode]:
+    """
+    Parses the trees of a Newick file, one tree per line.
+    """
+    return load_newick_file(file_path, names=names)
+
+
+def encode_trees(
+    trees: Sequence[PhyloNode],
+) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The postorder arrays of the trees.
+
+    Returns:
+        Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The
+        name registry, and the offsets, parents, name ids and lengths arrays.
+    """
+    names: List[str] = []
+    name_ids = {}
+    offsets = [0]
+    parents: List[int] = []
+    node_names: List[int] = []
+    lengths: List[float] = []
+    for tree in trees:
+        nodes = list(tree.postorder())
+        index = {id(node): i for i, node in enumerate(nodes)}
+        for node in nodes:
+            parents.append(-1 if node.parent is None else index[id(node.parent)])
+            if node.name not in name_ids:
+                name_ids[node.name] = len(names)
+                names.append(node.name)
+            if node.name_loaded:
+                node_names.append(name_ids[node.name])
+            else:
+                node_names.append(-1 - name_ids[node.name])
+            length = node.length
+            lengths.append(np.nan if length is None else length)
+        offsets.append(offsets[-1] + len(nodes))
+    return (
+        names,
+        np.array(offsets, dtype=np.int64),
+        np.array(parents, dtype=np.int32),
+        np.array(node_names, dtype=np.int32),
+        np.array(lengths, dtype=np.float32),
+    )
+
+
+def write_tree_cache(file_path: str, cache_file: Optional[str] = None) -> str:
+    """
+    Caches the trees of a Newick file.
+
+    Args:
+        file_path (str): The Newick file, one tree per line.
+        cache_file (Optional[str]): Where to write the cache, next to the
+            Newick file if None.
+
+    Returns:
+        str: The path of the cache.
+    """
+    if cache_file is None:
+        cache_file = cache_path(file_path)
+    size, mtime_ns = _source_stat(file_path)
+    names, offsets, parents, name_ids, lengths = encode_trees(
+        parse_newick_file(file_path)
+    )
+    header = json.dumps(
+        {
+            "version": FORMAT_VERSION,
+            "source_size": size,
+            "source_mtime_ns": mtime_ns,
+            "trees": len(offsets) - 1,
+            "nodes": len(parents),
+            "names": names,
+        }
+    ).encode("utf-8")
+    start = len(MAGIC) + _HEADER_LENGTH.size + len(header)
+    padding = b"\0" * (-start % 8)
+
+    temporary_file = cache_file + ".tmp"
+    with open(temporary_file, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        f.write(padding)
+        for array in (offsets, parents, name_ids, lengths):
+            f.write(array.astype(array.dtype.newbyteorder("<")).tobytes())
+    os.replace(temporary_file, cache_file)
+    return cache_file
+
+
+class CachedTrees:
+    """
+    The trees of a cache file, memory-mapped.
+    """
+
+    def __init__(self, cache_file: str) -> None:
+        with open(cache_file, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{cache_file} is not a tree cache")
+        position = len(MAGIC)
+        (header_length,) = _HEADER_LENGTH.unpack_from(self._mmap, position)
+        position += _HEADER_LENGTH.size
+        self.header = json.loads(self._mmap[position : position + header_length])
+        position += header_length
+        position += -position % 8
+
+        self.names: List[str] = self.header["names"]
+        num_trees = self.header["trees"]
+        num_nodes = self.header["nodes"]
+        arrays = []
+        for dtype, count in (
+            ("<i8", num_trees + 1),
+            ("<i4", num_nodes),
+            ("<i4", num_nodes),
+            ("<f4", num_nodes),
+        ):
+            arrays.append(np.frombuffer(self._mmap, dtype, count, position))
+            position += arrays[-1].nbytes
+        self.offsets, self.parents, self.name_ids, self.lengths = arrays
+
+    def is_fresh(self, file_path: str) -> bool:
+        """
+        Whether the cache was made from the current contents of the file.
+        """
+        return self.header.get("version") == FORMAT_VERSION and (
+            self.header["source_size"],
+            self.header["source_mtime_ns"],
+        ) == _source_stat(file_path)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def tree(self, i: int) -> PhyloNode:
+        """
+        Builds the i-th tree, as make_tree would from its Newick.
+        """
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        parents = self.parents[start:end].tolist()
+        name_ids = self.name_ids[start:end].tolist()
+        # The shortest decimals that round trip, as the lengths were written
+        lengths = [float(length) for length in self.lengths[start:end].astype(str)]
+
+        # Built directly rather than through the constructor, which checks
+        # each child for an existing parent
+        children: List[List[PhyloNode]] = [[] for _ in range(end - start)]
+        node = None
+        for j in range(end - start):
+            node = PhyloNode.__new__(PhyloNode)
+            name_id = name_ids[j]
+            node.name_loaded = name_id >= 0
+            node.name = self.names[name_id if name_id >= 0 else -1 - name_id]
+            length = lengths[j]
+            node.params = {"length": None if length != length else length}
+            node.children = children[j]
+            node._parent = None
+            for child in node.children:
+                child._parent = node
+            if parents[j] >= 0:
+                children[parents[j]].append(node)
+        return node  # type: ignore
+
+    def __iter__(self) -> Iterator[PhyloNode]:
+        for i in range(len(self)):
+            yield self.tree(i)
+
+    def trees(self) -> List[PhyloNode]:
+        """
+        Builds all the trees, pausing garbage collection meanwhile (the many
+        new nodes would otherwise trigger repeated full collections).
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return list(self)
+        finally:
+            if enabled:
+                gc.enable()
+
+    def close(self) -> None:
+        # The arrays are views onto the map, which must be released first
+        self.offsets = self.parents = self.name_ids = self.lengths = None  # type: ignore
+        self._mmap.close()
+
+    def __enter__(self) -> "CachedTrees":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def _cached_trees(
+    file_path: str, names: Optional[NameTable] = None
+) -> Optional[List[PhyloNode]]:
+    cache_file = cache_path(file_path)
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with CachedTrees(cache_file) as cached:
+            if cached.is_fresh(file_path):
+                if names is not None:
+                    cached.names = [names.intern(name) for name in cached.names]
+                return cached.trees()
+    except (ValueError, KeyError, OSError):
+        pass  # An unreadable cache is ignored
+    return None
+
+
+def load_trees(
+    file_path: str, names: Optional[NameTable] = None
+) -> List[PhyloNode]:
+    """
+    The trees of a Newick file, from its cache if it has an up to date one.
+
+    Args:
+        file_path (str): The Newick file, one tree per line.
+        names (Optional[NameTable]): Interns the node names, such as across
+            the files of a batch. A new table for the file if None.
+    """
+    trees = _cached_trees(file_path, names)
+    if trees is None:
+        trees = parse_newick_file(file_path, names)
+    return trees
+
+
+def load_tree(file_path: str) -> PhyloNode:
+    """
+    The tree of a Newick file holding a single tree (such as a model tree),
+    from its cache if it has an up to date one.
+    """
+    trees = _cached_trees(file_path)
+    if trees is not None and len(trees) == 1:
+        return trees[0]
+    with open(file_path, "r") as f:
+        return parse_newick_lines([f.read().strip()])[0]
+
+
+def cache_tree_files(
+    file_paths: Sequence[str], force: bool = False, verbosity: int = 1
+) -> int:
+    """
+    Caches each Newick file that does not have an up to date cache.
+
+    Returns:
+        int: The number of caches written.
+    """
+    written = 0
+    for file_path in file_paths:
+        if not os.path.exists(file_path):
+            if verbosity >= 2:
+                print(f"{file_path} does not exist, skipping.")
+            continue
+        cache_file = cache_path(file_path)
+        if not force and os.path.exists(cache_file):
+            try:
+                with CachedTrees(cache_file) as cached:
+                    if cached.is_fresh(file_path):
+                        continue
+            except (ValueError, KeyError, OSError):
+                pass
+        write_tree_cache(file_path, cache_file)
+        written += 1
+        if verbosity >= 1:
+            print(f"Cached {file_path}")
+    return written
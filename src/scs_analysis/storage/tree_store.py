@@ -0,0 +1,108 @@
+"""
+A compressed, content-addressed store of the estimated trees of results.
+
+Rather than holding the Newick of each estimated tree in full, the tree
+column of the *_results.tsv and *_results_with_distances.tsv files holds
+a reference (TREE_REF_PREFIX followed by a hash of the Newick) into the
+store of the experiment directory, which keeps each distinct tree once,
+gzip-compressed, in
+
+    <experiment directory>/trees/<first two hash characters>/<hash>.nwk.gz
+
+Tree columns written before the store hold the Newick itself, which is
+passed through unchanged by resolve, so old and new records can be mixed.
+"""
+
+import gzip
+import hashlib
+import io
+import os
+import uuid
+
+from typing import IO, Optional
+
+
+TREE_STORE_DIRECTORY = "trees/"
+TREE_REF_PREFIX = "tree:"
+TREE_FILE_SUFFIX = ".nwk.gz"
+
+# Hex characters of the SHA-256 of the Newick kept in a reference
+HASH_LENGTH = 32
+
+COMPRESS_LEVEL = 6
+
+
+def tree_hash(newick: str) -> str:
+    return hashlib.sha256(newick.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+
+
+def is_tree_ref(field: str) -> bool:
+    return field.startswith(TREE_REF_PREFIX)
+
+
+class TreeStore:
+    """
+    The trees of an experiment directory, addressed by content.
+
+    Writes are atomic and idempotent, so any number of threads or processes
+    can put trees into the same store.
+    """
+
+    def __init__(self, write_directory: str) -> None:
+        self.directory = os.path.join(write_directory, TREE_STORE_DIRECTORY)
+
+    def path(self, ref: str) -> str:
+        digest = ref[len(TREE_REF_PREFIX) :]
+        return os.path.join(self.directory, digest[:2], digest + TREE_FILE_SUFFIX)
+
+    def __contains__(self, ref: str) -> bool:
+        return os.path.exists(self.path(ref))
+
+    def put(self, newick: str) -> str:
+        """
+        Stores a tree (if it is not stored already).
+
+        Returns:
+            str: The reference to the tree.
+        """
+        ref = TREE_REF_PREFIX + tree_hash(newick)
+        file_path = self.path(ref)
+        if os.path.exists(file_path):
+            return ref
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temporary_file = f"{file_path}.{uuid.uuid4().hex}.tmp"
+        with open(temporary_file, "wb") as f:
+            # No file name or time in the header, the same tree compresses the same
+            with gzip.GzipFile(
+                fileobj=f, mode="wb", compresslevel=COMPRESS_LEVEL, mtime=0
+            ) as compressed:
+                compressed.write(newick.encode("utf-8"))
+        os.replace(temporary_file, file_path)
+        return ref
+
+    def open(self, ref: str) -> IO[str]:
+        """
+        Streams a stored tree, decompressing it as it is read.
+        """
+        return io.TextIOWrapper(gzip.open(self.path(ref), "rb"), encoding="utf-8")
+
+    def get(self, ref: str) -> str:
+        with self.open(ref) as f:
+            return f.read()
+
+    def resolve(self, field: str) -> str:
+        """
+        The Newick of a tree column, which is either a reference into the
+        store or (in records written before the store) the Newick itself.
+        """
+        if is_tree_ref(field):
+            return self.get(field)
+        return field
+
+    def store(self, tree: Optional[object]) -> str:
+        """
+        The tree column for an estimated tree, "None" if the method failed.
+        """
+        if tree is None:
+            return str(None)
+        return self.put(str(tree))
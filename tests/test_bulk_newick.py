@@ -0,0 +1,49 @@
+from cogent3 import make_tree
+
+from scs_analysis.storage import bulk_newick
+from scs_analysis.storage.bulk_newick import (
+    NameTable,
+    load_newick_file,
+    parse_newick_lines,
+)
+
+
+NEWICKS = [
+    "((a:0.5,b:1.25)90:0.75,(c,c):2.0);",
+    "(((a,d),(e,b)),f)x;",
+    "((a,(edge.1,)),edge)",
+    "(a,(b,'c d')[comment]);",
+]
+
+
+def _nodes(tree):
+    return [(n.name, n.name_loaded, n.params) for n in tree.postorder()]
+
+
+def test_trees_match_make_tree(tmp_path):
+    file_path = tmp_path / "trees.source_trees"
+    file_path.write_text("\n".join(NEWICKS) + "\n\n")
+
+    names = NameTable()
+    trees = load_newick_file(str(file_path), names=names)
+    assert len(trees) == len(NEWICKS)
+    for tree, newick in zip(trees, NEWICKS):
+        expected = make_tree(newick)
+        assert tree.get_newick(with_distances=True) == expected.get_newick(
+            with_distances=True
+        )
+        assert _nodes(tree) == _nodes(expected)
+        for node in tree.children:
+            assert node.parent is tree
+
+    # Names are shared between the trees
+    assert trees[0].get_node_matching_name("a").name is names.intern("a")
+    assert trees[1].get_node_matching_name("a").name is names.intern("a")
+
+
+def test_parallel_parsing_matches(monkeypatch):
+    monkeypatch.setattr(bulk_newick, "CHUNK_SIZE", 2)
+    trees = parse_newick_lines(NEWICKS, workers=2)
+    assert [_nodes(tree) for tree in trees] == [
+        _nodes(make_tree(newick)) for newick in NEWICKS
+    ]
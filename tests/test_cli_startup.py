@@ -0,0 +1,71 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from click.testing import CliRunner
+
+from scs_analysis.cli import COMMANDS, main
+
+
+HEAVY_MODULES = ("cogent3", "pandas", "matplotlib", "seaborn", "scipy", "numpy")
+
+# Generous, as the machines the tests run on vary; importing cogent3 alone
+# takes longer
+MAX_HELP_SECONDS = 1.0
+
+_RUN_CLI = """
+import json, sys, time
+start = time.perf_counter()
+from scs_analysis.cli import main
+try:
+    main(sys.argv[1:])
+except SystemExit:
+    pass
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": time.perf_counter() - start, "heavy": heavy}}))
+"""
+
+
+def _run_cli(*args):
+    code = _RUN_CLI.format(heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", code, *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_help_imports_no_heavy_modules():
+    # The fastest of a few runs, to not fail on a busy machine
+    runs = [_run_cli("--help") for _ in range(3)]
+    assert runs[0]["heavy"] == []
+    assert min(run["seconds"] for run in runs) < MAX_HELP_SECONDS
+
+
+@pytest.mark.parametrize("command", ["event-report", "profile-report"])
+def test_reports_do_not_import_cogent3(command):
+    assert _run_cli(command, "--help")["heavy"] == []
+
+
+@pytest.mark.parametrize("name", sorted(COMMANDS))
+def test_commands_match_their_registry_entries(name):
+    command = main.get_command(None, name)
+    assert command.name == name
+    assert command.get_short_help_str(limit=1000) == COMMANDS[name][1]
+
+
+@pytest.mark.parametrize("name", sorted(COMMANDS))
+def test_commands_have_no_clashing_options(name):
+    command = main.get_command(None, name)
+    flags = [flag for param in command.params for flag in param.opts]
+    assert len(flags) == len(set(flags))
+
+
+def test_benchmarks_need_a_measured_run():
+    result = CliRunner().invoke(main, ["bench-methods", "-a", "--repeats", "0"])
+    assert result.exit_code == 2
+    assert "--repeats" in result.output
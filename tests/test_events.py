@@ -0,0 +1,131 @@
+import json
+import os
+
+import pytest
+
+from scs_analysis.experiment.distance_calculator import (
+    DistancePool,
+    calculate_distances_for_experiment,
+)
+from scs_analysis.experiment.events import (
+    captured_events,
+    close_event_log,
+    configure_event_log,
+    event_report,
+    phase,
+    read_events,
+)
+from scs_analysis.storage.metrics_cache import (
+    SOURCE_TREE_FILE,
+    load_metrics,
+    metrics_cache_path,
+)
+
+
+MODEL_TREE = "(((a,b),c),(d,e));"
+ESTIMATED_TREE = "(((a,c),b),(d,e));"
+
+
+def test_phases_are_logged_as_json_lines(tmp_path):
+    log = str(tmp_path / "logs" / "events.jsonl")
+    with phase("run") as event:
+        event["bytes"] = 1  # Not logged, there is no event log
+
+    configure_event_log(log, max_bytes=2000, backup_count=10)
+    try:
+        for i in range(40):
+            with phase("run", method="SCS", bytes=100) as event:
+                event["index"] = i
+        with captured_events() as events, phase("parse", method="SCS"):
+            pass
+    finally:
+        close_event_log()
+
+    assert len(events) == 1
+    logged = list(read_events(log))
+    assert [event["index"] for event in logged] == list(range(40))
+    assert all(event["duration"] >= 0 for event in logged)
+    assert (tmp_path / "logs" / "events.jsonl.1").exists()  # Rotated
+
+    report = event_report(log).splitlines()
+    assert len(report) == 2
+    assert report[1].split()[:3] == ["SCS", "run", "40"]
+
+
+def test_distance_phases(tmp_path):
+    model_tree_file = str(tmp_path / "model.tre")
+    with open(model_tree_file, "w") as f:
+        f.write(MODEL_TREE)
+    directory = str(tmp_path / "results")
+    (tmp_path / "results").mkdir()
+    with open(directory + "/MCS_results.tsv", "w") as f:
+        f.write(f"{model_tree_file}\tsource.tre\t1.0\t1.0\t{ESTIMATED_TREE}\n")
+
+    log = str(tmp_path / "events.jsonl")
+    configure_event_log(log)
+    try:
+        calculate_distances_for_experiment(directory, ["MCS_results.tsv"], verbosity=0)
+        with DistancePool(verbosity=0) as pool:
+            pool.submit(
+                str(tmp_path / "pool") + "/",
+                "SCS",
+                model_tree_file,
+                "source.tre",
+                1.0,
+                1.0,
+                ESTIMATED_TREE,
+            )
+    finally:
+        close_event_log()
+
+    with open(log) as f:
+        events = [json.loads(line) for line in f]
+    # Trees from the results files are read from the tree store
+    for method, reads in (("MCS", ["read", "read"]), ("SCS", ["read"])):
+        method_events = [event for event in events if event["method"] == method]
+        assert [event["phase"] for event in method_events] == [
+            *reads,
+            "parse",
+            *["metric"] * 3,
+            "bifurcate",
+            *["metric"] * 3,
+            "write",
+        ]
+        assert [event["metric"] for event in method_events if "metric" in event] == [
+            "rf",
+            "mc",
+            "f1",
+            "brf",
+            "bmc",
+            "bf1",
+        ]
+        assert all(event["source_tree_file"] == "source.tre" for event in method_events)
+
+
+def test_failed_runs_are_not_submitted(tmp_path):
+    write_directory = str(tmp_path / "pool") + "/"
+    with DistancePool(verbosity=0) as pool:
+        pool.submit(write_directory, "SCS", "model.tre", "source.tre", 1.0, None, None)
+    assert not (tmp_path / "pool" / "SCS_results_with_distances.tsv").exists()
+
+
+def test_distances_are_cached_when_another_fails(tmp_path):
+    model_tree_file = str(tmp_path / "model.tre")
+    with open(model_tree_file, "w") as f:
+        f.write(MODEL_TREE)
+    write_directory = str(tmp_path / "pool") + "/"
+
+    with pytest.raises(FileNotFoundError):
+        with DistancePool(verbosity=0) as pool:
+            for source_tree_file, model in (("s0", model_tree_file), ("s1", "none")):
+                pool.submit(
+                    write_directory,
+                    "SCS",
+                    model,
+                    source_tree_file,
+                    1.0,
+                    1.0,
+                    ESTIMATED_TREE,
+                )
+    assert os.path.exists(metrics_cache_path(write_directory))
+    assert list(load_metrics(write_directory)["SCS"][SOURCE_TREE_FILE]) == ["s0"]
@@ -0,0 +1,78 @@
+import os
+
+import pandas as pd
+
+from scs_analysis.experiment import graph
+
+
+def test_registry_loads_each_folder_once(monkeypatch):
+    loaded = []
+
+    def load_data(folder):
+        loaded.append(folder)
+        return pd.DataFrame(
+            {
+                "RF Distance": [3, 5],
+                "CPU Time": [1.5, 2.5],
+                "Method": ["SCS", "MCS"],
+            }
+        )
+
+    monkeypatch.setattr(graph, "load_data", load_data)
+    registry = graph.DataRegistry()
+    for methods in graph.method_combinations():
+        df = registry.dataset([("a", 10), ("b", 20)], "k")
+        assert registry.folder("a") is registry.folder("a")
+    assert loaded == ["a", "b"]
+
+    assert list(df["k"]) == [10, 10, 20, 20]
+    assert df["RF Distance"].dtype == "int8"
+    assert df["CPU Time"].dtype == "float64"
+    assert isinstance(df["Method"].dtype, pd.CategoricalDtype)
+    assert graph.generate_hue_order(df["Method"].unique()) == ["SCS", "MCS"]
+    assert "k" not in registry.folder("a")
+
+
+def test_only_changed_figures_are_redrawn(tmp_path):
+    image_folder = str(tmp_path) + "/"
+    df = pd.DataFrame(
+        {
+            "Model Tree": ["m"] * 4,
+            "Source Tree": ["s0", "s1", "s0", "s1"],
+            "RF Distance": [3, 5, 4, 6],
+            "Matching Cluster Distance": [10, 12, 11, 13],
+            "F1 Score": [0.5, 0.6, 0.7, 0.8],
+            "CPU Time": [1.5, 2.5, 1.2, 3.0],
+            "Method": ["SCS", "SCS", "BCD (GSCM)", "BCD (GSCM)"],
+        }
+    )
+    jobs = [
+        graph.FigureJob(image_folder + "a/", df, None, "A", methods)
+        for methods in (["SCS", "BCD (GSCM)"], ["SCS"])
+    ]
+    assert graph.render_figures(jobs, image_folder, workers=2) == 2
+    assert all(os.path.exists(output) for job in jobs for output in job.outputs())
+    assert graph.render_figures(jobs, image_folder) == 0
+
+    changed = df.copy()
+    changed.loc[0, "RF Distance"] = 4
+    jobs[1] = graph.FigureJob(image_folder + "a/", changed, None, "A", ["SCS"])
+    assert graph.render_figures(jobs, image_folder) == 1
+    assert graph.render_figures(jobs, image_folder, force=True) == 2
+
+
+def test_only_benchmarks_of_the_same_job_replace_times(tmp_path):
+    benchmark_file = str(tmp_path / "SCS_benchmark.tsv")
+    key_file = str(tmp_path / "SCS_results_keys.tsv")
+    with open(benchmark_file, "w") as f:
+        for source_tree, key in (("s0", "k0"), ("s1", "old")):
+            f.write("\t".join(["m", source_tree, key, "5"] + ["9.0"] * 9) + "\n")
+    with open(key_file, "w") as f:
+        f.write("s0\tk0\ns1\tnew\n")
+
+    df = pd.DataFrame(
+        {"Source Tree": ["s0", "s1"], "Wall Time": [1.0, 2.0], "CPU Time": [1.0, 2.0]}
+    )
+    df = graph.use_benchmark_times(df, benchmark_file, key_file)
+    assert list(df["Wall Time"]) == [9.0, 2.0]
+    assert list(df["CPU Time"]) == [9.0, 2.0]
@@ -0,0 +1,106 @@
+import os
+import subprocess
+import sys
+
+from cogent3 import make_tree
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOURCE_TREES = {
+    "s0.tre": ["((a,b),(c,d));", "((a,b),(c,e));", "(((a,c),b),e);"],
+    "s1.tre": ["((a,b),c);", "((c,d),(e,a));"],
+}
+
+
+# Source trees on which depth and branch weighting give different supertrees
+WEIGHTED_SOURCE_TREES = [
+    "(((a:1,b:1):5,c:1):1,(d:1,e:1):1);",
+    "((a:3,c:1):1,(b:1,d:4):1);",
+    "((a:1,(b:1,e:1):1):2,(c:2,d:1):1);",
+    "((b:1,c:1):1,(a:1,e:6):1);",
+]
+
+
+def _run_script(script, *args, cwd=None):
+    env = dict(os.environ, PYTHONHASHSEED="0")
+    result = subprocess.run(
+        [sys.executable, os.path.join(REPO, "methods", script), *args],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+        cwd=cwd,
+    )
+    return result.stdout.strip().split("\n")
+
+
+def _write_source_trees(tmp_path):
+    for file, trees in SOURCE_TREES.items():
+        (tmp_path / file).write_text("\n".join(trees) + "\n")
+
+
+def _write_super_triplets_trees(tmp_path):
+    # Weighted by depth, as the method scripts find SuperTriplets files by
+    # their path relative to the repository
+    directory = tmp_path / "data" / "SuperTripletsBenchmark"
+    directory.mkdir(parents=True)
+    (directory / "s0.tre").write_text("\n".join(WEIGHTED_SOURCE_TREES) + "\n")
+    return "data/SuperTripletsBenchmark/s0.tre"
+
+
+def test_scs_batch_matches_single_runs(tmp_path):
+    _write_source_trees(tmp_path)
+    files = [str(tmp_path / file) for file in sorted(SOURCE_TREES)]
+    batch = tmp_path / "batch.txt"
+    batch.write_text(f"{files[0]}\t7\n{files[1]}\t9\n")
+
+    lines = _run_script("scs/run_scs.py", "-b", str(batch))
+    assert len(lines) == 2
+    for line, file, seed in zip(lines, files, ["7", "9"]):
+        source_tree_file, wall_time, cpu_time, supertree = line.split("\t")
+        assert source_tree_file == file
+        assert float(wall_time) >= 0 and float(cpu_time) >= 0
+        single = _run_script("scs/run_scs.py", "-s", seed, file)[0]
+        assert make_tree(supertree).same_topology(make_tree(single))
+
+
+def test_batch_and_single_runs_weight_alike(tmp_path):
+    file = _write_super_triplets_trees(tmp_path)
+    (tmp_path / "batch.txt").write_text(f"{file}\t7\n")
+
+    # As run by the method scripts, with the options ahead of the file
+    for script, args in (("scs/run_scs.py", ["-c", "-s", "7"]), ("mcs/run_mcs.py", [])):
+        (line,) = _run_script(script, *args, "-b", "batch.txt", cwd=tmp_path)
+        single = _run_script(script, *args, file, cwd=tmp_path)[0]
+        assert make_tree(line.split("\t")[3]).same_topology(make_tree(single))
+
+
+def test_mcs_batch_of_a_glob(tmp_path):
+    _write_source_trees(tmp_path)
+    lines = _run_script("mcs/run_mcs.py", "-g", str(tmp_path / "s*.tre"))
+    assert [line.split("\t")[0] for line in lines] == [
+        str(tmp_path / file) for file in sorted(SOURCE_TREES)
+    ]
+    for line in lines:
+        supertree = make_tree(line.split("\t")[3])
+        assert sorted(supertree.get_tip_names()) == ["a", "b", "c", "d", "e"]
+
+
+def test_unreadable_files_do_not_stop_a_batch(tmp_path):
+    _write_source_trees(tmp_path)
+    files = [str(tmp_path / "missing.tre"), str(tmp_path / "s0.tre")]
+    batch = tmp_path / "batch.txt"
+    batch.write_text("\n".join(files) + "\n")
+
+    for script in ("scs/run_scs.py", "mcs/run_mcs.py"):
+        missing, found = _run_script(script, "-b", str(batch))
+        assert missing == f"{files[0]}\tNone\tNone\tNone"
+        assert found.split("\t")[0] == files[1]
+        assert found.split("\t")[3] != "None"
+
+
+def test_mcs_workers_give_the_same_supertree(tmp_path):
+    file = _write_super_triplets_trees(tmp_path)
+    (single,) = _run_script("mcs/run_mcs.py", file, cwd=tmp_path)
+    (parallel,) = _run_script("mcs/run_mcs.py", "-j", "2", file, cwd=tmp_path)
+    assert make_tree(parallel).same_topology(make_tree(single))
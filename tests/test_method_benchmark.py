@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from scs_analysis.experiment import method_benchmark
+from scs_analysis.experiment.experiment import Job
+from scs_analysis.experiment.method_benchmark import (
+    BenchmarkLogger,
+    benchmark_jobs,
+    summarise,
+)
+from scs_analysis.experiment.result_files import read_records
+from scs_analysis.experiment.timing import RunStats
+
+
+def test_summarise():
+    assert summarise([3.0, 1.0, 2.0, 10.0, 4.0]) == (3.0, 2.0, 1.0)
+
+
+def test_benchmark_jobs(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_run(method, source_tree_file, seed=None, **kwargs):
+        calls.append((source_tree_file, seed))
+        wall_time = float(len(calls))
+        return "(a,b);", wall_time, wall_time / 2, RunStats(1000, 0, 0, 0.0)
+
+    monkeypatch.setattr(method_benchmark, "run_method_measured", fake_run)
+    monkeypatch.setattr(method_benchmark, "attach_job_keys", lambda *a, **k: None)
+
+    results = str(tmp_path) + "/"
+    jobs = [Job("SCS", f"s{i}", "m", "exp/", seed=i, key=f"k{i}") for i in range(3)]
+    benchmark_jobs(
+        jobs,
+        repeats=4,
+        warmup=1,
+        rng=random.Random(0),
+        results_folder=results,
+        verbosity=0,
+    )
+
+    # Warmups come first, every run of a job has its seed
+    assert len(calls) == 3 * 5
+    assert sorted(calls[:3]) == [("s0", 0), ("s1", 1), ("s2", 2)]
+    assert all(seed == int(source[1]) for source, seed in calls)
+    # The measured runs of the jobs are interleaved
+    assert [source for source, _ in calls[3:]] != sorted(
+        source for source, _ in calls[3:]
+    )
+
+    logger = BenchmarkLogger(results, "exp/")
+    records = list(read_records(logger.format_file_path("SCS"), 13))
+    assert sorted(record[1] for record in records) == ["s0", "s1", "s2"]
+    for record in records:
+        measured = [
+            float(i + 1)
+            for i, (source, _) in enumerate(calls)
+            if i >= 3 and source == record[1]
+        ]
+        assert record[3] == "4"
+        assert float(record[4]) == summarise(measured)[0]
+        assert float(record[12]) == 1000.0
+
+    # Up to date benchmarks are skipped unless more repeats are asked for
+    assert logger.benchmarked("SCS", "s0", "k0", 4)
+    assert not logger.benchmarked("SCS", "s0", "k0", 5)
+    assert not logger.benchmarked("SCS", "s0", "other", 4)
+    calls.clear()
+    benchmark_jobs(jobs, repeats=4, results_folder=results, verbosity=0)
+    assert calls == []
+
+
+def test_benchmarks_need_a_measured_run(tmp_path):
+    with pytest.raises(ValueError):
+        benchmark_jobs([], repeats=0, results_folder=str(tmp_path) + "/")
@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+
+from scs_analysis.experiment.experiment import DISTANCE_FILE_SUFFIX
+from scs_analysis.storage.metrics_cache import (
+    SOURCE_TREE_FILE,
+    load_metrics,
+    metrics_cache_path,
+)
+
+
+def _write_distances(file_path, records):
+    with open(file_path, "w") as f:
+        for stf, wall_time, cpu_time, rf in records:
+            fields = ["m", stf, wall_time, cpu_time, rf, "2", "0.5", "1", "2", "0.5"]
+            f.write("\t".join(fields + ["tree:0"]) + "\n")
+
+
+def test_metrics_are_cached_until_the_distances_change(tmp_path):
+    folder = str(tmp_path)
+    distance_file = os.path.join(folder, "SCS" + DISTANCE_FILE_SUFFIX)
+    _write_distances(distance_file, [("s0", "1.5", "None", "3"), ("s1", "2", "4", "1")])
+
+    metrics = load_metrics(folder)
+    assert os.path.exists(metrics_cache_path(folder))
+    assert list(metrics["SCS"][SOURCE_TREE_FILE]) == ["s0", "s1"]
+    assert metrics["SCS"]["rf"].dtype == np.int64
+    assert list(metrics["SCS"]["wall_time"]) == [1.5, 2.0]
+    assert np.isnan(metrics["SCS"]["cpu_time"][0])
+
+    # The cache is read rather than the distance file
+    os.utime(metrics_cache_path(folder), ns=(0, 0))
+    assert list(load_metrics(folder)["SCS"]["rf"]) == [3, 1]
+    assert os.stat(metrics_cache_path(folder)).st_mtime_ns == 0
+
+    with open(distance_file, "a") as f:
+        f.write("\t".join(["m", "s2"] + ["7"] * 8 + ["tree:0"]) + "\n")
+    assert list(load_metrics(folder)["SCS"]["rf"]) == [3, 1, 7]
+    assert os.stat(metrics_cache_path(folder)).st_mtime_ns != 0
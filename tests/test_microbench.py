@@ -0,0 +1,33 @@
+import json
+
+from scs_analysis.perf.hot_paths import perturbed_tree, synthetic_tree
+from scs_analysis.perf.microbench import run_microbenchmarks, save_microbenchmarks
+
+
+def test_synthetic_trees_are_seeded():
+    assert str(synthetic_tree(50, seed=3)) == str(synthetic_tree(50, seed=3))
+    assert str(synthetic_tree(50, seed=3)) != str(synthetic_tree(50, seed=4))
+    tree = perturbed_tree(50)
+    assert sorted(tree.get_tip_names()) == sorted(f"t{i}" for i in range(50))
+
+
+def test_microbenchmarks_are_saved(tmp_path):
+    results = run_microbenchmarks(
+        functions=["rooted_rf_distance", "com_clust"],
+        sizes=[100],
+        rounds=3,
+        verbosity=0,
+    )
+    file_path = str(tmp_path / "bench.json")
+    save_microbenchmarks(results, file_path)
+
+    with open(file_path) as f:
+        saved = json.load(f)
+    assert [b["name"] for b in saved["benchmarks"]] == [
+        "rooted_rf_distance[100]",
+        "com_clust[100]",
+    ]
+    for benchmark in saved["benchmarks"]:
+        assert benchmark["rounds"] == 3
+        assert benchmark["min"] <= benchmark["median"]
+        assert benchmark["peak_memory"] > 0
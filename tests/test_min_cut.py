@@ -0,0 +1,114 @@
+import importlib
+import os
+import random
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import pytest
+
+from scs_analysis.perf.hot_paths import synthetic_tree
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def min_cut():
+    # Importable by name, as the workers of a process pool import it
+    sys.path.insert(0, os.path.join(REPO, "methods", "mcs"))
+    try:
+        yield importlib.import_module("min_cut_supertree")
+    finally:
+        sys.path.remove(os.path.join(REPO, "methods", "mcs"))
+
+
+def test_stoer_wagner_matches_networkx(min_cut):
+    rng = random.Random(0)
+    graphs = 0
+    for seed in range(200):
+        n = rng.randint(2, 25)
+        graph = nx.gnp_random_graph(n, rng.uniform(0.2, 1.0), seed=seed)
+        if not nx.is_connected(graph):
+            continue
+        weights = {edge: rng.choice([1.0, 2.0, rng.random()]) for edge in graph.edges}
+        nx.set_edge_attributes(graph, weights, "weight")
+
+        expected, _ = nx.stoer_wagner(graph)
+        cut, (side, other_side) = min_cut.stoer_wagner(list(graph.nodes), weights)
+        assert cut == pytest.approx(expected)
+        assert len(side) > 0 and len(other_side) > 0
+        assert sorted(side + other_side) == sorted(graph.nodes)
+        assert nx.cut_size(graph, side, weight="weight") == pytest.approx(cut)
+        graphs += 1
+    assert graphs > 100
+
+
+def test_partition_of_named_vertices(min_cut):
+    # Two triangles joined by a light edge
+    weights = {
+        (("a",), ("b",)): 3.0,
+        (("b",), ("c",)): 3.0,
+        (("a",), ("c",)): 3.0,
+        (("d",), ("e",)): 2.0,
+        (("e",), ("f",)): 2.0,
+        (("d",), ("f",)): 2.0,
+        (("c",), ("d",)): 0.5,
+    }
+    vertices = {vertex for edge in weights for vertex in edge}
+    expected = {
+        frozenset({("a",), ("b",), ("c",)}),
+        frozenset({("d",), ("e",), ("f",)}),
+    }
+    for engine in ("numpy", "networkx"):
+        partition = min_cut.min_cut_partition(vertices, weights, engine=engine)
+        assert set(map(frozenset, partition)) == expected
+
+
+def test_parallel_recursion_gives_the_same_supertree(min_cut):
+    rng = random.Random(0)
+    trees = []
+    for seed in range(2):
+        tree = synthetic_tree(30, seed)
+        for _ in range(4):
+            trees.append(tree.get_sub_tree(rng.sample(tree.get_tip_names(), 15)))
+
+    expected = min_cut.min_cut_supertree(trees, pcg_weighting="branch")
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        supertree = min_cut.min_cut_supertree(
+            trees, pcg_weighting="branch", executor=executor, parallel_min_taxa=4
+        )
+    # The same tree, with the children of each node in a canonical order
+    assert supertree.same_topology(expected)
+    min_cut._order_children(expected)
+    assert str(supertree) == str(expected)
+    assert sorted(supertree.get_tip_names()) == sorted(
+        {name for tree in trees for name in tree.get_tip_names()}
+    )
+
+
+def test_engines_find_cuts_of_equal_weight_among_ties(min_cut):
+    # Rings and cliques of equal weights have many minimum cuts, which the
+    # engines may break differently
+    graphs = [nx.cycle_graph(n) for n in range(3, 12)]
+    graphs += [nx.complete_graph(n) for n in range(3, 9)]
+    graphs += [nx.circular_ladder_graph(n) for n in range(3, 8)]
+    for graph in graphs:
+        weights = {((u,), (v,)): 1.0 for u, v in graph.edges}
+        nx.set_edge_attributes(graph, 1.0, "weight")
+        vertices = {(u,) for u in graph.nodes}
+
+        cuts = []
+        for engine in ("numpy", "networkx"):
+            side, other_side = min_cut.min_cut_partition(vertices, weights, engine)
+            assert len(side) > 0 and len(other_side) > 0
+            assert side | other_side == vertices
+            cuts.append(nx.cut_size(graph, [u for u, in side], weight="weight"))
+        assert cuts[0] == cuts[1]
+
+        # The numpy engine breaks ties the same way whatever the vertex order
+        shuffled = sorted(vertices, key=lambda vertex: hash(str(vertex)))
+        partition = min_cut.min_cut_partition(shuffled, weights)
+        assert set(map(frozenset, partition)) == set(
+            map(frozenset, min_cut.min_cut_partition(vertices, weights))
+        )
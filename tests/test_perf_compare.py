@@ -0,0 +1,51 @@
+from scs_analysis.perf.compare import compare_benchmarks, format_comparison_table
+
+
+def _results(**benchmarks):
+    return {
+        "benchmarks": [
+            {"name": name, "median": median, "peak_memory": memory}
+            for name, (median, memory) in benchmarks.items()
+        ]
+    }
+
+
+def test_regressions_beyond_tolerance_are_flagged():
+    baseline = _results(
+        **{"a[100]": (1.0, 1000), "b[100]": (1.0, 1000), "c[100]": (1e-5, 10)}
+    )
+    current = _results(
+        **{"a[100]": (1.05, 1000), "b[100]": (1.2, 2000), "c[100]": (2e-5, 10)}
+    )
+    current["benchmarks"].append({"name": "d[100]", "median": 1.0, "peak_memory": 1})
+
+    comparisons = {c.name: c for c in compare_benchmarks(baseline, current, 0.1)}
+    assert not comparisons["a[100]"].regressed
+    assert comparisons["b[100]"].time_regressed
+    assert comparisons["b[100]"].memory_regressed
+    # Tiny absolute differences are noise
+    assert not comparisons["c[100]"].regressed
+    assert comparisons["d[100]"].baseline_time is None
+
+    comparisons = compare_benchmarks(baseline, current, 0.1, memory_tolerance=2.0)
+    assert not comparisons[1].memory_regressed
+
+    table = format_comparison_table(comparisons)
+    assert "REGRESSION" in table.splitlines()[2]
+    assert table.splitlines()[4].endswith("new")
+
+
+def test_pytest_benchmark_results():
+    baseline = {
+        "benchmarks": [
+            {
+                "name": "test_hot_path[a[100]]",
+                "param": "a[100]",
+                "stats": {"median": 1.0},
+            }
+        ]
+    }
+    current = _results(**{"a[100]": (2.0, 1000)})
+    (comparison,) = compare_benchmarks(baseline, current)
+    assert comparison.time_regressed
+    assert not comparison.memory_regressed
@@ -0,0 +1,47 @@
+import os
+
+from scs_analysis.perf.profiling import (
+    DISTANCES,
+    collect_profiles,
+    profile_path,
+    profile_report,
+    profiled,
+)
+
+
+def _work():
+    return sorted(str(i) for i in range(10000))
+
+
+def test_profiles_are_merged_per_experiment(tmp_path):
+    results = str(tmp_path) + "/"
+    for experiment in ("exp/100/", "exp/1000/"):
+        for source in ("s0.tre", "s1.tre"):
+            with profiled(profile_path(results + experiment, "SCS", source)):
+                _work()
+            with profiled(
+                profile_path(results + experiment, "SCS", source, DISTANCES)
+            ):
+                _work()
+    with profiled(None):
+        _work()
+
+    groups = collect_profiles(results)
+    assert sorted(groups) == [
+        ("exp/100", "SCS", "distances"),
+        ("exp/100", "SCS", "run"),
+        ("exp/1000", "SCS", "distances"),
+        ("exp/1000", "SCS", "run"),
+    ]
+    assert [os.path.basename(f) for f in groups[("exp/100", "SCS", "run")]] == [
+        "s0.tre.prof",
+        "s1.tre.prof",
+    ]
+
+    report = profile_report(results, top=3, sort="cumtime")
+    sections = report.split("\n\n")
+    assert len(sections) == 4
+    assert sections[0].startswith("exp/100 SCS distances (2 profiles)")
+    assert "_work" in sections[0]
+    assert len(sections[0].splitlines()) == 2 + 3
+    assert profile_report(results, method="MCS") == ""
@@ -0,0 +1,55 @@
+import io
+import time
+
+import pytest
+
+from scs_analysis.experiment.progress import ProgressReporter, format_duration
+
+
+def test_eta_is_scaled_by_the_accuracy_of_the_predictions():
+    progress = ProgressReporter(6, workers=2, interval=0, stream=io.StringIO())
+    progress.skip()
+    for cost in (40.0, 30.0, 10.0, 10.0, 10.0):
+        progress.expect("SCS", cost)
+    assert progress.eta() == pytest.approx(50.0)
+
+    # The jobs take twice as long as predicted
+    progress.complete("SCS", 80.0, 40.0)
+    assert progress.eta() == pytest.approx(2 * 30.0)
+    progress.complete("SCS", 60.0, 30.0, failed=True)
+    assert progress.eta() == pytest.approx(2 * 15.0)
+
+    summary = progress.summary()
+    assert summary.startswith(
+        "Progress: 3/6 jobs done (1 skipped, 1 failed), 3 remaining"
+    )
+    assert "ETA 30s" in summary
+    assert "| SCS " in summary
+
+
+def test_eta_without_predictions_uses_method_means():
+    progress = ProgressReporter(4, interval=0, label="trees", stream=io.StringIO())
+    for method in ("SCS", "SCS", "MCS", "MCS"):
+        progress.expect(method)
+    assert progress.eta() is None
+    progress.complete("SCS", 2.0)
+    progress.complete("MCS", 6.0)
+    assert progress.eta() == pytest.approx(8.0)
+
+
+def test_summary_lines_are_printed_periodically():
+    stream = io.StringIO()
+    with ProgressReporter(1, interval=0.05, stream=stream) as progress:
+        progress.expect("MCS")
+        time.sleep(0.2)
+        progress.complete("MCS", 0.2)
+    lines = stream.getvalue().splitlines()
+    assert len(lines) >= 3
+    assert lines[0].startswith("Progress: 0/1 jobs done, 1 remaining")
+    assert lines[-1].startswith("Progress: 1/1 jobs done, 0 remaining")
+
+
+def test_format_duration():
+    assert format_duration(5) == "5s"
+    assert format_duration(65) == "1m05s"
+    assert format_duration(3 * 86400 + 61) == "72h01m01s"
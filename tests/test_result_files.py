@@ -0,0 +1,110 @@
+import os
+
+from scs_analysis.experiment import experiment
+from scs_analysis.experiment.experiment import ResultsLogger
+from scs_analysis.experiment.result_files import (
+    JOURNAL_DIRECTORY,
+    needs_recovery,
+    read_records,
+)
+
+
+def test_recovery_after_interrupted_writes(tmp_path):
+    results = str(tmp_path) + "/"
+    logger = ResultsLogger(results, "exp/")
+    logger.write_results("SCS", "m0", "s0", 1.0, 1.0, "(a,b);")  # type: ignore
+    logger.write_results("SCS", "m1", "s1", 1.0, 1.0, "(a,b);")  # type: ignore
+    file_path = logger.format_file_path("SCS")
+    tree = logger.tree_store.put("(a,b);")
+    assert not needs_recovery(file_path)
+
+    # Killed while appending a record
+    with open(file_path, "a") as f:
+        f.write("m2\ts2\t1.0\t1.0\t((a,b),")
+    # Killed after committing a journal but before appending it
+    journal_directory = results + "exp/" + JOURNAL_DIRECTORY
+    with open(journal_directory + "SCS_results.tsv.0.journal", "w") as f:
+        f.write("m3\ts3\t1.0\t1.0\t(a,b);\n")
+    # Killed after appending but before removing the journal
+    with open(journal_directory + "SCS_results.tsv.1.journal", "w") as f:
+        f.write(f"m1\ts1\t1.0\t1.0\t{tree}\n")
+    # Killed while writing a journal
+    with open(journal_directory + "SCS_results.tsv.2.journal.tmp", "w") as f:
+        f.write("m4\ts4\t1.0")
+    assert needs_recovery(file_path)
+
+    # The partial record is skipped by readers before recovery
+    assert not logger.result_already_exists("SCS", "s2")
+
+    logger = ResultsLogger(results, "exp/", verbosity=0)
+    assert not needs_recovery(file_path)
+    assert os.listdir(journal_directory) == []
+    assert [record[1] for record in read_records(file_path, 5)] == ["s0", "s1", "s3"]
+
+    # Appending resumes on a fresh line
+    logger.write_results("SCS", "m2", "s2", 1.0, 1.0, "(a,b);")  # type: ignore
+    assert [record[1] for record in read_records(file_path, 5)] == [
+        "s0",
+        "s1",
+        "s3",
+        "s2",
+    ]
+
+
+def test_results_are_looked_up_by_key(tmp_path):
+    results = str(tmp_path) + "/"
+    logger = ResultsLogger(results, "exp/")
+
+    # Results without a recorded key predate keys and are trusted
+    logger.write_results("SCS", "m0", "s0", 1.0, 1.0, "(a,b);")  # type: ignore
+    assert logger.result_already_exists("SCS", "s0", "key0")
+
+    logger.write_results("SCS", "m1", "s1", 1.0, 1.0, "(a,b);", "key1")  # type: ignore
+    assert logger.result_key("SCS", "s1") == "key1"
+    assert logger.result_already_exists("SCS", "s1")
+    assert logger.result_already_exists("SCS", "s1", "key1")
+    assert not logger.result_already_exists("SCS", "s1", "key2")
+
+    with open(results + "exp/SCS_results_with_distances.tsv", "w") as f:
+        for stf in ("s0", "s1"):
+            f.write("\t".join(["m", stf] + ["0"] * 8 + ["(a,b);"]) + "\n")
+
+    # A stale result is replaced, along with the distances calculated from it
+    logger.write_results("SCS", "m1", "s1", 2.0, 2.0, "(b,a);", "key2")  # type: ignore
+    assert logger.result_already_exists("SCS", "s1", "key2")
+    assert [record[:3] for record in read_records(logger.format_file_path("SCS"), 5)] == [
+        ["m0", "s0", "1.0"],
+        ["m1", "s1", "2.0"],
+    ]
+    distances = results + "exp/SCS_results_with_distances.tsv"
+    assert [record[1] for record in read_records(distances, 11)] == ["s0"]
+
+
+def test_new_keyed_results_rewrite_no_files(tmp_path, monkeypatch):
+    logger = ResultsLogger(str(tmp_path) + "/", "exp/")
+    logger.write_results("SCS", "m0", "s0", 1.0, 1.0, "(a,b);", "key0")  # type: ignore
+
+    rewritten = []
+    monkeypatch.setattr(
+        experiment, "remove_records", lambda file_path, *_: rewritten.append(file_path)
+    )
+    logger.write_results("SCS", "m1", "s1", 1.0, 1.0, "(a,b);", "key1")  # type: ignore
+    assert rewritten == []
+    logger.write_results("SCS", "m1", "s1", 1.0, 1.0, "(a,b);", "key2")  # type: ignore
+    assert len(rewritten) == 4
+
+
+def test_recovery_of_interrupted_rewrite(tmp_path):
+    results = str(tmp_path) + "/"
+    logger = ResultsLogger(results, "exp/")
+    logger.write_results("SCS", "m0", "s0", 1.0, 1.0, "(a,b);")  # type: ignore
+    file_path = logger.format_file_path("SCS")
+
+    # Killed after committing the new contents but before applying them
+    journal_directory = results + "exp/" + JOURNAL_DIRECTORY
+    with open(journal_directory + "SCS_results.tsv.rewrite", "w") as f:
+        f.write("m1\ts1\t1.0\t1.0\t(a,b);\n")
+    assert needs_recovery(file_path)
+
+    ResultsLogger(results, "exp/", verbosity=0)
+    assert [record[1] for record in read_records(file_path, 5)] == ["s1"]
@@ -0,0 +1,58 @@
+import os
+
+from scs_analysis.experiment.experiment import ResultsLogger
+from scs_analysis.experiment.result_files import index_path, remove_records
+from scs_analysis.storage.results_index import RecordIndex
+
+
+def test_index_follows_appends_and_rewrites(tmp_path):
+    results = str(tmp_path) + "/"
+    logger = ResultsLogger(results, "exp/")
+    for i in range(3):
+        logger.write_results("SCS", "m", f"s{i}", 1.0, 1.0, "(a,b);")  # type: ignore
+    file_path = logger.format_file_path("SCS")
+
+    index = RecordIndex(file_path, ResultsLogger.NUM_FIELDS, 1)
+    assert index.keys() == ["s0", "s1", "s2"]
+    offset, length = index.location("s1")  # type: ignore
+    with open(file_path, "rb") as f:
+        f.seek(offset)
+        assert f.read(length).startswith(b"m\ts1\t")
+    assert os.path.exists(index_path(file_path))
+
+    # Records appended by writers that do not use the index are caught up on
+    with open(file_path, "a") as f:
+        f.write("m\ts3\t2.0\t2.0\tNone\n")
+        f.write("m\ts4\t2.0")
+    assert index.record("s3") == ["m", "s3", "2.0", "2.0", "None"]
+    assert "s4" not in index
+    assert index.location("s0") == (0, index.location("s1")[0])  # type: ignore
+
+    # Rewriting the file empties its index
+    remove_records(file_path, ResultsLogger.NUM_FIELDS, lambda p: p[1] == "s0")
+    assert os.path.getsize(index_path(file_path)) == 0
+    assert index.keys() == ["s1", "s2", "s3"]
+    assert index.record("s0") is None
+    assert index.record("s1")[1] == "s1"  # type: ignore
+
+    # A file changed behind the index's back is reindexed when read
+    with open(file_path, "w") as f:
+        f.write("m\ts5\t3.0\t3.0\tNone\nm\ts1\t4.0\t4.0\tNone\n")
+    os.utime(index_path(file_path), ns=(0, 0))
+    stale = RecordIndex(file_path, ResultsLogger.NUM_FIELDS, 1)
+    assert stale.record("s1") == ["m", "s1", "4.0", "4.0", "None"]
+    assert stale.keys() == ["s5", "s1"]
+
+
+def test_results_are_found_through_the_index(tmp_path):
+    results = str(tmp_path) + "/"
+    logger = ResultsLogger(results, "exp/")
+    assert logger.read_result("SCS", "s0") is None
+    logger.write_results("SCS", "m", "s0", 1.0, 1.0, "(a,b);", "key0")  # type: ignore
+    logger.write_results("SCS", "m", "s0", 2.0, 2.0, "(b,a);", "key1")  # type: ignore
+
+    record = logger.read_result("SCS", "s0")
+    assert record is not None and record[2] == "2.0"
+    assert logger.tree_store.get(record[4]) == "(b,a);"
+    assert logger.result_already_exists("SCS", "s0", "key1")
+    assert not logger.result_already_exists("SCS", "s0", "key0")
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from scs_analysis.experiment import scheduler
+from scs_analysis.experiment.experiment import Job
+from scs_analysis.experiment.scheduler import (
+    CostModel,
+    longest_processing_time_order,
+    predicted_makespan,
+    run_jobs,
+)
+from scs_analysis.experiment.timing import RunStats
+
+
+def _write_source_trees(path, taxa, num_trees):
+    names = [f"t{i}" for i in range(taxa)]
+    with open(path, "w") as f:
+        for _ in range(num_trees):
+            f.write("(" + ",".join(names) + ");\n")
+
+
+def test_cost_model(tmp_path):
+    results = tmp_path / "results" / "exp"
+    results.mkdir(parents=True)
+
+    sources = []
+    for i, taxa in enumerate((10, 20, 40, 80)):
+        source = tmp_path / f"source_{i}.tre"
+        _write_source_trees(source, taxa, 5)
+        sources.append(str(source))
+
+    with open(results / "SCS_results.tsv", "w") as f:
+        for source, wall_time in zip(sources[:3], (1.0, 2.0, 4.0)):
+            f.write(f"model\t{source}\t{wall_time}\t{wall_time}\t(a,b);\n")
+        f.write("model\ttruncat")  # a partial record is ignored
+
+    cost_model = CostModel(str(tmp_path / "results") + "/")
+
+    # Known jobs are predicted by their history
+    assert cost_model.predict(Job("SCS", sources[1], "model", "exp/")) == 2.0
+    # Unknown jobs fall back to the fitted model (wall time doubles with taxa)
+    assert cost_model.predict(Job("SCS", sources[3], "model", "exp/")) == pytest.approx(
+        8.0
+    )
+    # Methods without history use the model fitted over all methods
+    assert cost_model.predict(Job("MCS", sources[3], "model", "exp/")) == pytest.approx(
+        8.0
+    )
+
+
+def test_longest_processing_time_order():
+    jobs = [Job("SCS", f"s{i}", "m", "exp/") for i in range(4)]
+    ordered = longest_processing_time_order(jobs, [1.0, 5.0, 3.0, 5.0])
+    assert [job.source_tree_file for job, _ in ordered] == ["s1", "s3", "s2", "s0"]
+
+
+def test_predicted_makespan():
+    assert predicted_makespan([5.0, 4.0, 3.0, 3.0, 1.0], 1) == 16.0
+    assert predicted_makespan([5.0, 4.0, 3.0, 3.0, 1.0], 2) == 8.0
+    assert predicted_makespan([5.0, 4.0, 3.0, 3.0, 1.0], 10) == 5.0
+
+
+class _FixedModel:
+    def __init__(self, values):
+        self.values = values
+
+    def predict(self, job):
+        return self.values[job.source_tree_file]
+
+
+def test_memory_admission(tmp_path, monkeypatch):
+    lock = threading.Lock()
+    in_use = []
+    started = []
+
+    def fake_run(method, source_tree_file, **kwargs):
+        with lock:
+            in_use.append(source_tree_file)
+            started.append((source_tree_file, tuple(in_use)))
+        time.sleep(0.3 if source_tree_file == "big" else 0.05)
+        with lock:
+            in_use.remove(source_tree_file)
+        return "(a,b);", 0.1, 0.1, RunStats(0, 0, 0, 0.0)
+
+    monkeypatch.setattr(scheduler, "run_method_measured", fake_run)
+
+    sizes = {"big": 6.0, "huge": 20.0, "large": 5.0, "s0": 1.0, "s1": 1.0}
+    costs = {"huge": 5.0, "big": 4.0, "large": 3.0, "s0": 1.0, "s1": 1.0}
+    jobs = [Job("SCS", source, "m", "exp/") for source in sizes]
+    run_jobs(
+        jobs,
+        workers=4,
+        verbosity=0,
+        results_folder=str(tmp_path) + "/",
+        cost_model=_FixedModel(costs),  # type: ignore
+        memory_budget_kb=8.0,
+        memory_model=_FixedModel(sizes),  # type: ignore
+    )
+
+    assert sorted(source for source, _ in started) == sorted(sizes)
+    for source, running in started:
+        # Over budget jobs run alone, the rest stay within it
+        if source == "huge":
+            assert running == ("huge",)
+        else:
+            assert sum(sizes[other] for other in running) <= 8.0
+    # Small jobs fill the gap next to the big job while the large one waits
+    order = [source for source, _ in started]
+    assert order.index("s0") < order.index("large")
+
+
+def test_models_must_define_their_history():
+    class Incomplete(scheduler._LogLinearModel):
+        def _default(self, taxa, num_trees):
+            return 1.0
+
+    with pytest.raises(TypeError):
+        Incomplete()
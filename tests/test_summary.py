@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from scs_analysis.experiment.summary import paired_results, summarise
+
+
+def _results():
+    # The BCD rows are in a different order from the SCS rows
+    return pd.DataFrame(
+        {
+            "Model Tree": ["m"] * 6,
+            "Source Tree": ["s0", "s1", "s2", "s2", "s0", "s1"],
+            "RF Distance": [2, 4, 0, 0, 4, 2],
+            "Matching Cluster Distance": [1, 1, 1, 1, 1, 1],
+            "CPU Time": [1.0, 2.0, 3.0, 6.0, 2.0, 4.0],
+            "Method": ["SCS"] * 3 + ["BCD (GSCM)"] * 3,
+        }
+    )
+
+
+def test_methods_are_paired_by_source_tree():
+    pairs = paired_results(_results())
+    scs_cpu = pairs[(pairs["Method"] == "SCS") & (pairs["Metric"] == "CPU Time")]
+    assert sorted(scs_cpu["Ratio"]) == [0.5, 0.5, 0.5]
+    assert len(pairs) == 2 * 3 * 3
+
+
+def test_summary_of_each_pair_and_metric():
+    summary = summarise(_results(), samples=200).set_index(
+        ["Method", "Baseline", "Metric"]
+    )
+    rf = summary.loc[("SCS", "BCD (GSCM)", "RF Distance")]
+    assert rf["Pairs"] == 3
+    # 0 / 0 is left out of the median
+    assert rf["Median Ratio"] == pytest.approx((0.5 + 2.0) / 2)
+    assert (rf["Wins"], rf["Losses"], rf["Ties"]) == (1, 1, 1)
+    cpu = summary.loc[("BCD (GSCM)", "SCS", "CPU Time")]
+    assert cpu["Median Ratio"] == 2.0
+    assert cpu["CI Low"] == cpu["CI High"] == 2.0
+    assert cpu["Losses"] == 3
+
+
+def test_summary_by_group():
+    df = pd.concat([_results().assign(k=10), _results().assign(k=20)])
+    summary = summarise(df, "k", samples=50)
+    assert list(summary.columns[:4]) == ["k", "Method", "Baseline", "Metric"]
+    assert sorted(summary["k"].unique()) == [10, 20]
+    assert len(summary) == 2 * 2 * 3
@@ -0,0 +1,48 @@
+import sys
+
+from scs_analysis.experiment.experiment import ResultsLogger
+from scs_analysis.experiment.timing import (
+    RunStats,
+    is_disturbed,
+    physical_cores,
+    run_command,
+)
+
+
+def test_run_command_is_pinned_and_measured():
+    cpu = physical_cores()[0]
+    stdout, stderr, stats = run_command(
+        [
+            sys.executable,
+            "-c",
+            "import os, sys; x = bytearray(50 * 2**20); "
+            "print(sorted(os.sched_getaffinity(0))); print('err', file=sys.stderr)",
+        ],
+        cpu=cpu,
+    )
+    assert stdout.decode().strip() == str([cpu])
+    assert stderr.decode().strip() == "err"
+    assert stats.cpu == cpu
+    assert stats.max_rss_kb > 50 * 1024
+
+
+def test_disturbed_runs_are_flagged():
+    quiet = RunStats(100, 10, 5, 0.5)
+    assert not is_disturbed(quiet, 10.0, available_cores=4)
+    assert is_disturbed(RunStats(100, 10, 5, 6.0), 10.0, available_cores=4)
+    assert is_disturbed(RunStats(100, 10, 5000, 0.5), 10.0, available_cores=4)
+
+    # The load of the workers' own runs is not other work
+    assert not is_disturbed(RunStats(100, 10, 5, 7.5), 10.0, 4, workers=8)
+    assert is_disturbed(RunStats(100, 10, 5, 8.5), 10.0, 4, workers=8)
+    assert is_disturbed(RunStats(100, 10, 5, 4.5), 10.0, 4, workers=2)
+
+
+def test_run_stats_are_recorded(tmp_path):
+    logger = ResultsLogger(str(tmp_path) + "/", "exp/")
+    stats = RunStats(1234, 1, 2, 0.25, cpu=3, disturbed=True)
+    logger.write_run_stats("SCS", "s0", stats)
+    assert logger.read_run_stats("SCS") == {"s0": stats}
+
+    logger.discard_results("SCS", "s0")
+    assert logger.read_run_stats("SCS") == {}
@@ -0,0 +1,67 @@
+import os
+
+from cogent3 import make_tree
+
+from scs_analysis.storage.tree_cache import (
+    CachedTrees,
+    cache_path,
+    cache_tree_files,
+    load_tree,
+    load_trees,
+    parse_newick_file,
+)
+
+
+NEWICKS = [
+    "((a:0.5,b:1.25)90:0.75,(c,c):2.0);",
+    "(((a,d),(e,b)),f)x;",
+    "(a:3.0,b:0.125);",
+]
+
+
+def _write(file_path, newicks):
+    with open(file_path, "w") as f:
+        f.write("\n".join(newicks) + "\n")
+
+
+def test_cached_trees_match_parsed_trees(tmp_path):
+    file_path = str(tmp_path / "trees.source_trees")
+    _write(file_path, NEWICKS)
+    assert cache_tree_files([file_path, str(tmp_path / "missing")], verbosity=0) == 1
+
+    parsed = parse_newick_file(file_path)
+    with CachedTrees(cache_path(file_path)) as cached:
+        assert len(cached) == 3
+        assert "a" in cached.names
+        trees = cached.trees()
+    for tree, expected in zip(trees, parsed):
+        assert str(tree) == str(expected)
+        assert tree.get_newick(with_distances=True) == expected.get_newick(
+            with_distances=True
+        )
+        assert [(n.name, n.name_loaded) for n in tree.postorder()] == [
+            (n.name, n.name_loaded) for n in expected.postorder()
+        ]
+        for node in tree.children:
+            assert node.parent is tree
+    assert trees[0].get_node_matching_name("c.2").length is None
+
+    # Up to date caches are not rewritten
+    assert cache_tree_files([file_path], verbosity=0) == 0
+    assert cache_tree_files([file_path], force=True, verbosity=0) == 1
+
+
+def test_stale_caches_are_ignored(tmp_path):
+    file_path = str(tmp_path / "model.tre")
+    _write(file_path, ["((a,b),c);"])
+    cache_tree_files([file_path], verbosity=0)
+    assert str(load_tree(file_path)) == "((a,b),c);"
+
+    _write(file_path, ["((a,c),b);"])
+    os.utime(file_path, ns=(0, 0))  # Changed, whatever the clock resolution
+    assert str(load_tree(file_path)) == "((a,c),b);"
+    assert [str(tree) for tree in load_trees(file_path)] == ["((a,c),b);"]
+
+    with open(cache_path(file_path), "wb") as f:
+        f.write(b"not a cache")
+    assert str(load_tree(file_path)) == str(make_tree("((a,c),b);"))
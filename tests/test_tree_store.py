@@ -0,0 +1,49 @@
+import os
+
+from scs_analysis.experiment.experiment import (
+    DISTANCE_NUM_FIELDS,
+    ResultsLogger,
+    store_result_trees,
+)
+from scs_analysis.experiment.result_files import read_records
+from scs_analysis.storage.tree_store import TreeStore, is_tree_ref
+
+
+def test_trees_are_stored_once_by_content(tmp_path):
+    store = TreeStore(str(tmp_path) + "/exp/")
+    ref = store.put("((a,b),c);")
+    assert is_tree_ref(ref)
+    assert store.put("((a,b),c);") == ref
+    assert store.put("((a,c),b);") != ref
+    assert ref in store
+    assert store.get(ref) == "((a,b),c);"
+    with store.open(ref) as f:
+        assert f.read(3) == "((a"
+
+    # Records from before the store hold the Newick itself
+    assert store.resolve("((a,b),c);") == "((a,b),c);"
+    assert store.resolve(ref) == "((a,b),c);"
+    assert store.store(None) == "None"
+    assert len(os.listdir(store.directory)) == 2
+
+
+def test_existing_results_are_moved_into_the_store(tmp_path):
+    results = str(tmp_path) + "/"
+    logger = ResultsLogger(results, "exp/")
+    logger.write_results("SCS", "m", "s0", 1.0, 1.0, "(a,b);")  # type: ignore
+    with open(logger.format_file_path("SCS"), "a") as f:
+        f.write("m\ts1\t1.0\t1.0\t((a,b),c);\n")
+        f.write("m\ts2\t1.0\tNone\tNone\n")
+    with open(results + "exp/SCS_results_with_distances.tsv", "w") as f:
+        f.write("\t".join(["m", "s1"] + ["0"] * 8 + ["((a,b),c);"]) + "\n")
+
+    assert store_result_trees(results, verbosity=0) == 2
+    assert store_result_trees(results, verbosity=0) == 0
+
+    trees = [record[4] for record in read_records(logger.format_file_path("SCS"), 5)]
+    assert is_tree_ref(trees[0]) and is_tree_ref(trees[1]) and trees[2] == "None"
+    assert logger.tree_store.get(trees[1]) == "((a,b),c);"
+    distances = read_records(
+        results + "exp/SCS_results_with_distances.tsv", DISTANCE_NUM_FIELDS
+    )
+    assert [record[-1] for record in distances] == [trees[1]]
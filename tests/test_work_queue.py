@@ -0,0 +1,143 @@
+import json
+import multiprocessing
+import os
+import time
+
+from scs_analysis.experiment.experiment import Job, ResultsLogger
+from scs_analysis.experiment.work_queue import (
+    CLAIMED,
+    DONE,
+    LEASES,
+    PENDING,
+    claim_job,
+    enqueue_jobs,
+    merge_shards,
+    reclaim_expired_leases,
+    run_worker,
+    shard_folder,
+)
+
+
+class _NoCost:
+    def predict(self, job):
+        return 0.0
+
+
+def _fake_execute(job, results_folder, verbosity):
+    time.sleep(0.01)
+    ResultsLogger(results_folder, job.experiment_directory).write_results(
+        job.method, job.model_tree_file, job.source_tree_file, 0.01, 0.01, "(a,b);"  # type: ignore
+    )
+
+
+def _worker(queue_directory, worker_id):
+    run_worker(
+        queue_directory,
+        worker_id,
+        poll_interval=0.05,
+        execute=_fake_execute,
+        verbosity=0,
+    )
+
+
+def _jobs():
+    return [
+        Job(method, f"data/source_{i}.tre", f"data/model_{i}.tre", f"exp/{i % 3}/")
+        for i in range(30)
+        for method in ("SCS", "MCS")
+    ]
+
+
+def test_workers_drain_queue(tmp_path):
+    queue = str(tmp_path / "queue")
+    results = str(tmp_path / "results") + "/"
+
+    jobs = _jobs()
+    assert enqueue_jobs(queue, jobs, results, _NoCost(), verbosity=0) == len(jobs)
+    # Enqueueing again does not duplicate jobs
+    assert enqueue_jobs(queue, jobs, results, _NoCost(), verbosity=0) == 0
+
+    workers = [
+        multiprocessing.Process(target=_worker, args=(queue, f"worker{i}"))
+        for i in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    assert len(os.listdir(os.path.join(queue, PENDING))) == 0
+    assert len(os.listdir(os.path.join(queue, CLAIMED))) == 0
+    assert len(os.listdir(os.path.join(queue, DONE))) == len(jobs)
+
+    assert merge_shards(queue, results, verbosity=0) == len(jobs)
+    assert merge_shards(queue, results, verbosity=0) == 0
+    for job in jobs:
+        logger = ResultsLogger(results, job.experiment_directory)
+        assert logger.result_already_exists(job.method, job.source_tree_file)
+    # Nothing is left to enqueue once the results are merged
+    assert enqueue_jobs(queue + "2", jobs, results, _NoCost(), verbosity=0) == 0
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    queue = str(tmp_path / "queue")
+    results = str(tmp_path / "results") + "/"
+    enqueue_jobs(queue, _jobs()[:2], results, _NoCost(), verbosity=0)
+
+    job_file = claim_job(queue, "dead-worker")
+    assert job_file is not None
+    assert reclaim_expired_leases(queue, lease_timeout=60) == []
+
+    with open(os.path.join(queue, LEASES, job_file), "w") as f:
+        json.dump({"worker": "dead-worker", "heartbeat": time.time() - 120}, f)
+    assert reclaim_expired_leases(queue, lease_timeout=60) == [job_file]
+    assert job_file in os.listdir(os.path.join(queue, PENDING))
+
+    _worker(queue, "live-worker")
+    assert len(os.listdir(os.path.join(queue, DONE))) == 2
+
+
+def test_worker_that_lost_its_lease_leaves_the_job(tmp_path):
+    queue = str(tmp_path / "queue")
+    results = str(tmp_path / "results") + "/"
+    enqueue_jobs(queue, _jobs()[:1], results, _NoCost(), verbosity=0)
+    done = []
+
+    def slow_execute(job, results_folder, verbosity):
+        done.append(os.listdir(os.path.join(queue, DONE)))
+        if len(done) > 1:
+            return
+        # Meanwhile the lease expires and another worker claims the job (and
+        # dies, so the job is reclaimed again and rerun)
+        (job_file,) = os.listdir(os.path.join(queue, CLAIMED))
+        with open(os.path.join(queue, LEASES, job_file), "w") as f:
+            json.dump({"worker": "slow-worker", "heartbeat": time.time() - 120}, f)
+        assert reclaim_expired_leases(queue, lease_timeout=60) == [job_file]
+        assert claim_job(queue, "other-worker") == job_file
+
+    run_worker(
+        queue,
+        "slow-worker",
+        lease_timeout=0.5,
+        poll_interval=0.05,
+        execute=slow_execute,
+        verbosity=0,
+    )
+    # The first run did not finish the job held by the other worker
+    assert done == [[], []]
+    assert len(os.listdir(os.path.join(queue, DONE))) == 1
+
+
+def test_merge_replaces_results_with_a_stale_key(tmp_path):
+    queue = str(tmp_path / "queue")
+    results = str(tmp_path / "results") + "/"
+    shard = shard_folder(queue, "worker0")
+    for folder, key in ((results, "old"), (shard, "new")):
+        ResultsLogger(folder, "exp/").write_results(
+            "SCS", "model.tre", "source.tre", 1.0, 1.0, "(a,b);", key  # type: ignore
+        )
+
+    assert merge_shards(queue, results, verbosity=0) == 1
+    assert merge_shards(queue, results, verbosity=0) == 0
+    assert ResultsLogger(results, "exp/").result_key("SCS", "source.tre") == "new"